@@ -9,16 +9,29 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
 import os
 import sys
+import platform
 import shutil
+import stat
+import errno
 import subprocess
 import threading
+import queue
+import contextlib
+import itertools
 import json
+import csv
+import sqlite3
 import time
+import hashlib
+import math
 import psutil
 import logging
 import requests
 from pathlib import Path
+from urllib.parse import quote
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import numpy as np
 try:
     from PIL import Image, ImageTk
@@ -41,6 +54,75 @@ except ImportError:
     SLEAP_AVAILABLE = False
     SLEAP_VERSION = "No instalado"
 
+# Planificación de workers de predicción (CPU)
+MIN_CORES_PER_WORKER = 4
+WORKER_MEMORY_ESTIMATE = 3 * 1024**3  # Dos modelos SLEAP + buffers de decodificación
+
+# Control de admisión por memoria: estimación por configuración, margen sobre
+# lo estimado/aprendido y retroceso (segundos) mientras no haya memoria libre
+TF_RUNTIME_BYTES = int(1.5 * 1024**3)
+ACTIVATION_BYTES_FACTOR = 48
+MEMORY_SAFETY_MARGIN = 1.2
+MEMORY_LEARNED_HEADROOM = 1.15
+MEMORY_BACKOFF_INITIAL = 2.0
+MEMORY_BACKOFF_MAX = 60.0
+
+# Pipeline de predicción: lotes de decodificación y prefetch
+DECODE_THREADS = 2
+DECODE_BATCH_FRAMES = 32
+PREFETCH_BATCHES = 4
+STAGE_NAMES = {'decode': "decodificación", 'infer': "inferencia", 'write': "escritura"}
+
+# División de videos largos en rangos de frames (30 fps: 5 y 30 minutos)
+MIN_CHUNK_FRAMES = 9000
+MAX_CHUNK_FRAMES = 54000
+# Unión de partes: distancia máxima entre centroides en la frontera, como
+# fracción del tamaño de la instancia (o del frame si la instancia es un punto)
+SEAM_INSTANCE_FACTOR = 1.0
+SEAM_FRAME_FRACTION = 0.05
+
+# Modelos incluidos junto a cinbehave_gui.py, registrados en el almacén al iniciar
+BUNDLED_MODEL_DIRS = ("240604_140339.centroid.n=3561", "240604_151646.centered_instance.n=3561")
+
+# Descarga de modelos: manifiesto publicado junto a cada modelo, archivos en
+# paralelo, bloques de 1 MB y reintentos por archivo
+MODEL_MANIFEST_FILENAME = "model_manifest.json"
+TRANSFER_MAX_WORKERS = 4
+TRANSFER_CHUNK_SIZE = 1024 * 1024
+TRANSFER_RETRIES = 3
+
+# Ingesta de videos: copias simultáneas, tamaño de buffer y refresco del avance
+INGEST_MAX_WORKERS = 4
+INGEST_BUFFER_SIZE = 8 * 1024 * 1024
+INGEST_PROGRESS_INTERVAL = 0.25
+# Copia en el kernel (copy_file_range/sendfile) por llamadas de 64 MB; FICLONE de Linux
+INGEST_KERNEL_CHUNK = 64 * 1024 * 1024
+# Copia reanudable: bloques verificados de 64 MB, reintentos ante errores de E/S
+INGEST_CHECKPOINT_BYTES = 64 * 1024 * 1024
+INGEST_RETRIES = 3
+INGEST_RETRY_DELAY = 5.0
+# Videos registrados en su ubicación (modo enlace), dentro de la carpeta Videos/
+LINKED_VIDEOS_FILENAME = "linked_videos.json"
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v')
+FICLONE = 0x40049409
+# Errores que indican que el método de copia no está soportado (se prueba el siguiente)
+COPY_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS, errno.ENOTTY,
+                           errno.EBADF, errno.EPERM}
+
+# Caché de predicciones compartida entre proyectos
+PREDICTION_CACHE_MAX_BYTES = 5 * 1024**3
+# Grafos compilados en disco (cache/compiled), un SavedModel por modelo y equipo
+COMPILED_GRAPH_CACHE_MAX_BYTES = 2 * 1024**3
+
+# Cola persistente de trabajos: intentos por trabajo, prioridad de vistas previas
+# y segundos sin latido tras los que un trabajo en curso se considera huérfano
+JOB_MAX_ATTEMPTS = 3
+PREVIEW_JOB_PRIORITY = 10
+JOB_STALE_SECONDS = 600
+
+# Re-tracking: memoria por proceso del pool (SLEAP importado, sin modelos)
+RETRACK_PROCESS_MEMORY = int(1.5 * 1024**3)
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -51,23 +133,3239 @@ logging.basicConfig(
     ]
 )
 
+class SLEAPInferenceWorker:
+    """Proceso persistente de inferencia SLEAP
+
+    Carga los modelos centroid y centered_instance una sola vez y atiende
+    videos enviados por un canal JSON (una línea por mensaje) sobre
+    stdin/stdout del proceso hijo.
+    """
+    def __init__(self, models_info, worker_id=0, cores=None, threads=None, params=None):
+        self.models_info = models_info
+        self.worker_id = worker_id
+        self.cores = cores
+        self.threads = threads
+        self.params = params or {}
+        self.process = None
+        self.request_counter = 0
+        self.lock = threading.Lock()
+
+    def build_command(self):
+        """Construir línea de comandos del proceso worker"""
+        cmd = [
+            sys.executable, os.path.abspath(__file__), '--sleap-worker',
+            '--centroid', str(self.models_info['centroid'])
+        ]
+        if not self.params.get('centroid_only'):
+            cmd += ['--centered-instance', str(self.models_info['centered_instance'])]
+        if self.cores:
+            cmd += ['--cores', ','.join(str(core) for core in self.cores)]
+        if self.threads:
+            cmd += ['--threads', str(self.threads)]
+        if self.params:
+            cmd += ['--params', json.dumps(self.params)]
+        return cmd
+
+    def build_environment(self):
+        """Limitar los hilos de TensorFlow/BLAS al tamaño del bloque de núcleos"""
+        env = os.environ.copy()
+        if self.threads:
+            env['OMP_NUM_THREADS'] = str(self.threads)
+            env['TF_NUM_INTRAOP_THREADS'] = str(self.threads)
+            env['TF_NUM_INTEROP_THREADS'] = str(max(1, self.threads // 4))
+        return env
+
+    def start(self):
+        """Lanzar el worker y esperar a que los modelos estén cargados"""
+        self.process = subprocess.Popen(
+            self.build_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=self.build_environment(),
+            text=True,
+            bufsize=1
+        )
+
+        message = self.read_message()
+        if message.get('event') != 'ready':
+            self.stop()
+            raise RuntimeError(message.get('message', "El worker SLEAP no pudo iniciar"))
+
+        logging.info(f"Worker SLEAP {self.worker_id} listo (pid {self.process.pid})")
+
+    def is_alive(self):
+        """Verificar si el proceso worker sigue activo"""
+        return self.process is not None and self.process.poll() is None
+
+    def send_message(self, message):
+        """Enviar un mensaje JSON al worker"""
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def read_message(self):
+        """Leer el siguiente mensaje JSON del worker"""
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                return {'event': 'exit', 'message': "El worker SLEAP terminó inesperadamente"}
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                logging.debug(f"Worker SLEAP {self.worker_id}: {line}")
+
+    def predict(self, video_path, output_path, frames=None, log_path=None, on_progress=None, stride=1,
+                roi=None):
+        """Procesar un video (o un rango [inicio, fin) de frames) y esperar el resultado
+
+        on_progress recibe los diccionarios de progreso (n_processed, n_total,
+        rate, eta) a medida que el worker los reporta.
+        """
+        with self.lock:
+            if not self.is_alive():
+                raise RuntimeError("El worker SLEAP no está activo")
+
+            self.request_counter += 1
+            request_id = self.request_counter
+            self.send_message({
+                'command': 'predict',
+                'id': request_id,
+                'video': str(video_path),
+                'output': str(output_path),
+                'frames': list(frames) if frames else None,
+                'log': str(log_path) if log_path else None,
+                'stride': stride,
+                'roi': list(roi) if roi else None
+            })
+
+            while True:
+                message = self.read_message()
+                event = message.get('event')
+                if event == 'exit':
+                    raise RuntimeError(message['message'])
+                if message.get('id') != request_id:
+                    continue
+                if event == 'progress':
+                    if on_progress is not None:
+                        on_progress(message)
+                    continue
+                if event == 'done':
+                    return True
+                if event == 'failed':
+                    logging.error(f"SLEAP error: {message.get('message')} (log: {log_path})")
+                    return False
+
+    def benchmark(self, video_path, candidates, sample_frames):
+        """Medir frames/seg sobre una muestra del video con varios tamaños de lote"""
+        with self.lock:
+            if not self.is_alive():
+                raise RuntimeError("El worker SLEAP no está activo")
+
+            self.request_counter += 1
+            request_id = self.request_counter
+            self.send_message({
+                'command': 'benchmark',
+                'id': request_id,
+                'video': str(video_path),
+                'candidates': list(candidates),
+                'sample_frames': sample_frames
+            })
+
+            while True:
+                message = self.read_message()
+                if message.get('event') == 'exit':
+                    raise RuntimeError(message['message'])
+                if message.get('id') != request_id:
+                    continue
+                if message.get('event') == 'done':
+                    return {int(k): v for k, v in message.get('results', {}).items()}
+                if message.get('event') == 'failed':
+                    raise RuntimeError(message.get('message'))
+
+    def kill(self):
+        """Terminar el worker inmediatamente"""
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def stop(self, timeout=10):
+        """Detener el worker de forma ordenada"""
+        if self.process is None:
+            return
+
+        try:
+            if self.is_alive():
+                self.send_message({'command': 'shutdown'})
+                self.process.wait(timeout=timeout)
+        except Exception:
+            pass
+
+        if self.is_alive():
+            self.process.kill()
+        self.process = None
+
+def plan_worker_slots(num_jobs, max_workers=None, memory_per_worker=None):
+    """Repartir los núcleos disponibles entre workers de predicción
+
+    El número de workers se limita por núcleos (MIN_CORES_PER_WORKER por
+    worker), por memoria disponible y por la cantidad de trabajos.
+    """
+    try:
+        available_cores = psutil.Process().cpu_affinity()
+    except (AttributeError, psutil.Error, OSError):
+        available_cores = list(range(psutil.cpu_count() or 1))
+
+    by_cores = max(1, len(available_cores) // MIN_CORES_PER_WORKER)
+    by_memory = max(1, int(psutil.virtual_memory().available // (memory_per_worker or WORKER_MEMORY_ESTIMATE)))
+    num_workers = max(1, min(by_cores, by_memory, num_jobs))
+    if max_workers:
+        num_workers = min(num_workers, max_workers)
+
+    slots = []
+    cores_per_worker = len(available_cores) // num_workers
+    for worker_id in range(num_workers):
+        cores = available_cores[worker_id * cores_per_worker:(worker_id + 1) * cores_per_worker]
+        slots.append({
+            'worker_id': worker_id,
+            # Con un solo worker no se fija afinidad: usa todo el equipo
+            'cores': cores if num_workers > 1 else None,
+            'threads': len(cores)
+        })
+    return slots
+
+def configure_worker_cpu(cores, threads):
+    """Fijar afinidad de CPU y límites de hilos de TensorFlow en el worker"""
+    if cores:
+        try:
+            psutil.Process().cpu_affinity(cores)
+        except (AttributeError, psutil.Error, OSError) as e:
+            logging.warning(f"No se pudo fijar la afinidad de CPU: {e}")
+
+    if threads:
+        try:
+            import tensorflow as tf
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(max(1, threads // 4))
+        except Exception as e:
+            logging.warning(f"No se pudieron limitar los hilos de TensorFlow: {e}")
+
+def format_duration(seconds):
+    """Formatear una duración en segundos como H:MM:SS"""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def parse_sleap_progress(line):
+    """Interpretar una línea de progreso JSON de sleap-track (--verbosity json)"""
+    line = line.strip()
+    if not line.startswith('{'):
+        return None
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if 'n_processed' not in data or 'n_total' not in data:
+        return None
+    return {
+        'n_processed': int(data['n_processed']),
+        'n_total': int(data['n_total']),
+        'rate': float(data.get('rate') or 0.0),
+        'eta': float(data.get('eta') or 0.0)
+    }
+
+@contextlib.contextmanager
+def redirect_job_output(log_path):
+    """Enviar stdout/stderr (Python y nativos) del worker al log del trabajo
+
+    El progreso no se lee de esta salida: el pipeline lo reporta por el
+    canal IPC del worker.
+    """
+    log_path = Path(log_path)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = {fd: os.dup(fd) for fd in (1, 2)}
+
+    with open(log_path, 'a', buffering=1) as log_file:
+        log_file.write(f"=== {datetime.now().isoformat()} ===\n")
+        log_file.flush()
+        for fd in saved_fds:
+            os.dup2(log_file.fileno(), fd)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, saved_fd in saved_fds.items():
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+
+def build_predictor_kwargs(params):
+    """Traducir los parámetros de CinBehave a argumentos de sleap.load_model"""
+    kwargs = {
+        'batch_size': int(params.get('batch_size', 4)),
+        'peak_threshold': float(params.get('peak_threshold', 0.2))
+    }
+    if params.get('max_instances'):
+        kwargs['max_instances'] = int(params['max_instances'])
+    if params.get('tracker'):
+        kwargs['tracker'] = params['tracker']
+        if params.get('max_instances'):
+            kwargs['tracker_max_instances'] = int(params['max_instances'])
+    return kwargs
+
+def benchmark_batch_sizes(model_paths, video_path, candidates, sample_frames, params):
+    """Medir frames/seg por tamaño de lote; se detiene al primero que no cabe en memoria"""
+    from sleap.nn.data.providers import VideoReader
+
+    video = sleap.load_video(str(video_path))
+    indices = np.arange(min(sample_frames, video.num_frames))
+    memory_limit = 0.8 * psutil.virtual_memory().total
+    results = {}
+
+    for batch_size in candidates:
+        try:
+            # El tracking no influye en el costo del modelo; se mide solo la inferencia
+            kwargs = build_predictor_kwargs(dict(params, batch_size=batch_size, tracker=None))
+            predictor = sleap.load_model(model_paths, **kwargs)
+            predictor.verbosity = "none"
+
+            # Primera pasada para trazar el grafo; la segunda es la que se mide
+            predictor.predict(VideoReader(video=video, example_indices=indices[:batch_size]))
+            start = time.perf_counter()
+            predictor.predict(VideoReader(video=video, example_indices=indices))
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            logging.warning(f"Tamaño de lote {batch_size} descartado: {e}")
+            break
+
+        if psutil.Process().memory_info().rss > memory_limit:
+            logging.warning(f"Tamaño de lote {batch_size} excede la memoria disponible")
+            break
+
+        results[batch_size] = len(indices) / elapsed
+        logging.info(f"Tamaño de lote {batch_size}: {results[batch_size]:.1f} fps")
+
+    return results
+
+def build_tracker(params):
+    """Crear un tracker SLEAP nuevo para un trabajo (None si el tracking está desactivado)
+
+    Además de `tracker` acepta `similarity`, `match`, `track_window` y
+    `max_tracks` (por defecto `max_instances`) de la etapa de re-tracking.
+    """
+    if not params.get('tracker'):
+        return None
+
+    from sleap.nn.tracking import Tracker
+    kwargs = {'tracker': params['tracker']}
+    for key in ('similarity', 'match', 'track_window'):
+        if params.get(key):
+            kwargs[key] = params[key]
+    max_tracks = params.get('max_tracks') or params.get('max_instances')
+    if max_tracks:
+        kwargs.update(max_tracking=True, max_tracks=int(max_tracks))
+    return Tracker.make_tracker_by_name(**kwargs)
+
+def tracked_output_path(prediction_path):
+    """Ruta de la versión con tracking de un .slp: *_tracked.slp"""
+    prediction_path = Path(prediction_path)
+    return prediction_path.with_name(f"{prediction_path.stem}_tracked.slp")
+
+def retrack_prediction_file(prediction_path, params, output_path=None):
+    """Etapa de tracking: reasignar identidades de un .slp existente sin volver a inferir
+
+    Se ejecuta en un proceso del pool, por eso recibe y devuelve solo datos
+    serializables. Devuelve un resumen con el estado ('success', 'skipped'
+    o 'error'), frames y tracks.
+    """
+    prediction_path = Path(prediction_path)
+    output_path = Path(output_path) if output_path else tracked_output_path(prediction_path)
+    summary = {'input': str(prediction_path), 'output': str(output_path), 'frames': 0, 'tracks': 0}
+    start = time.perf_counter()
+
+    try:
+        # Saltar si el resultado vigente ya usó los mismos parámetros
+        if output_path.exists() and output_path.stat().st_mtime >= prediction_path.stat().st_mtime:
+            existing = sleap.load_file(str(output_path))
+            if existing.provenance.get('cinbehave_tracking') == params:
+                return dict(summary, status='skipped', frames=len(existing.labeled_frames),
+                            tracks=len(existing.tracks))
+
+        labels = sleap.load_file(str(prediction_path))
+        tracker = build_tracker(params)
+        uses_images = params['tracker'].startswith('flow')
+
+        tracked_frames = []
+        for labeled_frame in sorted(labels.labeled_frames, key=lambda lf: (lf.video.filename, lf.frame_idx)):
+            # Copias sin identidad: el tracking anterior no condiciona el nuevo
+            untracked = [sleap.PredictedInstance.from_numpy(points=inst.numpy(),
+                                                            point_confidences=inst.scores,
+                                                            instance_score=inst.score,
+                                                            skeleton=inst.skeleton)
+                         for inst in labeled_frame.instances]
+            instances = tracker.track(untracked_instances=untracked,
+                                      img=labeled_frame.image if uses_images else None,
+                                      t=labeled_frame.frame_idx)
+            tracked_frames.append(sleap.LabeledFrame(video=labeled_frame.video,
+                                                     frame_idx=labeled_frame.frame_idx,
+                                                     instances=instances))
+        if hasattr(tracker, 'final_pass'):
+            tracker.final_pass(tracked_frames)
+
+        tracked = sleap.Labels(labeled_frames=tracked_frames)
+        tracked.provenance.update(labels.provenance)
+        tracked.provenance['cinbehave_tracking'] = params
+
+        tmp_path = output_path.with_name(output_path.stem + ".tmp.slp")
+        tracked.save(str(tmp_path))
+        os.replace(tmp_path, output_path)
+        return dict(summary, status='success', frames=len(tracked_frames), tracks=len(tracked.tracks),
+                    seconds=time.perf_counter() - start)
+    except Exception as e:
+        return dict(summary, status='error', error=str(e))
+
+def find_prediction_files(data_sleap_folder):
+    """Predicciones completas de un proyecto (*_predictions.slp, ver prediction_output_path)
+
+    Quedan fuera las vistas previas, las de solo centroides, las versiones
+    con tracking y cualquier otro .slp de la carpeta.
+    """
+    return sorted(Path(data_sleap_folder).glob("*_predictions.slp"))
+
+def machine_fingerprint():
+    """Huella del equipo para los grafos compilados: sistema, CPU y versión de TensorFlow"""
+    import tensorflow as tf
+
+    cpu = platform.processor()
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            cpu += "".join(line for line in f if line.startswith(('model name', 'flags')))
+    except OSError:
+        pass
+    return hashlib.sha256(f"{platform.system()}|{platform.machine()}|{cpu}|{tf.__version__}".encode()).hexdigest()[:16]
+
+class CompiledGraphCache:
+    """Grafos de inferencia exportados en disco (cache/compiled/<equipo>/)
+
+    Cada red Keras se envuelve en un tf.function con la firma de entrada del
+    propio modelo (lote variable; alto y ancho fijos solo si el modelo los
+    fija) y jit_compile para XLA, y se exporta como SavedModel una sola vez
+    por equipo y huella del modelo. La función devuelve todas las salidas del
+    modelo, igual que Keras. El tamaño total está acotado: se eliminan
+    primero los grafos usados hace más tiempo (también los de otros equipos
+    o versiones de TensorFlow).
+    """
+    def __init__(self, root=None, use_xla=True, max_bytes=COMPILED_GRAPH_CACHE_MAX_BYTES):
+        self.root = Path(root) if root else Path("cache") / "compiled"
+        self.use_xla = use_xla
+        self.max_bytes = max_bytes
+        self.machine = machine_fingerprint()
+        self.loaded = {}
+
+    def artifact_path(self, model_fingerprint):
+        suffix = "_xla" if self.use_xla else ""
+        return self.root / self.machine / f"{model_fingerprint[:16]}{suffix}"
+
+    @staticmethod
+    def input_signature(keras_model):
+        import tensorflow as tf
+
+        return [tf.TensorSpec((None,) + tuple(keras_model.input_shape[1:]), tf.float32)]
+
+    def export(self, keras_model, path):
+        """Trazar y guardar la función de inferencia; publicación atómica del directorio"""
+        import tensorflow as tf
+
+        @tf.function(input_signature=self.input_signature(keras_model), jit_compile=self.use_xla)
+        def serve(images):
+            return keras_model(images, training=False)
+
+        module = tf.Module()
+        module.model = keras_model
+        module.serve = serve
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tf.saved_model.save(module, str(tmp_path))
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Otro worker lo publicó primero
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @staticmethod
+    def artifact_size(path):
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+    def evict(self, keep):
+        """Eliminar los grafos usados hace más tiempo hasta respetar max_bytes"""
+        artifacts = [p for p in self.root.glob("*/*") if p.is_dir() and ".tmp" not in p.name]
+        sizes = {p: self.artifact_size(p) for p in artifacts}
+        total = sum(sizes.values())
+        for path in sorted(artifacts, key=lambda p: p.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+            logging.info(f"Caché de grafos compilados: {path.name} eliminado")
+
+    def get(self, keras_model, model_fingerprint):
+        """Función de inferencia compilada del modelo (exporta si falta)"""
+        import tensorflow as tf
+
+        if model_fingerprint in self.loaded:
+            return self.loaded[model_fingerprint]
+
+        path = self.artifact_path(model_fingerprint)
+        if not path.exists():
+            start = time.perf_counter()
+            self.export(keras_model, path)
+            logging.info(f"Grafo compilado exportado: {path.name} ({time.perf_counter() - start:.1f}s)")
+        # La fecha del directorio marca el último uso para el desalojo
+        os.utime(path)
+        self.evict(keep=path)
+
+        graph = tf.saved_model.load(str(path))
+
+        def serve(images):
+            # La referencia a `graph` mantiene vivas sus variables
+            return graph.serve(images)
+
+        # Primera llamada aquí: si XLA no puede compilar, falla antes de procesar frames
+        shape = [dim or 64 for dim in self.input_signature(keras_model)[0].shape[1:]]
+        serve(tf.zeros([1] + shape, dtype=tf.float32))
+        self.loaded[model_fingerprint] = serve
+        return serve
+
+class CompiledKerasModel:
+    """Red Keras cuyo paso hacia adelante usa un grafo de CompiledGraphCache
+
+    Devuelve las mismas salidas que el modelo original, así que SLEAP sigue
+    eligiendo la cabeza, recortando y buscando picos como siempre. Los demás
+    atributos se delegan al modelo Keras.
+    """
+    def __init__(self, keras_model, function):
+        self.keras_model = keras_model
+        self.function = function
+
+    def __call__(self, inputs, training=False):
+        import tensorflow as tf
+
+        return self.function(tf.cast(inputs, tf.float32))
+
+    def predict_on_batch(self, inputs):
+        import tensorflow as tf
+
+        outputs = self.function(tf.convert_to_tensor(inputs, dtype=tf.float32))
+        if isinstance(outputs, (list, tuple)):
+            return [np.asarray(output) for output in outputs]
+        return np.asarray(outputs)
+
+    def __getattr__(self, name):
+        if name == 'keras_model':
+            raise AttributeError(name)
+        return getattr(self.keras_model, name)
+
+def attach_compiled_graphs(predictor, model_paths, graph_cache=None):
+    """Ejecutar las redes de un predictor top-down de SLEAP con grafos compilados
+
+    Solo se reemplaza el paso hacia adelante (model.keras_model); el
+    preprocesado, los recortes y la búsqueda de picos siguen siendo los de
+    SLEAP. Un modelo que no se pueda compilar sigue con Keras. Devuelve el
+    número de modelos compilados.
+    """
+    try:
+        graph_cache = graph_cache or CompiledGraphCache()
+    except Exception as e:
+        logging.warning(f"Caché de grafos compilados no disponible: {e}")
+        return 0
+
+    attached = 0
+    for model, model_path in zip((predictor.centroid_model, predictor.confmap_model), model_paths):
+        if model is None:
+            continue
+        try:
+            function = graph_cache.get(model.keras_model, compute_model_fingerprint({'model': model_path}))
+        except Exception as e:
+            logging.warning(f"Grafo compilado no disponible para {Path(model_path).name}, se usa Keras: {e}")
+            continue
+        model.keras_model = CompiledKerasModel(model.keras_model, function)
+        attached += 1
+
+    if attached and hasattr(predictor, '_initialize_inference_model'):
+        # Reconstruir las capas de inferencia con las redes compiladas
+        predictor._initialize_inference_model()
+    return attached
+
+def confmap_output_index(keras_model, head_name):
+    """Índice de la salida de mapas de confianza (los modelos pueden tener cabezas de offsets)"""
+    for index, name in enumerate(getattr(keras_model, 'output_names', None) or []):
+        if head_name in name:
+            return index
+    return 0
+
+class ProxyTopDownRunner:
+    """Inferencia top-down de SLEAP con la pasada de centroides sobre un proxy reducido
+
+    El modelo de centroides se entrenó con `input_scaling` < 1. En lugar de que
+    cada lote de frames completos se reescale dentro del grafo, la etapa de
+    decodificación genera el proxy una sola vez por frame con el mismo
+    preprocesado de la capa CentroidCrop del predictor (color, float,
+    reescalado bilineal y relleno). El proxy solo existe en memoria, lote a
+    lote; no se escribe a disco.
+
+    La búsqueda de centroides, los recortes del frame original y la capa
+    FindInstancePeaks son los de SLEAP, así que las coordenadas y los puntajes
+    coinciden con predictor.predict. Sin modelo de instancia (modo solo
+    centroides) cada centroide es una instancia de un nodo.
+    """
+    def __init__(self, predictor, batch_size=4):
+        from sleap.nn.inference import CentroidCrop
+
+        class ProxyCentroidCrop(CentroidCrop):
+            """CentroidCrop que recibe el proxy ya preprocesado"""
+            def preprocess(self, imgs):
+                return imgs
+
+        self.centroid_layer = predictor.inference_model.centroid_crop
+        self.proxy_scale = float(self.centroid_layer.input_scale)
+        # Los recortes se toman después del frame original: aquí basta un recorte de 1 px
+        self.proxy_layer = ProxyCentroidCrop(
+            keras_model=self.centroid_layer.keras_model,
+            crop_size=1,
+            input_scale=self.centroid_layer.input_scale,
+            pad_to_stride=self.centroid_layer.pad_to_stride,
+            output_stride=self.centroid_layer.output_stride,
+            peak_threshold=self.centroid_layer.peak_threshold,
+            refinement=self.centroid_layer.refinement,
+            integral_patch_size=self.centroid_layer.integral_patch_size,
+            confmaps_ind=self.centroid_layer.confmaps_ind,
+            offsets_ind=self.centroid_layer.offsets_ind,
+            return_crops=False,
+            max_instances=self.centroid_layer.max_instances,
+            ensure_grayscale=self.centroid_layer.ensure_grayscale
+        )
+
+        if predictor.confmap_model is not None:
+            self.instance_layer = predictor.inference_model.instance_peaks
+            self.crop_size = int(self.centroid_layer.crop_size)
+            self.skeleton = predictor.confmap_config.data.labels.skeletons[0]
+        else:
+            self.instance_layer = None
+            anchor_part = predictor.centroid_config.model.heads.centroid.anchor_part
+            self.skeleton = sleap.Skeleton.from_names_and_edge_inds([anchor_part or "centroid"])
+        self.batch_size = batch_size
+        self.placeholder_video = sleap.Video.from_numpy(np.zeros((1, 1, 1, 1), dtype=np.uint8))
+
+    def make_proxy(self, frames):
+        """Proxy de un lote de frames (N, H, W, C): la entrada exacta de la red de centroides"""
+        return self.centroid_layer.preprocess(frames).numpy()
+
+    def crop_instances(self, frames, centroids, centroid_vals):
+        """Recortes centrados del frame original, como en CentroidCrop de SLEAP"""
+        import tensorflow as tf
+        from sleap.nn.data.instance_cropping import make_centered_bboxes
+        from sleap.nn.peak_finding import crop_bboxes
+
+        points = centroids.flat_values
+        sample_inds = tf.cast(centroids.value_rowids(), tf.int32)
+        bboxes = make_centered_bboxes(points, self.crop_size, self.crop_size)
+        crops = crop_bboxes(tf.convert_to_tensor(frames), bboxes, sample_inds)
+        crops = tf.reshape(crops, [-1, self.crop_size, self.crop_size, frames.shape[3]])
+        return {
+            'crops': tf.RaggedTensor.from_value_rowids(crops, sample_inds, nrows=len(frames)),
+            'crop_offsets': tf.RaggedTensor.from_value_rowids(points - self.crop_size / 2, sample_inds,
+                                                              nrows=len(frames)),
+            'centroids': centroids,
+            'centroid_vals': centroid_vals
+        }
+
+    def predict(self, frames, proxy_frames=None):
+        """Predecir un lote de frames; devuelve sleap.Labels con índices relativos al lote"""
+        if proxy_frames is None:
+            proxy_frames = self.make_proxy(frames)
+
+        labeled_frames = []
+        for offset in range(0, len(frames), self.batch_size):
+            batch = frames[offset:offset + self.batch_size]
+            found = self.proxy_layer(proxy_frames[offset:offset + self.batch_size])
+            centroids, centroid_vals = found['centroids'], found['centroid_vals']
+
+            if self.instance_layer is None:
+                peaks = [centroids[i].numpy()[:, np.newaxis] for i in range(len(batch))]
+                peak_vals = [centroid_vals[i].numpy()[:, np.newaxis] for i in range(len(batch))]
+            elif centroids.flat_values.shape[0]:
+                result = self.instance_layer(self.crop_instances(batch, centroids, centroid_vals))
+                peaks = [result['instance_peaks'][i].numpy() for i in range(len(batch))]
+                peak_vals = [result['instance_peak_vals'][i].numpy() for i in range(len(batch))]
+            else:
+                continue
+
+            for i in range(len(batch)):
+                instances = [
+                    sleap.PredictedInstance.from_numpy(points=points, point_confidences=confidences,
+                                                       instance_score=score, skeleton=self.skeleton)
+                    for points, confidences, score in zip(peaks[i], peak_vals[i], centroid_vals[i].numpy())
+                    if not np.isnan(points).all()
+                ]
+                if instances:
+                    labeled_frames.append(sleap.LabeledFrame(video=self.placeholder_video,
+                                                             frame_idx=offset + i, instances=instances))
+
+        return sleap.Labels(labeled_frames=labeled_frames)
+
+class StagedPredictionPipeline:
+    """Pipeline de predicción en tres etapas: decodificación → inferencia → escritura
+
+    Un pool de hilos decodifica lotes de frames (cada hilo con su propio lector
+    de video) en una cola acotada; la etapa de inferencia los consume y pasa
+    las instancias a un hilo escritor que asigna índices reales, aplica el
+    tracking y serializa el .slp. Cada etapa expone profundidad de cola y
+    tiempo acumulado para identificar el cuello de botella.
+    """
+    def __init__(self, predictor, video_path, frame_indices, tracker=None, decode_threads=None,
+                 batch_frames=None, prefetch_batches=None, report=None, report_interval=2.0,
+                 interpolate_stride=None, provenance=None, roi=None, make_proxy=None):
+        self.predictor = predictor
+        self.video_path = str(video_path)
+        self.frame_indices = list(frame_indices)
+        self.tracker = tracker
+        self.interpolate_stride = interpolate_stride
+        self.provenance = provenance or {}
+        self.roi = tuple(roi) if roi else None
+        self.make_proxy = make_proxy
+        self.decode_threads = decode_threads or DECODE_THREADS
+        self.batch_frames = batch_frames or DECODE_BATCH_FRAMES
+        self.prefetch_batches = prefetch_batches or PREFETCH_BATCHES
+        self.report = report
+        self.report_interval = report_interval
+
+        self.local = threading.local()
+        self.stats_lock = threading.Lock()
+        self.stats = {'decode_s': 0.0, 'infer_s': 0.0, 'infer_wait_s': 0.0, 'write_s': 0.0,
+                      'write_wait_s': 0.0}
+        self.ready_batches = deque()
+        self.write_queue = queue.Queue(maxsize=self.prefetch_batches)
+        self.output_frames = []
+        self.writer_error = None
+        self.aborted = False
+
+    def decode_batch(self, indices):
+        """Etapa 1: decodificar un lote de frames con el lector del hilo"""
+        video = getattr(self.local, 'video', None)
+        if video is None:
+            video = self.local.video = sleap.load_video(self.video_path)
+
+        start = time.perf_counter()
+        frames = video.get_frames(indices)
+        if self.roi:
+            # La inferencia solo ve la región de la arena
+            x, y, w, h = self.roi
+            frames = np.ascontiguousarray(frames[:, y:y + h, x:x + w])
+        # Proxy reducido para la pasada de centroides, generado una sola vez por frame
+        proxy = self.make_proxy(frames) if self.make_proxy else None
+        with self.stats_lock:
+            self.stats['decode_s'] += time.perf_counter() - start
+        return indices, frames, proxy
+
+    def writer_thread(self, video, output_path):
+        """Etapa 3: asignar índices reales, aplicar tracking y serializar
+
+        El tracker recibe cada frame decodificado (los trackers de flujo
+        óptico lo necesitan) y trabaja en coordenadas del recorte; las
+        instancias se trasladan al frame completo después. Al terminar se
+        aplica su pasada final, como en el predictor de SLEAP.
+        """
+        finished = False
+        try:
+            while True:
+                item = self.write_queue.get()
+                if item is None:
+                    finished = True
+                    break
+
+                start = time.perf_counter()
+                indices, frames, labels = item
+                for labeled_frame in sorted(labels.labeled_frames, key=lambda lf: lf.frame_idx):
+                    frame_idx = int(indices[labeled_frame.frame_idx])
+                    instances = labeled_frame.instances
+                    if self.tracker is not None:
+                        instances = self.tracker.track(untracked_instances=instances,
+                                                       img=frames[labeled_frame.frame_idx], t=frame_idx)
+                    if self.roi:
+                        instances = [offset_instance(inst, self.roi[0], self.roi[1]) for inst in instances]
+                    self.output_frames.append(sleap.LabeledFrame(video=video, frame_idx=frame_idx,
+                                                                 instances=instances))
+                with self.stats_lock:
+                    self.stats['write_s'] += time.perf_counter() - start
+
+            if self.aborted:
+                return
+
+            start = time.perf_counter()
+            if self.tracker is not None and hasattr(self.tracker, 'final_pass'):
+                self.tracker.final_pass(self.output_frames)
+            interpolated = []
+            if self.interpolate_stride and self.interpolate_stride > 1:
+                self.output_frames, interpolated = interpolate_prediction_gaps(self.output_frames,
+                                                                               self.interpolate_stride)
+            labels = sleap.Labels(labeled_frames=self.output_frames)
+            labels.provenance.update(self.provenance)
+            if interpolated:
+                labels.provenance['cinbehave_interpolated_frames'] = compact_frame_ranges(interpolated)
+            labels.save(str(output_path))
+            with self.stats_lock:
+                self.stats['write_s'] += time.perf_counter() - start
+        except Exception as e:
+            self.writer_error = e
+            # Vaciar la cola para no bloquear la etapa de inferencia (hasta el
+            # centinela, salvo que ya se haya recibido: fallo al guardar)
+            while not finished:
+                finished = self.write_queue.get() is None
+
+    def stage_snapshot(self):
+        """Profundidad de colas, tiempos por etapa y etapa limitante"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['decode_queue'] = sum(1 for future in self.ready_batches if future.done())
+        stats['write_queue'] = self.write_queue.qsize()
+
+        # Si la inferencia espera frames, manda la decodificación; si espera a la cola
+        # de escritura, manda el escritor; si no, el modelo
+        if stats['infer_wait_s'] > 0.2 * max(stats['infer_s'], 1e-9):
+            stats['bottleneck'] = 'decode'
+        elif stats['write_wait_s'] > 0.2 * max(stats['infer_s'], 1e-9):
+            stats['bottleneck'] = 'write'
+        else:
+            stats['bottleneck'] = 'infer'
+        return stats
+
+    def run(self, output_path):
+        """Ejecutar el pipeline completo y devolver el número de frames con predicciones"""
+        video = sleap.load_video(self.video_path)
+        writer = threading.Thread(target=self.writer_thread, args=(video, output_path), daemon=True)
+        writer.start()
+
+        batches = [self.frame_indices[i:i + self.batch_frames]
+                   for i in range(0, len(self.frame_indices), self.batch_frames)]
+        n_total = len(self.frame_indices)
+        n_processed = 0
+        t0 = time.perf_counter()
+        last_report = t0
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.decode_threads) as pool:
+                pending = iter(batches)
+                for indices in itertools.islice(pending, self.prefetch_batches):
+                    self.ready_batches.append(pool.submit(self.decode_batch, indices))
+
+                while self.ready_batches:
+                    # Etapa 2: inferencia sobre el siguiente lote decodificado
+                    wait_start = time.perf_counter()
+                    indices, frames, proxy = self.ready_batches.popleft().result()
+                    infer_start = time.perf_counter()
+
+                    next_indices = next(pending, None)
+                    if next_indices is not None:
+                        self.ready_batches.append(pool.submit(self.decode_batch, next_indices))
+
+                    if proxy is not None:
+                        labels = self.predictor.predict(frames, proxy_frames=proxy)
+                    else:
+                        labels = self.predictor.predict(frames)
+                    infer_end = time.perf_counter()
+
+                    if self.writer_error is not None:
+                        raise self.writer_error
+                    # Los frames solo viajan al escritor si hay tracker (p.ej. de flujo óptico)
+                    self.write_queue.put((indices, frames if self.tracker is not None else None, labels))
+
+                    with self.stats_lock:
+                        self.stats['infer_wait_s'] += infer_start - wait_start
+                        self.stats['infer_s'] += infer_end - infer_start
+                        self.stats['write_wait_s'] += time.perf_counter() - infer_end
+
+                    n_processed += len(indices)
+                    now = time.perf_counter()
+                    if self.report is not None and now - last_report >= self.report_interval:
+                        rate = n_processed / (now - t0)
+                        self.report({
+                            'n_processed': n_processed,
+                            'n_total': n_total,
+                            'rate': rate,
+                            'eta': (n_total - n_processed) / rate if rate else 0.0,
+                            'stages': self.stage_snapshot()
+                        })
+                        last_report = now
+        except BaseException:
+            # No publicar un .slp parcial
+            self.aborted = True
+            raise
+        finally:
+            self.write_queue.put(None)
+            writer.join()
+
+        if self.writer_error is not None:
+            raise self.writer_error
+
+        stats = self.stage_snapshot()
+        logging.info(f"Etapas {Path(self.video_path).name}: decodificación {stats['decode_s']:.1f}s, "
+                     f"inferencia {stats['infer_s']:.1f}s (espera {stats['infer_wait_s']:.1f}s), "
+                     f"escritura {stats['write_s']:.1f}s, limitante: {stats['bottleneck']}")
+        return len(self.output_frames)
+
+def run_sleap_worker(centroid_path, centered_instance_path=None, cores=None, threads=None, params=None):
+    """Bucle principal del proceso worker de inferencia SLEAP"""
+    # Reservar stdout para el canal IPC; cualquier salida de SLEAP/TensorFlow va a stderr
+    ipc_out = os.fdopen(os.dup(sys.stdout.fileno()), 'w', buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def send(message):
+        ipc_out.write(json.dumps(message) + "\n")
+        ipc_out.flush()
+
+    if not SLEAP_AVAILABLE:
+        send({'event': 'error', 'message': "SLEAP no está instalado"})
+        return 1
+
+    configure_worker_cpu(cores, threads)
+
+    params = params or {}
+    model_paths = [str(centroid_path)]
+    # Modo solo centroides: se omite el modelo de instancia centrada
+    if centered_instance_path and not params.get('centroid_only'):
+        model_paths.append(str(centered_instance_path))
+    try:
+        # El tracking se aplica en la etapa de escritura con los índices reales de frame
+        predictor = sleap.load_model(model_paths, **build_predictor_kwargs(dict(params, tracker=None)))
+        predictor.verbosity = "none"
+        if params.get('compiled_graphs'):
+            attach_compiled_graphs(predictor, model_paths)
+        if params.get('proxy_centroid'):
+            predictor = ProxyTopDownRunner(predictor, batch_size=int(params.get('batch_size', 4)))
+            logging.info(f"Pasada de centroides sobre proxy a escala {predictor.proxy_scale}")
+    except Exception as e:
+        send({'event': 'error', 'message': f"Error cargando modelos SLEAP: {e}"})
+        return 1
+
+    send({'event': 'ready', 'pid': os.getpid()})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request = json.loads(line)
+        command = request.get('command')
+        if command == 'shutdown':
+            break
+        if command == 'benchmark':
+            try:
+                results = benchmark_batch_sizes(model_paths, request['video'], request['candidates'],
+                                                request['sample_frames'], params)
+                send({'event': 'done', 'id': request['id'], 'results': results})
+            except Exception as e:
+                send({'event': 'failed', 'id': request['id'], 'message': str(e)})
+            continue
+        if command != 'predict':
+            continue
+
+        def report(progress, request_id=request['id']):
+            send(dict(progress, event='progress', id=request_id))
+
+        log_path = request.get('log') or os.devnull
+        try:
+            with redirect_job_output(log_path):
+                if request.get('frames'):
+                    start, end = request['frames']
+                else:
+                    start, end = 0, sleap.load_video(request['video']).num_frames
+
+                # Vista previa: inferencia cada `stride` frames, el resto se interpola
+                stride = int(request.get('stride') or 1)
+                provenance = {'cinbehave_preview': True, 'cinbehave_preview_stride': stride} if stride > 1 else {}
+
+                pipeline = StagedPredictionPipeline(predictor, request['video'], range(start, end, stride),
+                                                    tracker=build_tracker(params), report=report,
+                                                    interpolate_stride=stride, provenance=provenance,
+                                                    roi=request.get('roi'),
+                                                    make_proxy=getattr(predictor, 'make_proxy', None))
+                labeled_frames = pipeline.run(request['output'])
+            send({'event': 'done', 'id': request['id'], 'frames': labeled_frames})
+        except Exception as e:
+            logging.error(f"Error en worker SLEAP con {request['video']}: {e}")
+            send({'event': 'failed', 'id': request['id'], 'message': str(e)})
+
+    return 0
+
+def compute_video_fingerprint(video_path, sample_size=1024 * 1024):
+    """Huella rápida de un video: tamaño, mtime y hash de bloques muestreados"""
+    video_path = Path(video_path)
+    stat = video_path.stat()
+    digest = hashlib.sha256(str(stat.st_size).encode())
+
+    with open(video_path, 'rb') as f:
+        # Inicio, mitad y final del archivo
+        for offset in sorted({0, max(0, stat.st_size // 2 - sample_size // 2),
+                              max(0, stat.st_size - sample_size)}):
+            f.seek(offset)
+            digest.update(f.read(sample_size))
+
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'sample_sha256': digest.hexdigest()
+    }
+
+FILE_HASH_LOCK = threading.Lock()
+
+def cached_file_sha256(file_path, cache_path=None):
+    """SHA-256 de un archivo, reutilizado (cache/file_hashes.json) mientras no cambien tamaño ni mtime"""
+    file_path = Path(file_path).resolve()
+    cache_path = Path(cache_path) if cache_path else Path("cache") / "file_hashes.json"
+    stat_result = file_path.stat()
+    signature = [stat_result.st_size, stat_result.st_mtime_ns]
+
+    with FILE_HASH_LOCK:
+        try:
+            with open(cache_path, 'r') as f:
+                hashes = json.load(f)
+        except (OSError, ValueError):
+            hashes = {}
+        entry = hashes.get(str(file_path))
+        if entry and entry['signature'] == signature:
+            return entry['sha256']
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        hashes[str(file_path)] = {'signature': signature, 'sha256': digest.hexdigest()}
+        # Solo archivos que siguen existiendo
+        hashes = {path: entry for path, entry in hashes.items() if os.path.exists(path)}
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(hashes, f, indent=2)
+        os.replace(tmp_path, cache_path)
+        return digest.hexdigest()
+
+def compute_model_fingerprint(models_info):
+    """Huella de los modelos: configuración y pesos de cada modelo
+
+    Los pesos se hashean una vez por versión del archivo (ver
+    cached_file_sha256), así que calcularla en el hilo de Tk no bloquea.
+    """
+    digest = hashlib.sha256()
+
+    for model_name in sorted(models_info):
+        model_path = Path(models_info[model_name])
+        digest.update(model_name.encode())
+
+        if model_path.is_dir():
+            files = sorted(p for p in model_path.iterdir()
+                           if p.name == 'training_config.json' or p.suffix == '.h5')
+        else:
+            files = [model_path] if model_path.exists() else []
+
+        for file_path in files:
+            digest.update(file_path.name.encode())
+            digest.update(cached_file_sha256(file_path).encode())
+
+    return digest.hexdigest()
+
+def get_video_frame_count(video_path):
+    """Número de frames de un video (0 si no se puede determinar)"""
+    try:
+        import cv2
+        capture = cv2.VideoCapture(str(video_path))
+        try:
+            return int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        finally:
+            capture.release()
+    except ImportError:
+        pass
+
+    try:
+        return sleap.load_video(str(video_path)).num_frames if SLEAP_AVAILABLE else 0
+    except Exception as e:
+        logging.warning(f"No se pudo leer el número de frames de {video_path}: {e}")
+        return 0
+
+def get_video_resolution(video_path):
+    """Ancho y alto de un video ((0, 0) si no se puede determinar)"""
+    try:
+        import cv2
+        capture = cv2.VideoCapture(str(video_path))
+        try:
+            return int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        finally:
+            capture.release()
+    except ImportError:
+        pass
+
+    try:
+        if SLEAP_AVAILABLE:
+            _, height, width, _ = sleap.load_video(str(video_path)).shape
+            return width, height
+    except Exception as e:
+        logging.warning(f"No se pudo leer la resolución de {video_path}: {e}")
+    return 0, 0
+
+def skeleton_node_names(skeleton):
+    """Nombres de los nodos de un esqueleto serializado con jsonpickle
+
+    Los nodos aparecen completos la primera vez que se referencian en
+    `links` y después como {"py/id": n}, numerados por orden de aparición
+    de cada objeto; `nodes` solo guarda esas referencias.
+    """
+    objects = []
+
+    def walk(value):
+        if isinstance(value, dict):
+            if 'py/object' in value or 'py/reduce' in value:
+                state = value.get('py/state', {}) if value.get('py/object') == 'sleap.skeleton.Node' else {}
+                objects.append(state.get('py/tuple', [None])[0] if isinstance(state, dict) else None)
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    walk(skeleton.get('links', []))
+    names = []
+    for node in skeleton.get('nodes', []):
+        ref = node.get('id', {})
+        if 'py/id' in ref and ref['py/id'] <= len(objects):
+            names.append(objects[ref['py/id'] - 1])
+        else:
+            names.append(ref.get('py/state', {}).get('py/tuple', [None])[0])
+    return [name for name in names if name]
+
+class ModelRegistry:
+    """Índice compacto de metadatos de modelos SLEAP (config/model_index.json)
+
+    training_config.json pesa ~95 KB, casi todo listas de índices de
+    entrenamiento; aquí se guarda solo lo que usa CinBehave y se vuelve a
+    leer el archivo únicamente si cambió su mtime.
+    """
+    CONFIG_FILENAMES = ("training_config.json", "initial_config.json")
+
+    def __init__(self, index_path=None):
+        self.index_path = Path(index_path) if index_path else Path("config") / "model_index.json"
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        """Cargar índice de modelos"""
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.warning(f"Índice de modelos ilegible: {e}")
+        return {}
+
+    def save_index(self, index):
+        """Guardar índice de forma atómica"""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    @classmethod
+    def config_path(cls, model_path):
+        """training_config.json del modelo (initial_config.json si no existe)"""
+        for filename in cls.CONFIG_FILENAMES:
+            config_path = Path(model_path) / filename
+            if config_path.exists():
+                return config_path
+        return None
+
+    @staticmethod
+    def extract_metadata(config):
+        """Campos del índice a partir de una configuración de entrenamiento"""
+        data = config.get('data', {})
+        labels = data.get('labels', {})
+        heads = config.get('model', {}).get('heads', {})
+        model_type, head = next(((name, value) for name, value in heads.items() if value), (None, {}))
+        skeletons = labels.get('skeletons') or []
+        nodes = skeleton_node_names(skeletons[0]) if skeletons else []
+
+        return {
+            'name': config.get('name'),
+            'model_type': model_type,
+            'skeleton': nodes,
+            'anchor_part': head.get('anchor_part'),
+            'input_scaling': data.get('preprocessing', {}).get('input_scaling') or 1.0,
+            'crop_size': data.get('instance_cropping', {}).get('crop_size'),
+            'output_stride': head.get('output_stride'),
+            'sigma': head.get('sigma'),
+            'training_frames': len(labels.get('training_inds') or []),
+            'validation_frames': len(labels.get('validation_inds') or []),
+            'sleap_version': config.get('sleap_version')
+        }
+
+    def get(self, model_path):
+        """Metadatos de un modelo ({} si no tiene configuración); re-lee solo si cambió"""
+        config_path = self.config_path(model_path) if model_path else None
+        if config_path is None:
+            return {}
+
+        key = str(Path(model_path).resolve())
+        mtime_ns = config_path.stat().st_mtime_ns
+        with self.lock:
+            index = self.load_index()
+            entry = index.get(key)
+            if entry and entry['config'] == config_path.name and entry['mtime_ns'] == mtime_ns:
+                return entry['metadata']
+
+            try:
+                with open(config_path, 'r') as f:
+                    metadata = self.extract_metadata(json.load(f))
+            except (OSError, ValueError) as e:
+                logging.warning(f"No se pudo leer {config_path}: {e}")
+                return {}
+            index[key] = {'config': config_path.name, 'mtime_ns': mtime_ns, 'metadata': metadata}
+            self.save_index(index)
+        return metadata
+
+    def prune(self):
+        """Quitar del índice los modelos que ya no existen"""
+        with self.lock:
+            index = self.load_index()
+            existing = {key: entry for key, entry in index.items() if Path(key).exists()}
+            if len(existing) != len(index):
+                self.save_index(existing)
+
+# Métricas resumidas del panel de evaluación (clave de SLEAP → etiqueta)
+EVALUATION_METRICS = (
+    ('oks_voc.mAP', "OKS mAP"),
+    ('oks.mOKS', "OKS medio"),
+    ('pck.mPCK', "PCK medio"),
+    ('vis.precision', "Precisión visibilidad"),
+    ('vis.recall', "Recall visibilidad"),
+    ('dist.avg', "Distancia media (px)"),
+    ('dist.p50', "Distancia p50 (px)"),
+    ('dist.p90', "Distancia p90 (px)"),
+    ('dist.p95', "Distancia p95 (px)"),
+)
+NODE_DISTANCE_PERCENTILES = (50, 90, 95)
+
+def summarize_metrics(metrics, node_names=None):
+    """Resumen de un dict de métricas de SLEAP: escalares y percentiles de distancia por nodo"""
+    summary = {}
+    for key, _ in EVALUATION_METRICS:
+        value = metrics.get(key)
+        if value is not None and np.ndim(value) == 0:
+            summary[key] = float(value)
+
+    dists = metrics.get('dist.dists')
+    if dists is not None and np.size(dists):
+        dists = np.asarray(dists, dtype=float).reshape(len(dists), -1)
+        percentiles = np.nanpercentile(dists, NODE_DISTANCE_PERCENTILES, axis=0)
+        if not node_names or len(node_names) != dists.shape[1]:
+            node_names = [f"Nodo {i + 1}" for i in range(dists.shape[1])]
+        summary['node_distances'] = {
+            name: {f"p{p}": float(percentiles[i, node]) for i, p in enumerate(NODE_DISTANCE_PERCENTILES)}
+            for node, name in enumerate(node_names)
+        }
+    return summary
+
+def read_training_log(log_path):
+    """Curvas de pérdida de training_log.csv ({'epoch', 'loss', 'val_loss'})"""
+    curves = {'epoch': [], 'loss': [], 'val_loss': []}
+    with open(log_path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            for key in curves:
+                try:
+                    curves[key].append(float(row[key]))
+                except (KeyError, TypeError, ValueError):
+                    curves[key].append(None)
+    return curves
+
+class ModelEvaluationIndex:
+    """Resúmenes de evaluación por modelo (config/model_metrics.json)
+
+    metrics.<split>.npz guarda un único dict serializado, así que no se puede
+    leer por partes: se carga solo la primera vez que se consulta un modelo,
+    se resume (métricas escalares y percentiles por nodo) junto con las
+    curvas de training_log.csv y las siguientes consultas y comparaciones
+    leen únicamente el resumen. Se recalcula si cambia el mtime de algún
+    archivo de origen.
+    """
+    SPLITS = ('train', 'val')
+    LOG_FILENAME = "training_log.csv"
+
+    def __init__(self, index_path=None, registry=None):
+        self.index_path = Path(index_path) if index_path else Path("config") / "model_metrics.json"
+        self.registry = registry or ModelRegistry()
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        """Cargar resúmenes guardados"""
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.warning(f"Índice de métricas ilegible: {e}")
+        return {}
+
+    def save_index(self, index):
+        """Guardar índice de forma atómica"""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def source_files(self, model_path):
+        files = [Path(model_path) / f"metrics.{split}.npz" for split in self.SPLITS]
+        return [p for p in files + [Path(model_path) / self.LOG_FILENAME] if p.exists()]
+
+    def get(self, model_path):
+        """Resumen de evaluación de un modelo; solo carga los .npz si no hay resumen vigente"""
+        model_path = Path(model_path)
+        key = str(model_path.resolve())
+        mtimes = {p.name: p.stat().st_mtime_ns for p in self.source_files(model_path)}
+        entry = self.load_index().get(key)
+        if entry and entry['mtimes'] == mtimes:
+            return entry['summary']
+
+        node_names = self.registry.get(model_path).get('skeleton')
+        summary = {}
+        complete = True
+        for split in self.SPLITS:
+            metrics_path = model_path / f"metrics.{split}.npz"
+            if metrics_path.name in mtimes:
+                try:
+                    summary[split] = summarize_metrics(sleap.load_metrics(str(model_path), split=split),
+                                                       node_names)
+                except Exception as e:
+                    logging.warning(f"No se pudieron leer las métricas de {metrics_path}: {e}")
+                    complete = False
+        if self.LOG_FILENAME in mtimes:
+            summary['curves'] = read_training_log(model_path / self.LOG_FILENAME)
+
+        # Un resumen incompleto (p. ej. sin SLEAP instalado) no se guarda: se reintenta
+        if not complete:
+            return summary
+        with self.lock:
+            index = self.load_index()
+            index[key] = {'mtimes': mtimes, 'summary': summary}
+            self.save_index(index)
+        return summary
+
+def discover_model_dirs():
+    """Modelos conocidos: los incluidos con CinBehave y los del almacén compartido"""
+    base_dir = Path(__file__).resolve().parent
+    model_dirs = [base_dir / name for name in BUNDLED_MODEL_DIRS if (base_dir / name).is_dir()]
+    store = ModelStore()
+    index = store.load_index()
+    for model_hash, entry in index['models'].items():
+        model_path = store.model_path(model_hash, index)
+        if entry['kind'] == 'dir' and model_path.is_dir():
+            model_dirs.append(model_path)
+    return model_dirs
+
+def estimate_job_memory(models_info, width, height, batch_size, max_instances=None):
+    """Estimación del pico de RSS de un worker para una resolución y tamaño de lote
+
+    Suma el runtime de TensorFlow, los pesos de ambos modelos, los buffers
+    de decodificación del pipeline y las activaciones de una pasada de
+    centroides (a input_scaling) y de instancias (recortes crop_size).
+    """
+    if not width or not height:
+        return WORKER_MEMORY_ESTIMATE
+
+    weights = 0
+    for model_path in models_info.values():
+        model_path = Path(model_path)
+        if model_path.is_dir():
+            weights += sum(p.stat().st_size for p in model_path.glob("*.h5"))
+
+    registry = ModelRegistry()
+    input_scaling = registry.get(models_info.get('centroid')).get('input_scaling') or 1.0
+    crop_size = registry.get(models_info.get('centered_instance')).get('crop_size') or 0
+
+    frame_bytes = width * height * 3
+    decode = frame_bytes * DECODE_BATCH_FRAMES * (PREFETCH_BATCHES + DECODE_THREADS + 2)
+    centroid = width * height * input_scaling ** 2 * 4 * batch_size * ACTIVATION_BYTES_FACTOR
+    instances = crop_size ** 2 * 4 * batch_size * (max_instances or 1) * ACTIVATION_BYTES_FACTOR
+
+    return int(TF_RUNTIME_BYTES + 4 * weights + decode + centroid + instances)
+
+def process_rss(pid):
+    """RSS actual de un proceso (0 si ya no existe)"""
+    try:
+        return psutil.Process(pid).memory_info().rss
+    except (psutil.Error, TypeError):
+        return 0
+
+class MemoryProfile:
+    """Picos de memoria observados por modelo, resolución y lote (config/memory_profile.json)"""
+    def __init__(self, profile_path=None):
+        self.profile_path = Path(profile_path) if profile_path else Path("config") / "memory_profile.json"
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def profile_key(model_fingerprint, width, height, batch_size):
+        return f"{model_fingerprint}|{width}x{height}|b{batch_size}"
+
+    def load(self):
+        """Cargar perfiles guardados"""
+        if self.profile_path.exists():
+            try:
+                with open(self.profile_path, 'r') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    def estimate(self, models_info, model_fingerprint, width, height, batch_size, max_instances=None):
+        """Pico aprendido con margen; si no hay historial, la estimación por configuración"""
+        entry = self.load().get(self.profile_key(model_fingerprint, width, height, batch_size))
+        if entry:
+            return int(entry['peak_rss'] * MEMORY_LEARNED_HEADROOM)
+        return estimate_job_memory(models_info, width, height, batch_size, max_instances)
+
+    def record(self, model_fingerprint, width, height, batch_size, peak_rss):
+        """Guardar el pico observado (se conserva el máximo)"""
+        if not peak_rss:
+            return
+        key = self.profile_key(model_fingerprint, width, height, batch_size)
+        with self.lock:
+            profile = self.load()
+            entry = profile.get(key, {'peak_rss': 0, 'runs': 0})
+            profile[key] = {
+                'peak_rss': max(entry['peak_rss'], int(peak_rss)),
+                'runs': entry['runs'] + 1,
+                'updated': datetime.now().isoformat()
+            }
+            try:
+                self.profile_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.profile_path, 'w') as f:
+                    json.dump(profile, f, indent=2)
+            except Exception as e:
+                logging.error(f"Error guardando perfil de memoria: {e}")
+
+class MemoryAdmissionController:
+    """Control de admisión de trabajos según la memoria disponible
+
+    Cada worker reserva su pico estimado antes de cargar modelos o empezar
+    un video. La parte de la reserva que su proceso aún no usa se descuenta
+    de `available`, para que dos workers que arrancan a la vez no cuenten
+    con la misma memoria libre. Si no alcanza, el worker espera con
+    retroceso exponencial en lugar de sobrecomprometer el equipo.
+    """
+    def __init__(self, safety_margin=MEMORY_SAFETY_MARGIN):
+        self.safety_margin = safety_margin
+        self.lock = threading.Lock()
+        self.reservations = {}
+
+    def outstanding(self, exclude=None):
+        """Memoria reservada que los procesos todavía no han ocupado"""
+        return sum(max(0, r['bytes'] - process_rss(r['pid'])) if r['pid'] else r['bytes']
+                   for key, r in self.reservations.items() if key != exclude)
+
+    def try_admit(self, key, estimate, pid=None):
+        """Reservar memoria si alcanza; devuelve True si el trabajo puede empezar"""
+        with self.lock:
+            current = process_rss(pid) if pid else 0
+            needed = max(0, estimate - current) * self.safety_margin
+            memory = psutil.virtual_memory()
+            available = memory.available - self.outstanding(exclude=key)
+
+            # Un trabajo que no cabe ni en la memoria total no debe bloquear para siempre
+            others = any(k != key for k in self.reservations)
+            too_big = estimate * self.safety_margin > memory.total
+            if needed <= available or (too_big and not others):
+                if too_big:
+                    logging.warning(f"El trabajo estima {estimate / 1024**3:.1f} GB, más que la memoria "
+                                    f"total; se ejecuta sin otros trabajos en paralelo")
+                self.reservations[key] = {'bytes': estimate, 'pid': pid}
+                return True
+            return False
+
+    def acquire(self, key, estimate, pid=None, keep_waiting=None, on_wait=None):
+        """Esperar con retroceso hasta poder reservar; False si se deja de esperar"""
+        delay = MEMORY_BACKOFF_INITIAL
+        while not self.try_admit(key, estimate, pid):
+            if keep_waiting is not None and not keep_waiting():
+                return False
+            if on_wait is not None:
+                on_wait(estimate, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, MEMORY_BACKOFF_MAX)
+        return True
+
+    def attach(self, key, pid):
+        """Asociar la reserva al proceso worker para medir lo que ya ocupa"""
+        with self.lock:
+            if key in self.reservations:
+                self.reservations[key]['pid'] = pid
+
+    def release(self, key):
+        with self.lock:
+            self.reservations.pop(key, None)
+
+# Un solo controlador por proceso: los lotes que corren a la vez comparten la memoria
+MEMORY_ADMISSION = MemoryAdmissionController()
+
+def plan_video_chunks(frame_count, num_workers):
+    """Dividir un video largo en rangos contiguos [inicio, fin) de frames
+
+    Los videos cortos no se dividen. Los largos se parten en al menos tantos
+    rangos como workers, sin bajar de MIN_CHUNK_FRAMES ni superar MAX_CHUNK_FRAMES.
+    """
+    if frame_count <= 2 * MIN_CHUNK_FRAMES:
+        return [(0, frame_count)]
+
+    num_chunks = max(math.ceil(frame_count / MAX_CHUNK_FRAMES),
+                     min(num_workers, frame_count // MIN_CHUNK_FRAMES))
+    chunk_size = math.ceil(frame_count / num_chunks)
+    return [(start, min(start + chunk_size, frame_count))
+            for start in range(0, frame_count, chunk_size)]
+
+def match_instances_by_centroid(previous_points, next_points, max_distance):
+    """Emparejar instancias entre dos frames por distancia entre centroides
+
+    Recibe listas de arreglos (nodos x 2) y devuelve pares (i_anterior, i_siguiente)
+    con asignación voraz de menor distancia.
+    """
+    candidates = []
+    for i, points_a in enumerate(previous_points):
+        centroid_a = np.nanmean(points_a, axis=0)
+        for j, points_b in enumerate(next_points):
+            distance = float(np.linalg.norm(centroid_a - np.nanmean(points_b, axis=0)))
+            if np.isfinite(distance) and distance <= max_distance:
+                candidates.append((distance, i, j))
+
+    matches = []
+    used_previous, used_next = set(), set()
+    for distance, i, j in sorted(candidates):
+        if i not in used_previous and j not in used_next:
+            matches.append((i, j))
+            used_previous.add(i)
+            used_next.add(j)
+    return matches
+
+def compute_median_background(video_path, samples=25):
+    """Frame de fondo: mediana de frames muestreados uniformemente (RGB)"""
+    import cv2
+
+    capture = cv2.VideoCapture(str(video_path))
+    try:
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        frames = []
+        for frame_idx in np.linspace(0, max(frame_count - 1, 0), num=samples).astype(int):
+            capture.set(cv2.CAP_PROP_POS_FRAMES, int(frame_idx))
+            ok, frame = capture.read()
+            if ok:
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        capture.release()
+
+    if not frames:
+        raise ValueError(f"No se pudieron leer frames de {video_path}")
+    return np.median(np.stack(frames), axis=0).astype(np.uint8)
+
+def detect_arena_roi(background, padding=0.03):
+    """Detectar la arena como la región uniforme más grande del fondo
+
+    Devuelve (x, y, ancho, alto) en píxeles del frame completo.
+    """
+    import cv2
+
+    height, width = background.shape[:2]
+    gray = cv2.cvtColor(background, cv2.COLOR_RGB2GRAY)
+    gray = cv2.GaussianBlur(gray, (9, 9), 0)
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # La arena puede ser más clara o más oscura que el entorno: usar la polaridad
+    # cuya región mayor no toque todos los bordes
+    best = None
+    for candidate in (mask, cv2.bitwise_not(mask)):
+        candidate = cv2.morphologyEx(candidate, cv2.MORPH_CLOSE, np.ones((15, 15), np.uint8))
+        contours, _ = cv2.findContours(candidate, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            continue
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        if w * h >= 0.98 * width * height:
+            continue
+        if best is None or w * h > best[2] * best[3]:
+            best = (x, y, w, h)
+
+    if best is None:
+        return (0, 0, width, height)
+
+    x, y, w, h = best
+    pad_x, pad_y = int(padding * width), int(padding * height)
+    x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+    x1, y1 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def offset_instance(instance, dx, dy):
+    """Trasladar una instancia predicha de coordenadas del recorte al frame completo"""
+    return sleap.PredictedInstance.from_numpy(
+        points=instance.numpy() + np.array([dx, dy], dtype=float),
+        point_confidences=instance.scores,
+        instance_score=instance.score,
+        skeleton=instance.skeleton,
+        track=instance.track
+    )
+
+def prediction_output_path(folder, video_path, preview=False, centroid_only=False):
+    """Ruta del .slp de un video: *_predictions.slp o *_preview.slp
+
+    Las predicciones de solo centroides usan *_centroids.slp y
+    *_centroids_preview.slp para no reemplazar las de esqueleto completo.
+    """
+    if centroid_only:
+        suffix = "_centroids_preview" if preview else "_centroids"
+    else:
+        suffix = "_preview" if preview else "_predictions"
+    return Path(folder) / f"{Path(video_path).stem}{suffix}.slp"
+
+def compact_frame_ranges(frame_indices):
+    """Comprimir índices de frame en rangos [inicio, fin) para la procedencia del .slp"""
+    ranges = []
+    for frame_idx in sorted(set(int(i) for i in frame_indices)):
+        if ranges and ranges[-1][1] == frame_idx:
+            ranges[-1][1] = frame_idx + 1
+        else:
+            ranges.append([frame_idx, frame_idx + 1])
+    return ranges
+
+def expand_frame_ranges(ranges):
+    """Índices de frame contenidos en una lista de rangos [inicio, fin)"""
+    return [frame_idx for start, end in ranges for frame_idx in range(start, end)]
+
+def interpolate_prediction_gaps(labeled_frames, max_gap):
+    """Rellenar por interpolación lineal los frames omitidos entre muestras
+
+    Solo se rellenan huecos de hasta max_gap frames; las instancias se
+    emparejan por track o, sin tracking, por cercanía de centroides.
+    Devuelve los frames y los índices interpolados, que se registran en la
+    procedencia como 'cinbehave_interpolated_frames'.
+    """
+    frames = sorted(labeled_frames, key=lambda lf: lf.frame_idx)
+    filled = []
+
+    for previous, following in zip(frames, frames[1:]):
+        gap = following.frame_idx - previous.frame_idx
+        if gap <= 1 or gap > max_gap:
+            continue
+
+        if all(inst.track is not None for inst in previous.instances + following.instances):
+            by_track = {inst.track: inst for inst in following.instances}
+            pairs = [(inst, by_track[inst.track]) for inst in previous.instances if inst.track in by_track]
+        else:
+            matches = match_instances_by_centroid([inst.numpy() for inst in previous.instances],
+                                                  [inst.numpy() for inst in following.instances],
+                                                  float('inf'))
+            pairs = [(previous.instances[i], following.instances[j]) for i, j in matches]
+        if not pairs:
+            continue
+
+        for frame_idx in range(previous.frame_idx + 1, following.frame_idx):
+            alpha = (frame_idx - previous.frame_idx) / gap
+            instances = [
+                sleap.PredictedInstance.from_numpy(
+                    points=(1 - alpha) * a.numpy() + alpha * b.numpy(),
+                    point_confidences=np.minimum(a.scores, b.scores),
+                    instance_score=min(a.score, b.score),
+                    skeleton=a.skeleton,
+                    track=a.track
+                )
+                for a, b in pairs
+            ]
+            filled.append(sleap.LabeledFrame(video=previous.video, frame_idx=frame_idx, instances=instances))
+
+    return sorted(frames + filled, key=lambda lf: lf.frame_idx), [lf.frame_idx for lf in filled]
+
+def seam_match_distance(tail_points, frame_shape):
+    """Distancia máxima para enlazar pistas en una frontera entre partes
+
+    Se usa el tamaño de las instancias del último frame (diagonal de su caja)
+    para que no dependa de la resolución; con instancias de un solo punto
+    (solo centroides) se usa una fracción de la diagonal del frame.
+    """
+    extents = []
+    for points in tail_points:
+        if np.isfinite(points).all(axis=1).sum() >= 2:
+            extents.append(float(np.linalg.norm(np.nanmax(points, axis=0) - np.nanmin(points, axis=0))))
+    if extents and max(extents) > 0:
+        return SEAM_INSTANCE_FACTOR * max(extents)
+    height, width = frame_shape
+    return SEAM_FRAME_FRACTION * math.hypot(width, height)
+
+def merge_prediction_chunks(chunk_paths, output_path, video_path, max_distance=None,
+                            interpolate_stride=None, provenance=None):
+    """Unir los .slp de cada parte en un solo archivo de predicciones
+
+    Los frames conservan su índice original en el video. Las pistas (tracks)
+    se enlazan en cada frontera emparejando el último frame de una parte con
+    el primero de la siguiente, hasta `max_distance` píxeles (por defecto
+    según seam_match_distance).
+    """
+    video = sleap.load_video(str(video_path))
+    skeleton = None
+    tracks = []
+    merged_frames = []
+    interpolated = []
+    previous_tail = []  # (puntos, track final) del último frame de la parte anterior
+
+    for chunk_path in chunk_paths:
+        chunk_labels = sleap.load_file(str(chunk_path))
+        if skeleton is None and chunk_labels.skeletons:
+            skeleton = chunk_labels.skeletons[0]
+        interpolated.extend(expand_frame_ranges(chunk_labels.provenance.get('cinbehave_interpolated_frames', [])))
+
+        frames = sorted(chunk_labels.labeled_frames, key=lambda lf: lf.frame_idx)
+        track_map = {}
+
+        if frames and previous_tail:
+            first_instances = [inst for inst in frames[0].instances if inst.track is not None]
+            tail_points = [points for points, _ in previous_tail]
+            matches = match_instances_by_centroid(
+                tail_points,
+                [inst.numpy() for inst in first_instances],
+                max_distance or seam_match_distance(tail_points, video.shape[1:3])
+            )
+            for i, j in matches:
+                track_map.setdefault(first_instances[j].track, previous_tail[i][1])
+
+        for labeled_frame in frames:
+            instances = []
+            for inst in labeled_frame.instances:
+                track = None
+                if inst.track is not None:
+                    if inst.track not in track_map:
+                        track_map[inst.track] = sleap.Track(spawned_on=labeled_frame.frame_idx,
+                                                            name=f"track_{len(tracks)}")
+                        tracks.append(track_map[inst.track])
+                    track = track_map[inst.track]
+
+                # Reconstruir con el esqueleto común a todas las partes
+                instances.append(sleap.PredictedInstance.from_numpy(
+                    points=inst.numpy(),
+                    point_confidences=inst.scores,
+                    instance_score=inst.score,
+                    skeleton=skeleton,
+                    track=track
+                ))
+            merged_frames.append(sleap.LabeledFrame(video=video, frame_idx=labeled_frame.frame_idx,
+                                                    instances=instances))
+
+        if frames:
+            previous_tail = [(inst.numpy(), inst.track) for inst in merged_frames[-1].instances
+                             if inst.track is not None]
+
+    if interpolate_stride and interpolate_stride > 1:
+        # Rellenar los huecos que quedan en las fronteras entre partes
+        merged_frames, seam_filled = interpolate_prediction_gaps(merged_frames, interpolate_stride)
+        interpolated.extend(seam_filled)
+
+    merged = sleap.Labels(labeled_frames=merged_frames, videos=[video],
+                          skeletons=[skeleton] if skeleton is not None else [], tracks=tracks)
+    if provenance:
+        merged.provenance.update(provenance)
+    if interpolated:
+        merged.provenance['cinbehave_interpolated_frames'] = compact_frame_ranges(interpolated)
+    merged.save(str(output_path))
+    return merged
+
+class BatchSizeTuner:
+    """Ajuste automático del tamaño de lote (config/batch_size_cache.json)
+
+    Mide una muestra corta del primer video con varios tamaños de lote y
+    guarda el más rápido que cabe en memoria, por equipo y par de modelos.
+    """
+    CANDIDATES = (1, 2, 4, 8, 16, 32)
+    SAMPLE_FRAMES = 128
+
+    def __init__(self, cache_path=None):
+        self.cache_path = Path(cache_path) if cache_path else Path("config") / "batch_size_cache.json"
+
+    def cache_key(self, model_fingerprint):
+        """Clave de caché: equipo + huella de los modelos"""
+        machine = f"{platform.node()}|{platform.machine()}|{psutil.cpu_count()}|" \
+                  f"{round(psutil.virtual_memory().total / (1024**3))}GB"
+        return f"{machine}|{model_fingerprint}"
+
+    def load_cache(self):
+        """Cargar caché de tamaños de lote"""
+        if self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    def get_cached(self, model_fingerprint):
+        """Tamaño de lote ya medido para este equipo y modelos"""
+        entry = self.load_cache().get(self.cache_key(model_fingerprint))
+        return entry['batch_size'] if entry else None
+
+    def tune(self, models_info, model_fingerprint, video_path, params):
+        """Devolver el tamaño de lote óptimo, midiéndolo si no está en caché"""
+        cached = self.get_cached(model_fingerprint)
+        if cached:
+            return cached
+
+        worker = SLEAPInferenceWorker(models_info, params=params)
+        try:
+            worker.start()
+            results = worker.benchmark(video_path, self.CANDIDATES, self.SAMPLE_FRAMES)
+        except Exception as e:
+            logging.warning(f"No se pudo ajustar el tamaño de lote: {e}")
+            return None
+        finally:
+            worker.stop()
+
+        if not results:
+            return None
+
+        batch_size = max(results, key=results.get)
+        cache = self.load_cache()
+        cache[self.cache_key(model_fingerprint)] = {
+            'batch_size': batch_size,
+            'fps': results,
+            'measured': datetime.now().isoformat()
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_path, 'w') as f:
+                json.dump(cache, f, indent=2)
+        except Exception as e:
+            logging.error(f"Error guardando caché de tamaño de lote: {e}")
+
+        logging.info(f"Tamaño de lote óptimo: {batch_size} ({results[batch_size]:.1f} fps)")
+        return batch_size
+
+class PredictionManifest:
+    """Manifiesto de predicciones de un proyecto (Data_Sleap/prediction_manifest.json)
+
+    Registra por video la huella del archivo, la huella de los modelos y los
+    parámetros de inferencia, para saltar videos cuyo .slp sigue vigente.
+    """
+    FILENAME = "prediction_manifest.json"
+    PREVIEW_FILENAME = "preview_manifest.json"
+    CENTROID_FILENAME = "centroid_manifest.json"
+    CENTROID_PREVIEW_FILENAME = "centroid_preview_manifest.json"
+
+    def __init__(self, data_sleap_folder, preview=False, centroid_only=False):
+        self.folder = Path(data_sleap_folder)
+        self.preview = preview
+        self.centroid_only = centroid_only
+        if centroid_only:
+            filename = self.CENTROID_PREVIEW_FILENAME if preview else self.CENTROID_FILENAME
+        else:
+            filename = self.PREVIEW_FILENAME if preview else self.FILENAME
+        self.path = self.folder / filename
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        """Cargar manifiesto existente"""
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f).get('videos', {})
+            except Exception as e:
+                logging.warning(f"Manifiesto de predicciones ilegible, se regenerará: {e}")
+        return {}
+
+    def save(self):
+        """Guardar manifiesto de forma atómica"""
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': 1, 'videos': self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def output_path(self, video_path):
+        """Ruta del archivo .slp de un video"""
+        return prediction_output_path(self.folder, video_path, preview=self.preview,
+                                      centroid_only=self.centroid_only)
+
+    def is_current(self, video_path, model_fingerprint, params, roi=None):
+        """Verificar si la predicción de un video está vigente"""
+        entry = self.entries.get(Path(video_path).name)
+        if not entry or entry.get('status') != 'success':
+            return False
+        if entry.get('model') != model_fingerprint or entry.get('params') != params:
+            return False
+        if entry.get('roi') != (list(roi) if roi else None):
+            return False
+        if not self.output_path(video_path).exists():
+            return False
+
+        stored = entry.get('video', {})
+        stat = Path(video_path).stat()
+        if stored.get('size') != stat.st_size:
+            return False
+        if stored.get('mtime') == stat.st_mtime:
+            return True
+
+        # mtime distinto (p.ej. copia nueva): comparar contenido muestreado
+        return stored.get('sample_sha256') == compute_video_fingerprint(video_path)['sample_sha256']
+
+    def pending_videos(self, videos, model_fingerprint, params, rois=None):
+        """Videos sin predicción, desactualizados o fallidos"""
+        rois = rois or {}
+        return [v for v in videos
+                if not self.is_current(v, model_fingerprint, params, rois.get(Path(v).name))]
+
+    def record(self, video_path, model_fingerprint, params, status, roi=None):
+        """Registrar el resultado de un video"""
+        try:
+            fingerprint = compute_video_fingerprint(video_path)
+        except OSError as e:
+            logging.warning(f"No se pudo calcular la huella de {video_path}: {e}")
+            fingerprint = {}
+
+        with self.lock:
+            self.entries[Path(video_path).name] = {
+                'video': fingerprint,
+                'model': model_fingerprint,
+                'params': params,
+                'roi': list(roi) if roi else None,
+                'status': status,
+                'output': str(self.output_path(video_path)),
+                'updated': datetime.now().isoformat()
+            }
+            try:
+                self.save()
+            except Exception as e:
+                logging.error(f"Error guardando manifiesto de predicciones: {e}")
+
+@contextlib.contextmanager
+def interprocess_lock(lock_path):
+    """Bloqueo exclusivo sobre un archivo, válido entre procesos y entre hilos"""
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+b') as lock_file:
+        if os.name == 'nt':
+            import msvcrt
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK se rinde tras ~10 s; seguir esperando
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+class PredictionCache:
+    """Caché de predicciones compartida entre proyectos (cache/predictions)
+
+    Cada entrada es un .slp indexado por el hash de contenido del video, la
+    huella de los modelos y los parámetros de inferencia; dos proyectos con
+    las mismas grabaciones reutilizan el resultado en lugar de repetir la
+    inferencia. El tamaño total está acotado y se desalojan primero las
+    entradas usadas hace más tiempo.
+
+    Las entradas guardan también la huella muestreada del video, para
+    descartar sin leerlo completo un video que no está en la caché. La GUI
+    y `--run-queue` comparten el índice: se modifica bajo un bloqueo de
+    archivo (index.lock).
+    """
+    INDEX_FILENAME = "index.json"
+
+    def __init__(self, cache_dir=None, max_bytes=PREDICTION_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else Path("cache") / "predictions"
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / self.INDEX_FILENAME
+        self.lock_path = self.cache_dir / "index.lock"
+
+    def make_key(self, content_hash, model_fingerprint, params, roi=None):
+        """Clave de caché: contenido del video + modelos + parámetros + ROI"""
+        payload = json.dumps({
+            'video': content_hash,
+            'model': model_fingerprint,
+            'params': params,
+            'roi': list(roi) if roi else None
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def config_key(model_fingerprint, params, roi=None):
+        """Parte de la clave que no depende del contenido del video"""
+        payload = json.dumps({'model': model_fingerprint, 'params': params,
+                              'roi': list(roi) if roi else None}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def has_candidate(self, fingerprint, config_key):
+        """True si alguna entrada coincide en huella muestreada y configuración"""
+        return any(entry.get('sample') == fingerprint['sample_sha256'] and entry['size_video'] == fingerprint['size']
+                   and entry.get('config') == config_key
+                   for entry in self.load_index().values() if 'size_video' in entry)
+
+    def load_index(self):
+        """Cargar índice de entradas"""
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.warning(f"Índice de caché de predicciones ilegible, se regenerará: {e}")
+        return {}
+
+    def save_index(self, index):
+        """Guardar índice de forma atómica"""
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def entry_path(self, key):
+        return self.cache_dir / f"{key}.slp"
+
+    def get(self, key, output_path, video_path):
+        """Materializar una entrada en output_path; devuelve False si no existe"""
+        with interprocess_lock(self.lock_path):
+            index = self.load_index()
+            if key not in index or not self.entry_path(key).exists():
+                return False
+
+            try:
+                # El .slp guardado apunta al video del proyecto que lo generó
+                labels = sleap.load_file(str(self.entry_path(key)))
+                for video in labels.videos:
+                    video.backend.filename = str(video_path)
+                tmp_path = Path(output_path).with_name(Path(output_path).stem + ".tmp.slp")
+                labels.save(str(tmp_path))
+                os.replace(tmp_path, output_path)
+            except Exception as e:
+                logging.warning(f"Entrada de caché {key[:12]} inutilizable: {e}")
+                return False
+
+            index[key]['last_used'] = time.time()
+            index[key]['hits'] = index[key].get('hits', 0) + 1
+            self.save_index(index)
+            return True
+
+    def put(self, key, slp_path, video_name=None, fingerprint=None, config_key=None):
+        """Agregar un resultado a la caché y desalojar lo menos usado si se excede el límite"""
+        with interprocess_lock(self.lock_path):
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.cache_dir / f"{key}.tmp"
+                shutil.copy2(slp_path, tmp_path)
+                os.replace(tmp_path, self.entry_path(key))
+
+                index = self.load_index()
+                index[key] = {
+                    'size': self.entry_path(key).stat().st_size,
+                    'video': video_name,
+                    'created': datetime.now().isoformat(),
+                    'last_used': time.time(),
+                    'hits': 0
+                }
+                if fingerprint is not None:
+                    index[key].update(size_video=fingerprint['size'], sample=fingerprint['sample_sha256'],
+                                      config=config_key)
+                self.evict(index)
+                self.save_index(index)
+            except Exception as e:
+                logging.error(f"Error guardando predicción en caché: {e}")
+
+    def evict(self, index):
+        """Eliminar entradas por antigüedad de uso hasta respetar max_bytes"""
+        total = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= index[key]['size']
+            del index[key]
+            try:
+                self.entry_path(key).unlink()
+            except FileNotFoundError:
+                pass
+            logging.info(f"Caché de predicciones: entrada {key[:12]} desalojada")
+
+def compute_video_content_hash(video_path, chunk_size=4 * 1024 * 1024):
+    """SHA-256 del contenido completo de un video"""
+    digest = hashlib.sha256()
+    with open(video_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_model_manifest(model_dir):
+    """Escribir model_manifest.json (ruta, tamaño y SHA-256 de cada archivo) en un modelo"""
+    model_dir = Path(model_dir)
+    files = []
+    for rel, path in ModelStore.source_files(model_dir):
+        files.append({'path': rel, 'size': path.stat().st_size, 'sha256': ModelStore.file_sha256(path)})
+    manifest = {'name': model_dir.name, 'files': files}
+    with open(model_dir / MODEL_MANIFEST_FILENAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class ModelTransferEngine:
+    """Descarga de modelos en paralelo, reanudable y verificada
+
+    Junto a cada modelo se publica un model_manifest.json con la ruta, el
+    tamaño y el SHA-256 de cada archivo (ver build_model_manifest). Los
+    archivos se descargan en paralelo a <ruta>.part dentro de un directorio
+    <modelo>.partial, continuando con Range si la descarga se interrumpió;
+    cada archivo se verifica antes de renombrarlo y el modelo se publica con
+    un único os.replace cuando está completo, así que si la ruta destino
+    existe el modelo está entero.
+    """
+
+    def __init__(self, max_workers=TRANSFER_MAX_WORKERS, chunk_size=TRANSFER_CHUNK_SIZE,
+                 retries=TRANSFER_RETRIES, timeout=300, retry_delay=2.0):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+
+    @staticmethod
+    def file_url(url, rel_path):
+        return f"{url.rstrip('/')}/{quote(rel_path)}"
+
+    def fetch_manifest(self, url):
+        """Descargar y validar el manifiesto del modelo"""
+        response = requests.get(self.file_url(url, MODEL_MANIFEST_FILENAME), timeout=self.timeout)
+        response.raise_for_status()
+        manifest = response.json()
+        for entry in manifest['files']:
+            parts = Path(entry['path']).parts
+            if Path(entry['path']).is_absolute() or '..' in parts:
+                raise ValueError(f"Ruta no válida en el manifiesto: {entry['path']}")
+        return manifest
+
+    @staticmethod
+    def is_verified(path, entry):
+        return path.exists() and path.stat().st_size == entry['size'] \
+            and ModelStore.file_sha256(path) == entry['sha256']
+
+    def fetch_part(self, file_url, part_path, size):
+        """Completar un .part, continuando desde su tamaño actual si el servidor admite Range"""
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        if offset > size:
+            part_path.unlink()
+            offset = 0
+        if offset == size:
+            return
+
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+        with requests.get(file_url, headers=headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            # 200 en lugar de 206: el servidor ignoró el Range y envía el archivo entero
+            mode = 'ab' if offset and response.status_code == 206 else 'wb'
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+
+    def download_file(self, url, entry, staging):
+        """Descargar y verificar un archivo del modelo, con reintentos"""
+        target = staging / entry['path']
+        if self.is_verified(target, entry):
+            return target
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        part_path = target.with_name(target.name + '.part')
+        file_url = self.file_url(url, entry['path'])
+        last_error = None
+        for attempt in range(1, self.retries + 1):
+            try:
+                self.fetch_part(file_url, part_path, entry['size'])
+                if part_path.stat().st_size < entry['size']:
+                    # Conexión cortada: el siguiente intento continúa desde aquí
+                    last_error = IOError(f"Descarga incompleta: {entry['path']}")
+                elif self.is_verified(part_path, entry):
+                    os.replace(part_path, target)
+                    return target
+                else:
+                    # Contenido corrupto: no se puede reanudar, se empieza de cero
+                    part_path.unlink()
+                    last_error = ValueError(f"SHA-256 no coincide: {entry['path']}")
+            except (requests.RequestException, OSError) as e:
+                last_error = e
+            logging.warning(f"Reintento {attempt}/{self.retries} de {entry['path']}: {last_error}")
+            if attempt < self.retries:
+                time.sleep(self.retry_delay * attempt)
+        raise RuntimeError(f"No se pudo descargar {entry['path']}: {last_error}")
+
+    def download_model(self, url, destination):
+        """Descargar un modelo completo y publicarlo de forma atómica en destination"""
+        destination = Path(destination)
+        if destination.exists():
+            return destination
+
+        manifest = self.fetch_manifest(url)
+        staging = destination.with_name(destination.name + '.partial')
+        staging.mkdir(parents=True, exist_ok=True)
+        total = sum(entry['size'] for entry in manifest['files'])
+        logging.info(f"Descargando {destination.name}: {len(manifest['files'])} archivos, "
+                     f"{total / 1024**2:.1f} MB")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.download_file, url, entry, staging)
+                       for entry in manifest['files']]
+            for future in as_completed(futures):
+                future.result()
+
+        os.replace(staging, destination)
+        return destination
+
+
+class ModelStore:
+    """Almacén compartido de modelos direccionado por contenido (models/store)
+
+    Cada archivo se guarda una sola vez en blobs/ por su SHA-256; un modelo
+    es la lista de sus archivos y su huella es el hash de esa lista. Los
+    modelos se exponen en models/<huella>/<nombre> con enlaces duros a los
+    blobs. Los proyectos guardan solo la huella (models.json) y el índice
+    cuenta sus referencias; los modelos sin referencias y no fijados se
+    eliminan con garbage_collect().
+
+    Los blobs son de solo lectura, así que una escritura sobre un modelo
+    expuesto falla en lugar de alterar el blob compartido; los archivos de
+    configuración (.json), que sí se editan, se exponen como copias.
+    """
+    INDEX_FILENAME = "index.json"
+    MUTABLE_SUFFIXES = ('.json',)
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else Path("models") / "store"
+        self.blobs_dir = self.root / "blobs"
+        self.models_dir = self.root / "models"
+        self.index_path = self.root / self.INDEX_FILENAME
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        """Cargar índice de modelos"""
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.warning(f"Índice del almacén de modelos ilegible: {e}")
+        return {'models': {}, 'sources': {}}
+
+    def save_index(self, index):
+        """Guardar índice de forma atómica"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def file_sha256(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def source_files(source):
+        """Archivos de un modelo (directorio) o el archivo mismo, con ruta relativa"""
+        if source.is_file():
+            return [(source.name, source)]
+        return [(p.relative_to(source).as_posix(), p) for p in sorted(source.rglob("*"))
+                if p.is_file() and p.name != MODEL_MANIFEST_FILENAME]
+
+    def source_signature(self, source):
+        """Tamaño y mtime de cada archivo: evita re-hashear un origen sin cambios"""
+        return [[rel, p.stat().st_size, p.stat().st_mtime_ns] for rel, p in self.source_files(source)]
+
+    def blob_path(self, sha256):
+        return self.blobs_dir / sha256[:2] / sha256
+
+    @staticmethod
+    def make_read_only(path):
+        os.chmod(path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+
+    @staticmethod
+    def remove_path(path):
+        """Eliminar un archivo o directorio aunque contenga archivos de solo lectura"""
+        def make_writable(func, failed_path, exc_info):
+            # En Windows no se puede borrar un archivo de solo lectura
+            os.chmod(failed_path, stat.S_IWRITE)
+            func(failed_path)
+
+        path = Path(path)
+        if path.is_dir():
+            shutil.rmtree(path, onerror=make_writable)
+        elif path.exists():
+            os.chmod(path, stat.S_IWRITE)
+            path.unlink()
+
+    def model_path(self, model_hash, index=None):
+        """Ruta utilizable del modelo (directorio o archivo con su nombre original)"""
+        index = index or self.load_index()
+        return self.models_dir / model_hash / index['models'][model_hash]['name']
+
+    def add(self, source_path, name=None, pinned=False):
+        """Registrar un modelo (directorio o archivo) y devolver su huella"""
+        source = Path(source_path).resolve()
+        name = name or source.name
+        with self.lock:
+            index = self.load_index()
+            signature = self.source_signature(source)
+            known = index['sources'].get(str(source))
+            if known and known['signature'] == signature and known['model'] in index['models'] \
+                    and self.model_path(known['model'], index).exists():
+                if pinned:
+                    index['models'][known['model']]['pinned'] = True
+                    self.save_index(index)
+                return known['model']
+
+            files = {}
+            for rel, path in self.source_files(source):
+                sha256 = self.file_sha256(path)
+                blob = self.blob_path(sha256)
+                if not blob.exists():
+                    blob.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_blob = blob.with_suffix('.tmp')
+                    self.remove_path(tmp_blob)
+                    shutil.copyfile(path, tmp_blob)
+                    self.make_read_only(tmp_blob)
+                    os.replace(tmp_blob, blob)
+                files[rel] = {'sha256': sha256, 'size': path.stat().st_size}
+
+            kind = 'file' if source.is_file() else 'dir'
+            model_hash = hashlib.sha256(json.dumps({'kind': kind, 'files': files}, sort_keys=True).encode()).hexdigest()
+            entry = index['models'].setdefault(model_hash, {
+                'name': name,
+                'kind': kind,
+                'files': files,
+                'size': sum(f['size'] for f in files.values()),
+                'refs': [],
+                'pinned': False,
+                'added': datetime.now().isoformat()
+            })
+            entry['pinned'] = entry['pinned'] or pinned
+            self.checkout(model_hash, entry)
+            index['sources'][str(source)] = {'signature': signature, 'model': model_hash}
+            self.save_index(index)
+
+        logging.info(f"Modelo registrado en el almacén: {name} ({model_hash[:12]})")
+        return model_hash
+
+    def checkout(self, model_hash, entry):
+        """Materializar un modelo con enlaces duros a sus blobs (copia si no se puede enlazar)
+
+        Los archivos de configuración se copian: editarlos no debe alterar
+        el blob que comparten otros modelos.
+        """
+        # Blobs de versiones anteriores: protegerlos también en modelos ya expuestos
+        for info in entry['files'].values():
+            blob = self.blob_path(info['sha256'])
+            if blob.exists() and os.stat(blob).st_mode & stat.S_IWRITE:
+                self.make_read_only(blob)
+
+        target = self.models_dir / model_hash / entry['name']
+        if target.exists():
+            return target
+
+        tmp_root = self.models_dir / f"{model_hash}.tmp"
+        self.remove_path(tmp_root)
+        base = tmp_root / entry['name'] if entry['kind'] == 'dir' else tmp_root
+        for rel, info in entry['files'].items():
+            destination = base / rel
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            blob = self.blob_path(info['sha256'])
+            if destination.suffix.lower() in self.MUTABLE_SUFFIXES:
+                shutil.copyfile(blob, destination)
+                continue
+            try:
+                os.link(blob, destination)
+            except OSError:
+                shutil.copyfile(blob, destination)
+        self.remove_path(self.models_dir / model_hash)
+        os.replace(tmp_root, self.models_dir / model_hash)
+        return target
+
+    def find(self, name):
+        """Huella del modelo registrado más reciente con ese nombre"""
+        models = self.load_index()['models']
+        matches = [h for h, entry in models.items() if entry['name'] == name]
+        return max(matches, key=lambda h: models[h]['added']) if matches else None
+
+    def add_ref(self, model_hash, ref):
+        """Registrar que un proyecto usa un modelo"""
+        with self.lock:
+            index = self.load_index()
+            refs = index['models'][model_hash]['refs']
+            if ref not in refs:
+                refs.append(ref)
+                self.save_index(index)
+
+    def release(self, ref):
+        """Quitar todas las referencias de un proyecto"""
+        with self.lock:
+            index = self.load_index()
+            for entry in index['models'].values():
+                if ref in entry['refs']:
+                    entry['refs'].remove(ref)
+            self.save_index(index)
+
+    def garbage_collect(self):
+        """Eliminar modelos sin referencias (salvo fijados) y blobs huérfanos"""
+        with self.lock:
+            index = self.load_index()
+            for model_hash in [h for h, e in index['models'].items() if not e['refs'] and not e['pinned']]:
+                try:
+                    self.remove_path(self.models_dir / model_hash)
+                except OSError as e:
+                    logging.warning(f"No se pudo eliminar el modelo {model_hash[:12]}: {e}")
+                    continue
+                del index['models'][model_hash]
+                logging.info(f"Modelo eliminado del almacén: {model_hash[:12]}")
+            index['sources'] = {s: v for s, v in index['sources'].items() if v['model'] in index['models']}
+
+            used = {info['sha256'] for e in index['models'].values() for info in e['files'].values()}
+            freed = 0
+            if self.blobs_dir.exists():
+                for blob in self.blobs_dir.glob("*/*"):
+                    if blob.name not in used:
+                        freed += blob.stat().st_size
+                        self.remove_path(blob)
+            self.save_index(index)
+        return freed
+
+    def register_bundled(self, base_dir=None):
+        """Registrar los modelos incluidos con CinBehave (fijados, uso sin conexión)"""
+        base_dir = Path(base_dir) if base_dir else Path(__file__).resolve().parent
+        registered = {}
+        for name in BUNDLED_MODEL_DIRS:
+            source = base_dir / name
+            if source.is_dir():
+                registered[name] = self.add(source, pinned=True)
+        return registered
+
+
+class PredictionJobQueue:
+    """Cola persistente de trabajos de predicción (config/prediction_jobs.db)
+
+    Guarda en SQLite cada lote de predicción con su contexto, sus videos y
+    los trabajos (video completo o rango de frames) con estado, intentos,
+    prioridad y último progreso. Cualquier proceso de CinBehave (la GUI o
+    `--run-queue`) puede tomar trabajos; si el proceso dueño muere, sus
+    trabajos en curso vuelven a la cola al reanudar.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS batches (
+            id TEXT PRIMARY KEY,
+            project TEXT,
+            preview INTEGER,
+            priority INTEGER,
+            state TEXT,
+            context TEXT,
+            total_frames INTEGER DEFAULT 0,
+            owner_pid INTEGER,
+            owner_heartbeat REAL,
+            created TEXT,
+            updated TEXT
+        );
+        CREATE TABLE IF NOT EXISTS videos (
+            batch_id TEXT,
+            video TEXT,
+            idx INTEGER,
+            state TEXT,
+            output TEXT,
+            chunk_outputs TEXT,
+            PRIMARY KEY (batch_id, video)
+        );
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT,
+            video TEXT,
+            chunk INTEGER,
+            chunks INTEGER,
+            frames TEXT,
+            output TEXT,
+            log TEXT,
+            frame_total INTEGER,
+            priority INTEGER,
+            state TEXT,
+            attempts INTEGER DEFAULT 0,
+            max_attempts INTEGER,
+            error TEXT,
+            owner_pid INTEGER,
+            worker_id INTEGER,
+            progress TEXT,
+            heartbeat REAL,
+            updated TEXT
+        );
+        CREATE INDEX IF NOT EXISTS jobs_state ON jobs (batch_id, state, priority);
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = Path(db_path) if db_path else Path("config") / "prediction_jobs.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            # WAL: la GUI puede leer el progreso mientras otro proceso escribe
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+        finally:
+            conn.close()
+
+    @contextlib.contextmanager
+    def connect(self):
+        """Conexión propia por operación; cada bloque es una transacción inmediata"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def owner_alive(pid, heartbeat):
+        """Un dueño sigue vivo si su proceso existe y reportó hace poco"""
+        if not pid or not psutil.pid_exists(pid):
+            return False
+        return heartbeat is not None and time.time() - heartbeat < JOB_STALE_SECONDS
+
+    def create_batch(self, project, context, preview=False, priority=0):
+        """Registrar un lote nuevo; los trabajos se agregan al prepararlo"""
+        batch_id = hashlib.sha256(f"{project}|{time.time()}|{os.getpid()}".encode()).hexdigest()[:16]
+        now = datetime.now().isoformat()
+        with self.connect() as conn:
+            conn.execute("INSERT INTO batches (id, project, preview, priority, state, context, created, updated) "
+                         "VALUES (?, ?, ?, ?, 'new', ?, ?, ?)",
+                         (batch_id, project, int(preview), priority, json.dumps(context), now, now))
+        return batch_id
+
+    def add_jobs(self, batch_id, videos, jobs, context=None):
+        """Agregar los videos y trabajos de un lote y activarlo"""
+        now = datetime.now().isoformat()
+        with self.connect() as conn:
+            batch = conn.execute("SELECT priority FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            for video in videos:
+                conn.execute("INSERT OR REPLACE INTO videos (batch_id, video, idx, state, output, chunk_outputs) "
+                             "VALUES (?, ?, ?, ?, ?, ?)",
+                             (batch_id, str(video['video']), video['index'], video.get('state', 'pending'),
+                              str(video['output']),
+                              json.dumps([str(p) for p in video['chunk_outputs']])))
+            for job in jobs:
+                conn.execute("INSERT INTO jobs (batch_id, video, chunk, chunks, frames, output, log, frame_total, "
+                             "priority, state, max_attempts, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+                             (batch_id, str(job['video']), job['chunk'], job['chunks'],
+                              json.dumps(job['frames']), str(job['output']), str(job['log']),
+                              job['frame_total'], batch['priority'], JOB_MAX_ATTEMPTS, now))
+            updates = "state = 'active', total_frames = ?, updated = ?"
+            values = [sum(job['frame_total'] for job in jobs), now]
+            if context is not None:
+                updates += ", context = ?"
+                values.append(json.dumps(context))
+            conn.execute(f"UPDATE batches SET {updates} WHERE id = ?", values + [batch_id])
+
+    def get_batch(self, batch_id):
+        """Lote con su contexto deserializado"""
+        with self.connect() as conn:
+            row = conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if row is None:
+            return None
+        batch = dict(row)
+        batch['context'] = json.loads(batch['context'])
+        return batch
+
+    def unfinished_batches(self, project=None, preview=None):
+        """Lotes nuevos o activos, por prioridad y antigüedad"""
+        query = "SELECT * FROM batches WHERE state IN ('new', 'active')"
+        values = []
+        if project is not None:
+            query += " AND project = ?"
+            values.append(project)
+        if preview is not None:
+            query += " AND preview = ?"
+            values.append(int(preview))
+        with self.connect() as conn:
+            rows = conn.execute(query + " ORDER BY priority DESC, created", values).fetchall()
+        return [dict(row, context=json.loads(row['context'])) for row in rows]
+
+    def claim_batch(self, batch_id):
+        """Tomar un lote para este proceso; False si otro proceso vivo lo está ejecutando"""
+        with self.connect() as conn:
+            row = conn.execute("SELECT owner_pid, owner_heartbeat FROM batches WHERE id = ?",
+                               (batch_id,)).fetchone()
+            if row['owner_pid'] not in (None, os.getpid()) and \
+                    self.owner_alive(row['owner_pid'], row['owner_heartbeat']):
+                return False
+            conn.execute("UPDATE batches SET owner_pid = ?, owner_heartbeat = ? WHERE id = ?",
+                         (os.getpid(), time.time(), batch_id))
+        return True
+
+    def recover_stale(self, batch_id):
+        """Devolver a la cola los trabajos y videos que dejó a medias un proceso muerto"""
+        with self.connect() as conn:
+            stale = [row['id'] for row in conn.execute(
+                "SELECT id, owner_pid, heartbeat FROM jobs WHERE batch_id = ? AND state = 'running'",
+                (batch_id,)) if not self.owner_alive(row['owner_pid'], row['heartbeat'])]
+            for job_id in stale:
+                conn.execute("UPDATE jobs SET state = 'queued', owner_pid = NULL, worker_id = NULL, "
+                             "progress = NULL WHERE id = ?", (job_id,))
+            # Una unión de partes interrumpida se repite
+            conn.execute("UPDATE videos SET state = 'pending' WHERE batch_id = ? AND state = 'finalizing'",
+                         (batch_id,))
+        if stale:
+            logging.info(f"Lote {batch_id}: {len(stale)} trabajo(s) interrumpido(s) vuelven a la cola")
+        return len(stale)
+
+    def claim_job(self, batch_id, worker_id):
+        """Tomar el siguiente trabajo en cola (mayor prioridad primero)"""
+        now = time.time()
+        with self.connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE batch_id = ? AND state = 'queued' "
+                               "ORDER BY priority DESC, id LIMIT 1", (batch_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET state = 'running', attempts = attempts + 1, owner_pid = ?, "
+                         "worker_id = ?, heartbeat = ?, progress = NULL, updated = ? WHERE id = ?",
+                         (os.getpid(), worker_id, now, datetime.now().isoformat(), row['id']))
+            conn.execute("UPDATE batches SET owner_heartbeat = ? WHERE id = ?", (now, batch_id))
+        job = dict(row)
+        job['frames'] = json.loads(job['frames'])
+        return job
+
+    def peek_job(self, batch_id):
+        """Siguiente trabajo en cola sin tomarlo"""
+        with self.connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE batch_id = ? AND state = 'queued' "
+                               "ORDER BY priority DESC, id LIMIT 1", (batch_id,)).fetchone()
+        return dict(row) if row else None
+
+    def touch_batch(self, batch_id):
+        """Mantener vigente al dueño de un lote mientras espera"""
+        with self.connect() as conn:
+            conn.execute("UPDATE batches SET owner_heartbeat = ? WHERE id = ?", (time.time(), batch_id))
+
+    def heartbeat(self, job_id, progress):
+        """Guardar el último progreso de un trabajo en curso"""
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute("UPDATE jobs SET progress = ?, heartbeat = ? WHERE id = ?",
+                         (json.dumps(progress), now, job_id))
+            conn.execute("UPDATE batches SET owner_heartbeat = ? "
+                         "WHERE id = (SELECT batch_id FROM jobs WHERE id = ?)", (now, job_id))
+
+    def complete_job(self, job_id, success, error=None):
+        """Cerrar un trabajo; un fallo vuelve a la cola mientras queden intentos
+
+        Devuelve el video si con este trabajo quedó listo para cerrarse (solo
+        un llamador lo recibe) junto con si alguna de sus partes falló.
+        """
+        with self.connect() as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if success:
+                state = 'done'
+            elif job['state'] == 'running' and job['attempts'] < job['max_attempts']:
+                state = 'queued'
+            else:
+                state = 'failed'
+            conn.execute("UPDATE jobs SET state = ?, error = ?, progress = NULL, updated = ? WHERE id = ?",
+                         (state, error, datetime.now().isoformat(), job_id))
+            if state == 'queued':
+                logging.info(f"Trabajo {job_id} reintentará ({job['attempts']}/{job['max_attempts']})")
+                return None, False
+            return self._claim_finished_video(conn, job['batch_id'], job['video'])
+
+    def _claim_finished_video(self, conn, batch_id, video):
+        remaining = conn.execute("SELECT COUNT(*) FROM jobs WHERE batch_id = ? AND video = ? "
+                                 "AND state NOT IN ('done', 'failed')", (batch_id, video)).fetchone()[0]
+        if remaining:
+            return None, False
+        claimed = conn.execute("UPDATE videos SET state = 'finalizing' WHERE batch_id = ? AND video = ? "
+                               "AND state = 'pending'", (batch_id, video)).rowcount
+        if not claimed:
+            return None, False
+        failed = conn.execute("SELECT COUNT(*) FROM jobs WHERE batch_id = ? AND video = ? AND state = 'failed'",
+                              (batch_id, video)).fetchone()[0]
+        row = conn.execute("SELECT * FROM videos WHERE batch_id = ? AND video = ?", (batch_id, video)).fetchone()
+        return dict(row, chunk_outputs=json.loads(row['chunk_outputs'])), bool(failed)
+
+    def ready_videos(self, batch_id):
+        """Videos sin trabajos pendientes que aún no se cerraron (p.ej. tras un reinicio)"""
+        with self.connect() as conn:
+            videos = [row['video'] for row in conn.execute(
+                "SELECT video FROM videos WHERE batch_id = ? AND state = 'pending'", (batch_id,))]
+            return [claim for claim in (self._claim_finished_video(conn, batch_id, v) for v in videos)
+                    if claim[0] is not None]
+
+    def unfinished_chunk_outputs(self, batch_id):
+        """Partes de los videos que no llegaron a cerrarse (p.ej. en un lote cancelado)"""
+        with self.connect() as conn:
+            rows = conn.execute("SELECT chunk_outputs FROM videos WHERE batch_id = ? "
+                                "AND state IN ('pending', 'finalizing')", (batch_id,)).fetchall()
+        return [Path(p) for row in rows for p in json.loads(row['chunk_outputs'])]
+
+    def finish_video(self, batch_id, video, status):
+        with self.connect() as conn:
+            conn.execute("UPDATE videos SET state = ? WHERE batch_id = ? AND video = ?",
+                         (status, batch_id, str(video)))
+
+    def finish_batch(self, batch_id, state='finished'):
+        """Marcar un lote como terminado o cancelado"""
+        now = datetime.now().isoformat()
+        with self.connect() as conn:
+            if state == 'cancelled':
+                conn.execute("UPDATE jobs SET state = 'failed', error = 'Cancelado', updated = ? "
+                             "WHERE batch_id = ? AND state IN ('queued', 'running')", (now, batch_id))
+            conn.execute("UPDATE batches SET state = ?, updated = ? WHERE id = ? AND state IN ('new', 'active')",
+                         (state, now, batch_id))
+
+    def snapshot(self, batch_id):
+        """Estado agregado de un lote para mostrar progreso (desde cualquier proceso)"""
+        with self.connect() as conn:
+            batch = conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            videos = conn.execute("SELECT state, COUNT(*) FROM videos WHERE batch_id = ? GROUP BY state",
+                                  (batch_id,)).fetchall()
+            jobs = conn.execute("SELECT video, chunk, chunks, state, frame_total, worker_id, progress "
+                                "FROM jobs WHERE batch_id = ?", (batch_id,)).fetchall()
+
+        video_counts = {row[0]: row[1] for row in videos}
+        frames_done = 0
+        running = []
+        for job in jobs:
+            if job['state'] in ('done', 'failed'):
+                frames_done += job['frame_total']
+            elif job['state'] == 'running':
+                progress = json.loads(job['progress']) if job['progress'] else {}
+                frames_done += progress.get('n_processed', 0)
+                label = Path(job['video']).name
+                if job['chunks'] > 1:
+                    label += f" (parte {job['chunk'] + 1}/{job['chunks']})"
+                running.append((job['worker_id'], label, progress))
+
+        return {
+            'state': batch['state'],
+            'owner_pid': batch['owner_pid'],
+            'videos_total': sum(video_counts.values()),
+            'videos_done': video_counts.get('success', 0) + video_counts.get('error', 0),
+            'total_frames': batch['total_frames'],
+            'frames_done': frames_done,
+            'queued': sum(1 for job in jobs if job['state'] == 'queued'),
+            'running': sorted(running, key=lambda r: r[0] if r[0] is not None else -1)
+        }
+
+    def video_results(self, batch_id):
+        """Resultado por video en el orden original"""
+        with self.connect() as conn:
+            rows = conn.execute("SELECT video, state, output FROM videos WHERE batch_id = ? ORDER BY idx",
+                                (batch_id,)).fetchall()
+        return [{'video': Path(row['video']).name, 'output': row['output'], 'status': row['state']}
+                for row in rows if row['state'] in ('success', 'error')]
+
+class PredictionBatchRunner:
+    """Ejecuta un lote de la cola persistente con workers SLEAP paralelos
+
+    No depende de Tk: la ventana de progreso lo usa en un hilo y
+    `--run-queue` lo usa sin interfaz. Todo el estado compartido (trabajos,
+    intentos, progreso) vive en PredictionJobQueue.
+    """
+    def __init__(self, job_queue, batch_id, on_status=None):
+        self.job_queue = job_queue
+        self.batch_id = batch_id
+        self.on_status = on_status
+
+        batch = job_queue.get_batch(batch_id)
+        self.batch_state = batch['state']
+        self.context = context = batch['context']
+        self.videos = context['videos']
+        self.models_info = {name: Path(path) for name, path in context['models_info'].items()}
+        self.output_folder = Path(context['output_folder'])
+        self.model_fingerprint = context.get('model_fingerprint')
+        self.inference_params = context.get('inference_params') or {}
+        self.batch_size = context.get('batch_size', 4)
+        self.auto_tune_batch_size = context.get('auto_tune_batch_size', False)
+        stride = context.get('preview_stride')
+        self.preview_stride = stride if stride and stride > 1 else None
+        self.rois = context.get('rois') or {}
+        self.max_workers = context.get('max_workers')
+        self.cache_keys = context.get('cache_keys') or {}
+        self.use_prediction_cache = bool(context.get('prediction_cache'))
+        self.centroid_only = bool(self.inference_params.get('centroid_only'))
+        # El perfil de memoria distingue el modo: sin modelo de instancia el pico es menor
+        self.profile_fingerprint = f"{self.model_fingerprint}|centroid" if self.centroid_only \
+            else self.model_fingerprint
+        self.manifest = PredictionManifest(self.output_folder, preview=bool(self.preview_stride),
+                                           centroid_only=self.centroid_only)
+
+        self.processing = True
+        self.workers = {}
+        self.state_lock = threading.Lock()
+        self.admission = MEMORY_ADMISSION
+        self.memory_profile = MemoryProfile()
+        self.resolutions = {}
+
+    def status(self, text):
+        # La ventana de progreso puede desconectarse (on_status = None) desde otro hilo
+        on_status = self.on_status
+        if on_status is not None:
+            on_status(text)
+
+    def worker_params(self):
+        """Parámetros de inferencia que recibe cada worker"""
+        return dict(self.inference_params, batch_size=self.batch_size)
+
+    def start_worker(self, slot):
+        """Iniciar un worker persistente; devuelve None si no está disponible"""
+        worker = SLEAPInferenceWorker(self.models_info, worker_id=slot['worker_id'],
+                                      cores=slot['cores'], threads=slot['threads'],
+                                      params=self.worker_params())
+        try:
+            worker.start()
+            return worker
+        except Exception as e:
+            logging.warning(f"Worker SLEAP no disponible, usando sleap-track por video: {e}")
+            return None
+
+    def job_resolution(self, video_path):
+        """Resolución que procesa el worker (la de la ROI si el video tiene una)"""
+        roi = self.rois.get(Path(video_path).name)
+        if roi:
+            return int(roi[2]), int(roi[3])
+        if video_path not in self.resolutions:
+            self.resolutions[video_path] = get_video_resolution(video_path)
+        return self.resolutions[video_path]
+
+    def estimate_memory(self, video_path):
+        """Pico de memoria esperado de un worker procesando este video"""
+        width, height = self.job_resolution(video_path)
+        models_info = {'centroid': self.models_info['centroid']} if self.centroid_only else self.models_info
+        return self.memory_profile.estimate(models_info, self.profile_fingerprint, width, height,
+                                            self.batch_size, self.inference_params.get('max_instances'))
+
+    def admit(self, key, video_path, worker):
+        """Esperar a que haya memoria para el siguiente trabajo de un worker"""
+        estimate = self.estimate_memory(video_path)
+        pid = worker.process.pid if worker is not None and worker.is_alive() else None
+
+        def on_wait(estimate, delay):
+            self.job_queue.touch_batch(self.batch_id)
+            self.status(f"⏳ Esperando memoria libre ({estimate / 1024**3:.1f} GB estimados)...")
+            logging.info(f"Memoria insuficiente para {Path(video_path).name} "
+                         f"({estimate / 1024**3:.1f} GB), reintento en {delay:.0f}s")
+
+        return self.admission.acquire(key, estimate, pid=pid, keep_waiting=lambda: self.processing,
+                                      on_wait=on_wait)
+
+    def cache_config_key(self, video_path):
+        return PredictionCache.config_key(self.model_fingerprint, self.inference_params,
+                                          self.rois.get(Path(video_path).name))
+
+    def fetch_cached(self):
+        """Recuperar de la caché compartida los videos ya predichos en otro proyecto
+
+        Se compara primero la huella muestreada con el índice; el hash del
+        contenido completo solo se calcula si hay una entrada candidata.
+        Devuelve el conjunto de videos recuperados.
+        """
+        cache = PredictionCache()
+        cached = set()
+        for video_path in self.videos:
+            video_name = Path(video_path).name
+            config_key = self.cache_config_key(video_path)
+            try:
+                if not cache.has_candidate(compute_video_fingerprint(video_path), config_key):
+                    continue
+                self.status(f"🔎 Buscando {video_name} en la caché de predicciones...")
+                key = cache.make_key(compute_video_content_hash(video_path), self.model_fingerprint,
+                                     self.inference_params, self.rois.get(video_name))
+            except OSError as e:
+                logging.warning(f"No se pudo calcular el hash de {video_path}: {e}")
+                continue
+            self.cache_keys[video_path] = key
+            if cache.get(key, self.manifest.output_path(video_path), video_path):
+                self.manifest.record(video_path, self.model_fingerprint, self.inference_params, 'success',
+                                     roi=self.rois.get(video_name))
+                cached.add(video_path)
+                logging.info(f"Predicción de {video_name} recuperada de la caché")
+        self.context['cache_keys'] = self.cache_keys
+        return cached
+
+    def build_jobs(self, capacity, cached=()):
+        """Dividir los videos en trabajos; los videos largos se parten en rangos de frames"""
+        jobs = []
+        videos = []
+        for index, video_path in enumerate(self.videos):
+            output_path = self.manifest.output_path(video_path)
+            if video_path in cached:
+                videos.append({'index': index, 'video': video_path, 'output': output_path,
+                               'chunk_outputs': [], 'state': 'success'})
+                continue
+
+            frame_count = get_video_frame_count(video_path)
+            ranges = plan_video_chunks(frame_count, capacity) if frame_count else []
+
+            if len(ranges) <= 1:
+                jobs.append({'video': video_path, 'output': output_path,
+                             'frames': None, 'chunk': 0, 'chunks': 1, 'frame_total': frame_count})
+                videos.append({'index': index, 'video': video_path, 'output': output_path, 'chunk_outputs': []})
+                continue
+
+            chunks_folder = self.output_folder / "chunks"
+            chunks_folder.mkdir(parents=True, exist_ok=True)
+            chunk_outputs = []
+            for chunk, frames in enumerate(ranges):
+                chunk_output = chunks_folder / f"{output_path.stem}.chunk{chunk:03d}.slp"
+                chunk_outputs.append(chunk_output)
+                jobs.append({'video': video_path, 'output': chunk_output,
+                             'frames': frames, 'chunk': chunk, 'chunks': len(ranges),
+                             'frame_total': frames[1] - frames[0]})
+
+            videos.append({'index': index, 'video': video_path, 'output': output_path,
+                           'chunk_outputs': chunk_outputs})
+            logging.info(f"{Path(video_path).name}: {frame_count} frames en {len(ranges)} partes")
+
+        stride = self.preview_stride or 1
+        for job in jobs:
+            job['log'] = self.output_folder / "logs" / f"{Path(job['output']).stem}.log"
+            if stride > 1:
+                # En vista previa solo se infieren los frames muestreados
+                start, end = job['frames'] or (0, job['frame_total'])
+                job['frame_total'] = len(range(start, end, stride))
+        return videos, jobs
+
+    def prepare(self):
+        """Primera ejecución de un lote: ajustar el lote y crear sus trabajos"""
+        if self.auto_tune_batch_size:
+            self.status("⏱️ Ajustando tamaño de lote...")
+            tuned = BatchSizeTuner().tune(self.models_info, self.model_fingerprint,
+                                          self.videos[0], self.worker_params())
+            if tuned:
+                self.batch_size = tuned
+                self.context['batch_size'] = tuned
+
+        cached = self.fetch_cached() if self.use_prediction_cache else set()
+
+        capacity = len(plan_worker_slots(sys.maxsize, self.max_workers,
+                                         memory_per_worker=self.estimate_memory(self.videos[0])))
+        videos, jobs = self.build_jobs(capacity, cached)
+        self.job_queue.add_jobs(self.batch_id, videos, jobs, context=self.context)
+        return len(jobs)
+
+    def run(self):
+        """Ejecutar el lote hasta vaciar su cola; devuelve True si no fue cancelado"""
+        try:
+            if self.batch_state == 'new':
+                num_jobs = self.prepare()
+            else:
+                self.job_queue.recover_stale(self.batch_id)
+                num_jobs = self.job_queue.snapshot(self.batch_id)['queued']
+                logging.info(f"Reanudando lote {self.batch_id}: {num_jobs} trabajo(s) en cola")
+
+            # Videos cuyos trabajos terminaron antes de un reinicio
+            for video, failed in self.job_queue.ready_videos(self.batch_id):
+                self.finish_video(video, failed)
+
+            memory_per_worker = max(self.estimate_memory(v) for v in self.videos)
+            slots = plan_worker_slots(max(num_jobs, 1), self.max_workers, memory_per_worker=memory_per_worker)
+            logging.info(f"Predicción SLEAP: {num_jobs} trabajo(s) en {len(slots)} worker(s)")
+
+            threads = []
+            for slot in slots:
+                thread = threading.Thread(target=self.worker_slot_thread, args=(slot,), daemon=True)
+                thread.start()
+                threads.append(thread)
+
+            for thread in threads:
+                thread.join()
+
+            if self.processing:
+                self.job_queue.finish_batch(self.batch_id)
+            else:
+                # Un lote cancelado no se reanuda: sus partes quedarían huérfanas
+                for chunk_output in self.job_queue.unfinished_chunk_outputs(self.batch_id):
+                    chunk_output.unlink(missing_ok=True)
+            return self.processing
+        finally:
+            self.stop_workers()
+
+    def cancel(self):
+        """Cancelar el lote: los trabajos pendientes quedan como fallidos"""
+        self.processing = False
+        self.job_queue.finish_batch(self.batch_id, state='cancelled')
+        # Terminar las inferencias en curso sin esperar a los videos actuales
+        self.kill_workers()
+
+    def worker_slot_thread(self, slot):
+        """Hilo de un worker: toma trabajos de la cola hasta vaciarla
+
+        Antes de cada trabajo se reserva memoria para él; el worker se lanza
+        recién cuando la primera reserva es admitida.
+        """
+        admission_key = (self.batch_id, slot['worker_id'])
+        worker = None
+        fallback = False
+        try:
+            while self.processing:
+                next_job = self.job_queue.peek_job(self.batch_id)
+                if next_job is None:
+                    break
+                if not self.admit(admission_key, next_job['video'], worker):
+                    break
+
+                job = self.job_queue.claim_job(self.batch_id, slot['worker_id'])
+                if job is None:
+                    break
+
+                if not fallback and (worker is None or not worker.is_alive()):
+                    worker = self.start_worker(slot)
+                    with self.state_lock:
+                        self.workers[slot['worker_id']] = worker
+                    if worker is not None:
+                        self.admission.attach(admission_key, worker.process.pid)
+                    else:
+                        # Sin worker persistente: sleap-track por trabajo en este slot
+                        fallback = True
+
+                self.run_job(slot, job, worker)
+                with self.state_lock:
+                    worker = self.workers.get(slot['worker_id'])
+        finally:
+            self.admission.release(admission_key)
+
+    def run_job(self, slot, job, worker):
+        """Ejecutar un trabajo en el worker del slot y registrar su resultado"""
+        video_path = job['video']
+        video_name = Path(video_path).name
+        if job['chunks'] > 1:
+            job_label = f"{video_name} (parte {job['chunk'] + 1}/{job['chunks']})"
+        else:
+            job_label = video_name
+
+        # Pico de RSS del worker durante el trabajo, para aprender la estimación
+        pid = worker.process.pid if worker is not None else None
+        peak_rss = [process_rss(pid) if pid else 0]
+
+        def on_progress(progress, job_id=job['id']):
+            if pid:
+                peak_rss[0] = max(peak_rss[0], process_rss(pid))
+            self.job_queue.heartbeat(job_id, progress)
+
+        error = None
+        try:
+            if worker is not None:
+                success = worker.predict(video_path, job['output'], frames=job['frames'],
+                                         log_path=job['log'], on_progress=on_progress,
+                                         stride=self.preview_stride or 1,
+                                         roi=self.rois.get(video_name))
+            elif self.preview_stride or self.rois.get(video_name):
+                # sleap-track no recorta ni salta frames: fallar antes que registrar otra predicción
+                error = "La vista previa y la ROI requieren el worker persistente"
+                logging.error(f"{error}: {job_label}")
+                success = False
+            else:
+                success = self.run_sleap_prediction(video_path, job['output'], frames=job['frames'],
+                                                    log_path=job['log'], on_progress=on_progress)
+        except Exception as e:
+            if not self.processing:
+                return
+            logging.error(f"Error procesando {job_label}: {e}")
+            success = False
+            error = str(e)
+            # Reemplazar el worker caído para los trabajos restantes
+            if worker is not None:
+                worker.stop()
+            with self.state_lock:
+                self.workers[slot['worker_id']] = None
+
+        if not self.processing:
+            return
+        if success and pid:
+            peak_rss[0] = max(peak_rss[0], process_rss(pid))
+            width, height = self.job_resolution(video_path)
+            self.memory_profile.record(self.profile_fingerprint, width, height, self.batch_size, peak_rss[0])
+
+        video, failed = self.job_queue.complete_job(job['id'], success,
+                                                    error=error or (None if success else "Error de inferencia"))
+        if video is not None:
+            self.finish_video(video, failed)
+
+    def finish_video(self, video, failed):
+        """Cerrar un video: unir sus partes, registrar el resultado y publicarlo en la caché"""
+        video_path = video['video']
+        video_name = Path(video_path).name
+        output_path = Path(video['output'])
+        chunk_outputs = [Path(p) for p in video['chunk_outputs']]
+        success = not failed
+
+        if success and chunk_outputs:
+            try:
+                provenance = None
+                if self.preview_stride:
+                    provenance = {'cinbehave_preview': True, 'cinbehave_preview_stride': self.preview_stride}
+                merge_prediction_chunks(chunk_outputs, output_path, video_path,
+                                        interpolate_stride=self.preview_stride, provenance=provenance)
+                for chunk_output in chunk_outputs:
+                    chunk_output.unlink()
+            except Exception as e:
+                logging.error(f"Error uniendo partes de {video_name}: {e}")
+                success = False
+
+        if success:
+            logging.info(f"SLEAP procesado: {video_name}")
+        else:
+            logging.error(f"Error procesando {video_name}")
+            # Un nuevo lote vuelve a partir el video: las partes terminadas no se reutilizan
+            for chunk_output in chunk_outputs:
+                chunk_output.unlink(missing_ok=True)
+
+        self.manifest.record(video_path, self.model_fingerprint, self.inference_params,
+                             'success' if success else 'error', roi=self.rois.get(video_name))
+        if success and (self.use_prediction_cache or video_path in self.cache_keys):
+            self.publish_to_cache(video_path, output_path)
+
+        self.job_queue.finish_video(self.batch_id, video_path, 'success' if success else 'error')
+
+    def publish_to_cache(self, video_path, output_path):
+        """Guardar una predicción en la caché compartida (hashea el video en este hilo)"""
+        video_name = Path(video_path).name
+        try:
+            fingerprint = compute_video_fingerprint(video_path)
+            key = self.cache_keys.get(video_path)
+            if key is None:
+                key = PredictionCache().make_key(compute_video_content_hash(video_path), self.model_fingerprint,
+                                                 self.inference_params, self.rois.get(video_name))
+        except OSError as e:
+            logging.warning(f"No se pudo calcular el hash de {video_path}: {e}")
+            return
+        PredictionCache().put(key, output_path, video_name, fingerprint=fingerprint,
+                              config_key=self.cache_config_key(video_path))
+
+    def stop_workers(self):
+        """Detener todos los workers persistentes"""
+        with self.state_lock:
+            workers = [w for w in self.workers.values() if w is not None]
+            self.workers = {}
+        for worker in workers:
+            worker.stop()
+
+    def kill_workers(self):
+        """Terminar inmediatamente todos los workers"""
+        with self.state_lock:
+            workers = [w for w in self.workers.values() if w is not None]
+        for worker in workers:
+            worker.kill()
+
+    def run_sleap_prediction(self, video_path, output_path, frames=None, log_path=None, on_progress=None,
+                             timeout=3600):
+        """Ejecutar predicción SLEAP con sleap-track, leyendo su salida línea a línea"""
+        try:
+            models = ['-m', str(self.models_info['centroid'])]
+            if not self.centroid_only:
+                models += ['-m', str(self.models_info['centered_instance'])]
+            cmd = [
+                'sleap-track',
+                *models,
+                '-o', str(output_path),
+                '--verbosity', 'json',
+                '--batch_size', str(self.batch_size),
+                '--peak_threshold', str(self.inference_params.get('peak_threshold', 0.2)),
+                str(video_path)
+            ]
+            if self.inference_params.get('max_instances'):
+                cmd += ['--max_instances', str(self.inference_params['max_instances'])]
+            if self.inference_params.get('tracker'):
+                cmd += ['--tracking.tracker', self.inference_params['tracker']]
+            if frames:
+                # Rango inclusivo en la sintaxis de sleap-track
+                cmd += ['--frames', f"{frames[0]}-{frames[1] - 1}"]
+
+            log_path = Path(log_path) if log_path else Path(os.devnull)
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Ejecutar comando; la salida va al log del trabajo, no a memoria
+            with open(log_path, 'a') as log_file:
+                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                           text=True, bufsize=1)
+                # Plazo sin progreso antes de abortar (el reloj se reinicia con cada reporte)
+                watchdog = threading.Timer(timeout, process.kill)
+                watchdog.start()
+                try:
+                    for line in process.stdout:
+                        log_file.write(line)
+                        progress = parse_sleap_progress(line)
+                        if progress:
+                            watchdog.cancel()
+                            watchdog = threading.Timer(timeout, process.kill)
+                            watchdog.start()
+                            if on_progress is not None:
+                                on_progress(progress)
+                    returncode = process.wait()
+                finally:
+                    watchdog.cancel()
+
+            if returncode == 0:
+                return True
+            else:
+                logging.error(f"SLEAP error (código {returncode}), ver log: {log_path}")
+                return False
+
+        except Exception as e:
+            logging.error(f"Error ejecutando SLEAP: {e}")
+            return False
+
 class SLEAPProgressWindow:
-    """Ventana de progreso para predicciones SLEAP"""
-    def __init__(self, parent, videos_to_process, models_info, output_folder):
+    """Ventana de progreso para predicciones SLEAP
+
+    Muestra un lote de PredictionJobQueue. Si ningún otro proceso vivo lo
+    está ejecutando, la ventana lo ejecuta con PredictionBatchRunner; si no,
+    se engancha al lote en curso y solo muestra su progreso.
+    """
+    POLL_INTERVAL_MS = 1000
+
+    def __init__(self, parent, job_queue, batch_id):
         self.parent = parent
-        self.videos_to_process = videos_to_process
-        self.models_info = models_info
-        self.output_folder = output_folder
-        self.total_videos = len(videos_to_process)
-        self.current_video = 0
+        self.job_queue = job_queue
+        self.batch_id = batch_id
+        context = job_queue.get_batch(batch_id)['context']
+        self.models_info = context['models_info']
+        self.output_folder = Path(context['output_folder'])
+        self.total_videos = len(context['videos'])
         self.processing = True
         self.success = False
+        self.closed = False
         self.results = []
         
+        # Tomar el lote si está libre; si otro proceso lo ejecuta, solo observar
+        self.runner = None
+        if job_queue.claim_batch(batch_id):
+            self.runner = PredictionBatchRunner(job_queue, batch_id, on_status=self.set_status)
+
         # Crear ventana
         self.window = tk.Toplevel(parent.root)
         self.window.title("🧠 Procesando Predicciones SLEAP - CinBehave")
-        self.window.geometry("700x500")
+        self.window.geometry("700x600")
         self.window.configure(bg=ModernColors.PRIMARY_DARK)
         self.window.resizable(False, False)
         self.window.transient(parent.root)
@@ -79,8 +3377,12 @@ class SLEAPProgressWindow:
         self.setup_ui()
         
         # Iniciar procesamiento en hilo separado
-        self.process_thread = threading.Thread(target=self.process_videos_thread, daemon=True)
-        self.process_thread.start()
+        if self.runner is not None:
+            self.process_thread = threading.Thread(target=self.process_videos_thread, daemon=True)
+            self.process_thread.start()
+        else:
+            self.current_video_label.config(text="🔗 Conectado a un procesamiento en curso en otro proceso...")
+        self.window.after(self.POLL_INTERVAL_MS, self.poll_progress)
         
         # Manejar cierre de ventana
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -89,7 +3391,7 @@ class SLEAPProgressWindow:
         """Centrar ventana en pantalla"""
         self.window.update_idletasks()
         width = 700
-        height = 500
+        height = 600
         x = (self.window.winfo_screenwidth() // 2) - (width // 2)
         y = (self.window.winfo_screenheight() // 2) - (height // 2)
         self.window.geometry(f"{width}x{height}+{x}+{y}")
@@ -138,7 +3440,7 @@ class SLEAPProgressWindow:
                 fg=ModernColors.TEXT_PRIMARY, 
                 bg=ModernColors.CARD_BG).pack(pady=(15, 10))
         
-        self.progress_label = tk.Label(progress_frame, text="Video 0 de " + str(self.total_videos), 
+        self.progress_label = tk.Label(progress_frame, text="Completados 0 de " + str(self.total_videos) + " videos",
                                       font=("Segoe UI", 12), 
                                       fg=ModernColors.TEXT_PRIMARY, 
                                       bg=ModernColors.CARD_BG)
@@ -156,7 +3458,20 @@ class SLEAPProgressWindow:
                                         font=("Segoe UI", 11, "bold"), 
                                         fg=ModernColors.ACCENT_GREEN, 
                                         bg=ModernColors.CARD_BG)
-        self.percentage_label.pack(pady=(5, 15))
+        self.percentage_label.pack(pady=(5, 5))
+
+        # Progreso por frames: velocidad y tiempo restante
+        frames_container = tk.Frame(progress_frame, bg=ModernColors.CARD_BG)
+        frames_container.pack(fill="x", padx=20, pady=(0, 5))
+
+        self.frames_bar = ttk.Progressbar(frames_container, mode='determinate', length=600)
+        self.frames_bar.pack(fill="x")
+
+        self.frames_label = tk.Label(progress_frame, text="Frames: calculando...",
+                                    font=("Segoe UI", 10),
+                                    fg=ModernColors.TEXT_SECONDARY,
+                                    bg=ModernColors.CARD_BG)
+        self.frames_label.pack(pady=(0, 15))
         
         # Video actual
         current_frame = tk.Frame(main_container, bg=ModernColors.CARD_BG, relief="solid", bd=1)
@@ -187,101 +3502,117 @@ class SLEAPProgressWindow:
                                       relief="flat", padx=20, pady=8)
         self.cancel_button.pack()
     
+    def schedule(self, callback, *args):
+        """Programar una actualización de la interfaz desde otro hilo
+
+        Si la ventana ya se cerró (el lote sigue en segundo plano) no hace
+        nada: el runner continúa sin interfaz.
+        """
+        if self.closed:
+            return
+        try:
+            self.window.after(0, self.run_if_open, callback, *args)
+        except (tk.TclError, RuntimeError):
+            # La ventana se destruyó entre la comprobación y la llamada
+            pass
+
+    def run_if_open(self, callback, *args):
+        if not self.closed:
+            callback(*args)
+
+    def close(self):
+        """Destruir la ventana y desconectar los avisos del runner"""
+        self.closed = True
+        if self.runner is not None:
+            self.runner.on_status = None
+        self.window.destroy()
+
+    def set_status(self, text):
+        """Mostrar un mensaje de estado desde el hilo del runner"""
+        self.schedule(self.current_video_label.config, {'text': text})
+
     def process_videos_thread(self):
-        """Hilo para procesar videos con SLEAP"""
+        """Hilo coordinador: ejecuta el lote con workers paralelos"""
         try:
-            for i, video_path in enumerate(self.videos_to_process):
-                if not self.processing:
-                    break
-                
-                self.current_video = i + 1
-                video_name = Path(video_path).name
-                output_filename = f"{Path(video_name).stem}_predictions.slp"
-                output_path = self.output_folder / output_filename
-                
-                # Actualizar UI
-                self.window.after(0, self.update_progress, video_name, video_path)
-                
-                # Ejecutar SLEAP
-                try:
-                    success = self.run_sleap_prediction(video_path, output_path)
-                    if success:
-                        self.results.append({
-                            'video': video_name,
-                            'output': str(output_path),
-                            'status': 'success'
-                        })
-                        logging.info(f"SLEAP procesado: {video_name}")
-                    else:
-                        self.results.append({
-                            'video': video_name,
-                            'output': str(output_path),
-                            'status': 'error'
-                        })
-                        logging.error(f"Error procesando {video_name}")
-                        
-                except Exception as e:
-                    logging.error(f"Error procesando {video_name}: {e}")
-                    self.window.after(0, self.show_error, f"Error procesando {video_name}:\n{e}")
-                    return
-                
-                # Pequeña pausa para no saturar la UI
-                time.sleep(0.1)
-            
-            if self.processing:
+            if self.runner.run():
                 self.success = True
-                self.window.after(0, self.processing_completed)
-                
+                self.schedule(self.processing_completed)
         except Exception as e:
             logging.error(f"Error en procesamiento SLEAP: {e}")
-            self.window.after(0, self.show_error, f"Error general en SLEAP:\n{e}")
+            self.schedule(self.show_error, f"Error general en SLEAP:\n{e}")
     
-    def run_sleap_prediction(self, video_path, output_path):
-        """Ejecutar predicción SLEAP"""
+    def poll_progress(self):
+        """Leer el estado del lote desde la cola y actualizar la interfaz"""
+        if not self.processing:
+            return
         try:
-            cmd = [
-                'sleap-track',
-                '-m', str(self.models_info['centroid']),
-                '-m', str(self.models_info['centered_instance']),
-                '-o', str(output_path),
-                str(video_path)
-            ]
-            
-            # Ejecutar comando
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)  # 1 hora timeout
-            
-            if result.returncode == 0:
-                return True
-            else:
-                logging.error(f"SLEAP error: {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            logging.error(f"Timeout procesando {video_path}")
-            return False
+            snapshot = self.job_queue.snapshot(self.batch_id)
         except Exception as e:
-            logging.error(f"Error ejecutando SLEAP: {e}")
-            return False
+            logging.warning(f"No se pudo leer el progreso del lote: {e}")
+        else:
+            self.update_progress(snapshot)
+            # En modo observador el cierre lo marca el estado del lote
+            if self.runner is None and snapshot['state'] in ('finished', 'cancelled'):
+                self.success = snapshot['state'] == 'finished'
+                self.processing_completed()
+                return
+        self.window.after(self.POLL_INTERVAL_MS, self.poll_progress)
     
-    def update_progress(self, video_name, video_path):
+    def update_progress(self, snapshot):
         """Actualizar interfaz de progreso"""
+        completed = snapshot['videos_done']
+        total_videos = snapshot['videos_total'] or self.total_videos
+        total_frames = snapshot['total_frames']
+        frames_processed = snapshot['frames_done']
+        running = snapshot['running']
+        rate = sum(progress.get('rate', 0.0) for _, _, progress in running)
+
         # Actualizar contador
-        self.progress_label.config(text=f"Video {self.current_video} de {self.total_videos}")
+        self.progress_label.config(text=f"Completados {completed} de {total_videos} videos")
         
         # Actualizar barra de progreso
-        self.progress_bar['value'] = self.current_video
+        self.progress_bar['maximum'] = total_videos
+        self.progress_bar['value'] = completed
         
         # Actualizar porcentaje
-        percentage = int((self.current_video / self.total_videos) * 100)
+        percentage = int((completed / total_videos) * 100)
         self.percentage_label.config(text=f"{percentage}%")
         
-        # Actualizar video actual
-        self.current_video_label.config(text=f"Procesando: {video_name}\nRuta: {video_path}\n\n⚙️ Ejecutando modelos SLEAP...")
+        # Frames, velocidad agregada y ETA
+        if total_frames:
+            self.frames_bar['maximum'] = total_frames
+            self.frames_bar['value'] = min(frames_processed, total_frames)
+            frames_text = f"Frames: {frames_processed:,} de {total_frames:,}"
+            if rate > 0:
+                eta = max(0, total_frames - frames_processed) / rate
+                frames_text += f"  •  {rate:.1f} fps  •  ETA {format_duration(eta)}"
+            self.frames_label.config(text=frames_text)
+
+        # Actualizar videos en curso (uno por worker)
+        if running:
+            lines = []
+            for worker_id, video_name, progress in running[:6]:
+                line = f"Worker {(worker_id or 0) + 1}: {video_name}"
+                if progress.get('n_total'):
+                    line += f" — {int(100 * progress['n_processed'] / progress['n_total'])}%"
+                if progress.get('rate'):
+                    line += f" ({progress['rate']:.1f} fps)"
+                stages = progress.get('stages')
+                if stages:
+                    line += f" • colas dec/esc {stages['decode_queue']}/{stages['write_queue']}" \
+                            f" • limitante: {STAGE_NAMES[stages['bottleneck']]}"
+                lines.append(line)
+            if len(running) > 6:
+                lines.append(f"... y {len(running) - 6} videos más")
+            if snapshot['queued']:
+                lines.append(f"{snapshot['queued']} trabajo(s) en cola")
+            self.current_video_label.config(text="\n".join(lines) + "\n\n⚙️ Ejecutando modelos SLEAP...")
         
         self.window.update_idletasks()
     
     def processing_completed(self):
         """Procesamiento completado exitosamente"""
+        self.results = self.job_queue.video_results(self.batch_id)
         success_count = len([r for r in self.results if r['status'] == 'success'])
         error_count = len([r for r in self.results if r['status'] == 'error'])
         
@@ -309,23 +3640,736 @@ class SLEAPProgressWindow:
         """Cancelar procesamiento"""
         if messagebox.askyesno("⚠️ Cancelar", "¿Estás seguro de que deseas cancelar el procesamiento SLEAP?"):
             self.processing = False
-            self.window.destroy()
+            if self.runner is not None:
+                self.runner.cancel()
+            else:
+                self.job_queue.finish_batch(self.batch_id, state='cancelled')
+            self.close()
     
     def close_success(self):
         """Cerrar ventana después de éxito"""
-        self.window.destroy()
+        self.close()
     
     def close_error(self):
         """Cerrar ventana después de error"""
         self.processing = False
-        self.window.destroy()
+        self.close()
     
     def on_closing(self):
-        """Manejar cierre de ventana"""
-        if self.success:
-            self.window.destroy()
-        else:
-            self.cancel_processing()
+        """Manejar cierre de ventana: cancelar o dejar el lote en segundo plano"""
+        if self.success or not self.processing:
+            self.close()
+            return
+
+        answer = messagebox.askyesnocancel(
+            "⚠️ Cerrar",
+            "¿Cancelar el procesamiento SLEAP?\n\n"
+            "Sí: cancelar los trabajos pendientes.\n"
+            "No: seguir en segundo plano; la cola se conserva y puede\n"
+            "volver a verse desde Predecir o reanudarse tras reiniciar.")
+        if answer is None:
+            return
+        self.processing = False
+        if answer:
+            if self.runner is not None:
+                self.runner.cancel()
+            else:
+                self.job_queue.finish_batch(self.batch_id, state='cancelled')
+        self.close()
+
+def load_ingest_settings():
+    """Ajustes de ingesta de config/windows_config.json
+
+    `ingest_workers`: copias simultáneas. `ingest_hardlinks`: True/False si el
+    usuario permitió o no enlazar videos del mismo disco (None si no se le ha
+    preguntado).
+    """
+    try:
+        with open(Path("config") / "windows_config.json", 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    try:
+        workers = max(1, int(config.get('ingest_workers', INGEST_MAX_WORKERS)))
+    except (TypeError, ValueError):
+        workers = INGEST_MAX_WORKERS
+    return {'workers': workers, 'hardlinks': config.get('ingest_hardlinks')}
+
+def save_ingest_setting(key, value):
+    """Guardar un ajuste de ingesta en config/windows_config.json"""
+    config_file = Path("config") / "windows_config.json"
+    try:
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    config[key] = value
+    config_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(config_file, 'w') as f:
+        json.dump(config, f, indent=2)
+
+def same_filesystem(paths, folder):
+    """True si algún archivo está en el mismo sistema de archivos que la carpeta"""
+    try:
+        device = Path(folder).stat().st_dev
+        return any(Path(p).stat().st_dev == device for p in paths)
+    except OSError:
+        return False
+
+def load_video_references(videos_folder):
+    """Referencias a videos externos del proyecto ({nombre: {path, size, mtime, fingerprint}})"""
+    try:
+        with open(Path(videos_folder) / LINKED_VIDEOS_FILENAME, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_video_references(videos_folder, references):
+    """Guardar referencias de forma atómica"""
+    references_path = Path(videos_folder) / LINKED_VIDEOS_FILENAME
+    references_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = references_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(references, f, indent=2)
+    os.replace(tmp_path, references_path)
+
+def register_video_references(videos_folder, video_paths):
+    """Registrar videos en su ubicación actual sin copiarlos; devuelve los nombres registrados"""
+    videos_folder = Path(videos_folder)
+    references = load_video_references(videos_folder)
+    registered = []
+    for video_path in map(Path, video_paths):
+        video_path = video_path.resolve()
+        existing = references.get(video_path.name)
+        if (videos_folder / video_path.name).exists() or (existing and existing['path'] != str(video_path)):
+            logging.warning(f"Video omitido, ya hay otro con el mismo nombre: {video_path}")
+            continue
+        fingerprint = compute_video_fingerprint(video_path)
+        references[video_path.name] = {
+            'path': str(video_path),
+            'size': fingerprint['size'],
+            'mtime': fingerprint['mtime'],
+            'fingerprint': fingerprint['sample_sha256']
+        }
+        registered.append(video_path.name)
+        logging.info(f"Video registrado en su ubicación: {video_path}")
+    save_video_references(videos_folder, references)
+    return registered
+
+def resolve_video_references(videos_folder):
+    """Rutas de los videos registrados y los que se movieron o cambiaron
+
+    Basta un stat por video: si tamaño y mtime coinciden, la referencia es
+    válida. Si solo cambió el mtime se compara la huella muestreada (un
+    video copiado con otra fecha sigue siendo el mismo) y se actualiza.
+    Devuelve ({nombre: ruta}, {nombre: 'missing' | 'changed'}).
+    """
+    references = load_video_references(videos_folder)
+    resolved, problems = {}, {}
+    updated = False
+    for name, reference in references.items():
+        video_path = Path(reference['path'])
+        try:
+            stat = video_path.stat()
+        except OSError:
+            problems[name] = 'missing'
+            continue
+        if stat.st_size != reference['size']:
+            problems[name] = 'changed'
+            continue
+        if stat.st_mtime != reference['mtime']:
+            if compute_video_fingerprint(video_path)['sample_sha256'] != reference['fingerprint']:
+                problems[name] = 'changed'
+                continue
+            reference['mtime'] = stat.st_mtime
+            updated = True
+        resolved[name] = video_path
+
+    if updated:
+        save_video_references(videos_folder, references)
+    for name, problem in problems.items():
+        logging.warning(f"Video registrado {'no encontrado' if problem == 'missing' else 'modificado'}: "
+                        f"{references[name]['path']}")
+    return resolved, problems
+
+class VideoObjectStore:
+    """Almacén compartido de videos por contenido (Proyectos/.video_store)
+
+    Cada video se guarda una sola vez como objects/<sha256[:2]>/<sha256><ext>
+    y los proyectos lo enlazan (enlace duro) en su carpeta Videos/. Para
+    reconocer un video ya almacenado se compara primero la huella rápida
+    (tamaño y bloques muestreados) y solo si coincide con algún objeto se
+    confirma con el SHA-256 completo. El índice cuenta las referencias de
+    cada proyecto; los objetos sin referencias se eliminan con
+    garbage_collect().
+    """
+    INDEX_FILENAME = "index.json"
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.tmp_dir = self.root / "tmp"
+        self.index_path = self.root / self.INDEX_FILENAME
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        """Cargar índice de objetos"""
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.warning(f"Índice del almacén de videos ilegible: {e}")
+        return {'objects': {}}
+
+    def save_index(self, index):
+        """Guardar índice de forma atómica"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def object_path(self, sha256, index=None):
+        index = index or self.load_index()
+        return self.objects_dir / sha256[:2] / f"{sha256}{index['objects'][sha256]['ext']}"
+
+    def candidates(self, fingerprint):
+        """Objetos con la misma huella rápida (tamaño y bloques muestreados)"""
+        index = self.load_index()
+        return [sha256 for sha256, entry in index['objects'].items()
+                if entry['size'] == fingerprint['size'] and entry['sample'] == fingerprint['sample_sha256']
+                and self.object_path(sha256, index).exists()]
+
+    def temp_path(self, source, fingerprint):
+        """Archivo temporal de la copia de un origen (estable entre intentos para poder reanudar)"""
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        key = hashlib.sha256(f"{Path(source).resolve()}|{fingerprint['sample_sha256']}".encode()).hexdigest()
+        return self.tmp_dir / f"{key[:32]}.part"
+
+    def commit(self, tmp_path, sha256, fingerprint, ext):
+        """Publicar una copia terminada como objeto (si ya existía, se descarta la copia)"""
+        with self.lock:
+            index = self.load_index()
+            index['objects'].setdefault(sha256, {
+                'size': fingerprint['size'],
+                'sample': fingerprint['sample_sha256'],
+                'ext': ext,
+                'refs': [],
+                'added': datetime.now().isoformat()
+            })
+            target = self.object_path(sha256, index)
+            if target.exists():
+                tmp_path.unlink()
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, target)
+            self.save_index(index)
+        return target
+
+    def add_ref(self, sha256, ref):
+        """Registrar que un proyecto usa un objeto"""
+        with self.lock:
+            index = self.load_index()
+            refs = index['objects'][sha256]['refs']
+            if ref not in refs:
+                refs.append(ref)
+                self.save_index(index)
+
+    def release(self, ref):
+        """Quitar todas las referencias de un proyecto"""
+        with self.lock:
+            index = self.load_index()
+            for entry in index['objects'].values():
+                if ref in entry['refs']:
+                    entry['refs'].remove(ref)
+            self.save_index(index)
+
+    def garbage_collect(self):
+        """Eliminar objetos sin referencias; devuelve los bytes liberados"""
+        freed = 0
+        with self.lock:
+            index = self.load_index()
+            for sha256 in [h for h, entry in index['objects'].items() if not entry['refs']]:
+                object_path = self.object_path(sha256, index)
+                if object_path.exists():
+                    freed += object_path.stat().st_size
+                    object_path.unlink()
+                del index['objects'][sha256]
+            self.save_index(index)
+        return freed
+
+class VideoIngestEngine:
+    """Copia concurrente de videos a la carpeta de un proyecto
+
+    Cada archivo se copia en su propio hilo (hasta `max_workers` a la vez),
+    así que un origen lento no frena al resto. El avance se cuenta en bytes
+    y los errores se aíslan por archivo: un fallo queda en su resultado y
+    los demás archivos siguen copiándose.
+
+    Métodos de copia en orden de preferencia: reflink (FICLONE, btrfs/XFS),
+    enlace duro (solo con `allow_hardlinks`), copy_file_range y sendfile en
+    el kernel (mismo sistema de archivos), y si no la copia reanudable con
+    lectura en buffer de `buffer_size`, verificada por bloques. Un método no
+    soportado pasa al siguiente. Las copias se escriben en <nombre>.part y
+    solo se renombran al terminar.
+
+    Con `store` (VideoObjectStore) los videos que no se pueden clonar ni
+    enlazar pasan por el almacén compartido: un video ya almacenado no se
+    vuelve a copiar y uno nuevo se copia y se hashea (SHA-256); después se
+    enlaza en la carpeta destino con la referencia `project_ref`.
+    """
+    def __init__(self, files, destination_folder, max_workers=None, buffer_size=None, allow_hardlinks=None,
+                 store=None, project_ref=None):
+        settings = load_ingest_settings()
+        # Un destino por nombre: dos copias simultáneas al mismo archivo se pisarían
+        by_name = {}
+        for f in map(Path, files):
+            if f.name in by_name:
+                logging.warning(f"Video omitido, ya hay otro con el mismo nombre: {f}")
+                continue
+            by_name[f.name] = f
+        self.files = list(by_name.values())
+        self.destination_folder = Path(destination_folder)
+        self.max_workers = max_workers or settings['workers']
+        self.buffer_size = buffer_size or INGEST_BUFFER_SIZE
+        self.allow_hardlinks = bool(settings['hardlinks'] if allow_hardlinks is None else allow_hardlinks)
+        self.store = store
+        self.project_ref = project_ref
+        self.sizes = {str(f): f.stat().st_size for f in self.files}
+        self.total_bytes = sum(self.sizes.values())
+
+        self.lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.copied_bytes = 0
+        self.active = {}
+        self.results = []
+        self.start_time = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def add_bytes(self, source, count):
+        with self.lock:
+            self.copied_bytes += count
+            self.active[str(source)] += count
+
+    def reset_bytes(self, source):
+        """Descontar el avance de un archivo (p. ej. tras una verificación descartada)"""
+        with self.lock:
+            self.copied_bytes -= self.active[str(source)]
+            self.active[str(source)] = 0
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise InterruptedError("Copia cancelada")
+
+    def try_hardlink(self, source, destination):
+        if not self.allow_hardlinks:
+            return False
+        # Enlazar con un nombre temporal y renombrar: si el enlace falla, el destino anterior sigue intacto
+        tmp_link = self.part_path(destination)
+        tmp_link.unlink(missing_ok=True)
+        try:
+            os.link(source, tmp_link)
+        except OSError as e:
+            if e.errno in COPY_UNSUPPORTED_ERRNOS or e.errno == errno.EMLINK:
+                return False
+            raise
+        os.replace(tmp_link, destination)
+        self.add_bytes(source, self.sizes[str(source)])
+        return True
+
+    def try_reflink(self, source, src, dst):
+        try:
+            import fcntl
+        except ImportError:
+            return False
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError as e:
+            if e.errno in COPY_UNSUPPORTED_ERRNOS:
+                return False
+            raise
+        self.add_bytes(source, self.sizes[str(source)])
+        return True
+
+    def kernel_copy(self, source, copy_chunk):
+        """Bucle común de copy_file_range/sendfile; False si el método no está soportado"""
+        size = self.sizes[str(source)]
+        offset = 0
+        while offset < size:
+            self.check_cancelled()
+            try:
+                count = copy_chunk(offset, min(INGEST_KERNEL_CHUNK, size - offset))
+            except OSError as e:
+                if offset == 0 and e.errno in COPY_UNSUPPORTED_ERRNOS:
+                    return False
+                raise
+            if not count:
+                raise IOError(f"El archivo se acortó durante la copia ({offset} de {size} bytes)")
+            offset += count
+            self.add_bytes(source, count)
+        return True
+
+    def try_copy_file_range(self, source, src, dst):
+        if not hasattr(os, 'copy_file_range'):
+            return False
+        return self.kernel_copy(source, lambda offset, count: os.copy_file_range(
+            src.fileno(), dst.fileno(), count, offset, offset))
+
+    def try_sendfile(self, source, src, dst):
+        # Fuera de Linux sendfile solo escribe en sockets
+        if not hasattr(os, 'sendfile') or not sys.platform.startswith('linux'):
+            return False
+        return self.kernel_copy(source, lambda offset, count: os.sendfile(
+            dst.fileno(), src.fileno(), offset, count))
+
+    def buffered_copy(self, source, src, dst, digest=None):
+        """Copia en espacio de usuario; con `digest` se hashea en la misma pasada (dst None: solo hashear)"""
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        while True:
+            self.check_cancelled()
+            count = src.readinto(buffer)
+            if not count:
+                return True
+            if digest is not None:
+                digest.update(view[:count])
+            if dst is not None:
+                dst.write(view[:count])
+            self.add_bytes(source, count)
+
+    def read_block(self, view, src, dst=None, digests=(), progress_source=None):
+        """Leer (y opcionalmente escribir) hasta un bloque de verificación; devuelve los bytes leídos"""
+        total = 0
+        while total < INGEST_CHECKPOINT_BYTES:
+            self.check_cancelled()
+            count = src.readinto(view[:min(len(view), INGEST_CHECKPOINT_BYTES - total)])
+            if not count:
+                break
+            chunk = view[:count]
+            for digest in digests:
+                digest.update(chunk)
+            if dst is not None:
+                dst.write(chunk)
+            if progress_source is not None:
+                self.add_bytes(progress_source, count)
+            total += count
+        return total
+
+    @staticmethod
+    def save_copy_state(state_path, state):
+        tmp_path = state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def resumable_copy(self, source, part_path):
+        """Copia reanudable y verificada a `part_path`; devuelve el SHA-256 del archivo
+
+        Cada bloque de INGEST_CHECKPOINT_BYTES se hashea al leerlo del origen
+        y, tras fsync, su hash queda en <part>.json. Al reanudar se vuelven a
+        hashear los bloques ya escritos y la copia continúa desde el último
+        bloque íntegro. Al terminar se comprueba el tamaño y se releen los
+        bloques escritos en esta pasada contra los hashes del origen; el
+        SHA-256 completo se calcula con esas mismas lecturas.
+        """
+        size = self.sizes[str(source)]
+        stat = source.stat()
+        identity = {'source': str(source.resolve()), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        state_path = part_path.with_name(part_path.name + '.json')
+        try:
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        # Un .part de otra versión del origen no se puede reanudar
+        blocks = state.get('blocks', []) if state.get('identity') == identity and part_path.exists() else []
+
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        digest = hashlib.sha256()
+        verified = 0
+        if blocks:
+            with open(part_path, 'rb') as part:
+                for index, expected in enumerate(blocks):
+                    checkpoint = digest.copy()
+                    block_digest = hashlib.sha256()
+                    count = self.read_block(view, part, None, (block_digest, digest), source)
+                    if count != INGEST_CHECKPOINT_BYTES or block_digest.hexdigest() != expected:
+                        digest = checkpoint
+                        self.add_bytes(source, -count)
+                        blocks = blocks[:index]
+                        break
+                    verified += count
+            if verified:
+                logging.info(f"Reanudando {source.name} desde {verified / 1024**2:.0f} MB verificados")
+
+        start_block = len(blocks)
+        with open(source, 'rb') as src, open(part_path, 'r+b' if verified else 'wb') as dst:
+            dst.truncate(verified)
+            src.seek(verified)
+            dst.seek(verified)
+            offset = verified
+            while True:
+                block_digest = hashlib.sha256()
+                count = self.read_block(view, src, dst, (block_digest, digest), source)
+                if not count:
+                    break
+                offset += count
+                if count == INGEST_CHECKPOINT_BYTES:
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                    blocks.append(block_digest.hexdigest())
+                    self.save_copy_state(state_path, {'identity': identity, 'blocks': blocks})
+                else:
+                    # Bloque final incompleto: solo se usa en la verificación
+                    blocks.append(block_digest.hexdigest())
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        if offset != size:
+            raise IOError(f"Tamaño incorrecto tras la copia de {source.name}: {offset} de {size} bytes")
+
+        with open(part_path, 'rb') as part:
+            part.seek(start_block * INGEST_CHECKPOINT_BYTES)
+            for index in range(start_block, len(blocks)):
+                block_digest = hashlib.sha256()
+                self.read_block(view, part, None, (block_digest,))
+                if block_digest.hexdigest() != blocks[index]:
+                    # El siguiente intento reanuda desde el último bloque correcto
+                    self.save_copy_state(state_path, {'identity': identity, 'blocks': blocks[:index]})
+                    raise IOError(f"Verificación fallida en {source.name} (bloque {index})")
+
+        state_path.unlink(missing_ok=True)
+        return digest.hexdigest()
+
+    @staticmethod
+    def part_path(destination):
+        return destination.with_name(destination.name + '.part')
+
+    def hash_file(self, path):
+        """SHA-256 de un archivo ya copiado (sin contar avance)"""
+        digest = hashlib.sha256()
+        view = memoryview(bytearray(self.buffer_size))
+        with open(path, 'rb') as f:
+            while self.read_block(view, f, None, (digest,)):
+                pass
+        return digest.hexdigest()
+
+    def store_file(self, source, destination):
+        """Ingresar un video por el almacén compartido y enlazarlo en el destino
+
+        En el mismo sistema de archivos un reflink o un enlace duro (si se
+        permite) no copia datos y no pasa por el almacén. Un objeto nuevo se
+        llena con copia en el kernel cuando el origen está en el disco del
+        almacén (y se hashea después); si no, con la copia reanudable, que
+        hashea en la misma pasada.
+        """
+        if destination.exists() and os.path.samefile(source, destination):
+            self.add_bytes(source, self.sizes[str(source)])
+            return 'existing'
+        if same_filesystem([source], destination.parent):
+            method = self.zero_copy(source, destination)
+            if method is not None:
+                return method
+
+        fingerprint = compute_video_fingerprint(source)
+        sha256 = None
+        method = 'dedup'
+
+        candidates = self.store.candidates(fingerprint)
+        if candidates:
+            # Huella rápida coincidente: confirmar con el hash completo antes de reutilizar
+            digest = hashlib.sha256()
+            with open(source, 'rb') as src:
+                self.buffered_copy(source, src, None, digest)
+            if digest.hexdigest() in candidates:
+                sha256 = digest.hexdigest()
+            else:
+                self.reset_bytes(source)
+
+        if sha256 is None:
+            method = 'store'
+            tmp_path = self.store.temp_path(source, fingerprint)
+            if same_filesystem([source], tmp_path.parent):
+                _, sha256 = self.copy_into_part(source, tmp_path, self.kernel_strategies())
+            if sha256 is None:
+                sha256 = self.resumable_copy(source, tmp_path)
+            shutil.copystat(source, tmp_path)
+            self.store.commit(tmp_path, sha256, fingerprint, source.suffix.lower())
+
+        self.store.add_ref(sha256, self.project_ref)
+        object_path = self.store.object_path(sha256)
+        if destination.exists() and os.path.samefile(object_path, destination):
+            return method
+        try:
+            tmp_link = self.part_path(destination)
+            tmp_link.unlink(missing_ok=True)
+            os.link(object_path, tmp_link)
+        except OSError as e:
+            # Sistema de archivos sin enlaces duros: el proyecto necesita su propia copia
+            logging.warning(f"No se pudo enlazar {destination.name} desde el almacén, se copia: {e}")
+            shutil.copy2(object_path, tmp_link)
+            if self.hash_file(tmp_link) != sha256:
+                tmp_link.unlink(missing_ok=True)
+                raise IOError(f"Verificación fallida en {destination.name} (copia desde el almacén)")
+        os.replace(tmp_link, destination)
+        return method
+
+    def copy_into_part(self, source, part_path, strategies):
+        """Copiar a `part_path` con la primera estrategia soportada; devuelve (nombre, SHA-256) o (None, None)
+
+        Los datos no pasan por espacio de usuario, así que la copia se
+        verifica después: el SHA-256 del .part debe coincidir con el del
+        origen antes de que nadie lo renombre.
+        """
+        with open(source, 'rb') as src, open(part_path, 'wb') as dst:
+            for name, strategy in strategies:
+                if strategy(source, src, dst):
+                    break
+            else:
+                return None, None
+        if part_path.stat().st_size != self.sizes[str(source)]:
+            raise IOError(f"Tamaño incorrecto tras la copia de {source.name}")
+        sha256 = self.hash_file(part_path)
+        if sha256 != self.hash_file(source):
+            part_path.unlink(missing_ok=True)
+            raise IOError(f"Verificación fallida en {source.name} ({name})")
+        return name, sha256
+
+    def kernel_strategies(self):
+        return (('copy_file_range', self.try_copy_file_range), ('sendfile', self.try_sendfile))
+
+    def zero_copy(self, source, destination):
+        """Reflink o, si se permite, enlace duro (mismo sistema de archivos); None si ninguno aplica
+
+        El reflink va primero: el clon CoW es independiente del original,
+        mientras que un enlace duro comparte el inodo y editar la copia
+        edita el origen.
+        """
+        part_path = self.part_path(destination)
+        method, _ = self.copy_into_part(source, part_path, (('reflink', self.try_reflink),))
+        if method is not None:
+            shutil.copystat(source, part_path)
+            os.replace(part_path, destination)
+            return 'reflink'
+        part_path.unlink(missing_ok=True)
+        if self.try_hardlink(source, destination):
+            return 'hardlink'
+        return None
+
+    def copy_file(self, source, destination):
+        """Copiar con el primer método disponible; devuelve su nombre
+
+        Todo se escribe en <destino>.part y se renombra de forma atómica al
+        terminar, así que en Videos/ nunca queda un video truncado con su
+        nombre final. En el mismo sistema de archivos se prueban reflink,
+        enlace duro, copy_file_range y sendfile; entre discos distintos
+        (p. ej. un USB) se usa la copia reanudable y verificada. Conserva
+        fechas y permisos como shutil.copy2 (salvo el enlace duro, que
+        comparte el original).
+        """
+        # Abrir el destino para escritura truncaría el propio origen
+        if destination.exists() and os.path.samefile(source, destination):
+            self.add_bytes(source, self.sizes[str(source)])
+            return 'existing'
+
+        part_path = self.part_path(destination)
+        method = None
+        if same_filesystem([source], destination.parent):
+            method = self.zero_copy(source, destination)
+            if method is not None:
+                return method
+            method, _ = self.copy_into_part(source, part_path, self.kernel_strategies())
+        if method is None:
+            method = 'verified'
+            self.resumable_copy(source, part_path)
+
+        shutil.copystat(source, part_path)
+        os.replace(part_path, destination)
+        return method
+
+    def ingest_file(self, source):
+        """Copiar un archivo y devolver su resultado (nunca lanza excepción)
+
+        Un error de E/S (p. ej. un disco USB desconectado) se reintenta hasta
+        INGEST_RETRIES veces; la copia reanudable continúa desde el último
+        bloque verificado. Un archivo fallido no afecta a los demás y su
+        .part se conserva para reanudar en una próxima ingesta.
+        """
+        destination = self.destination_folder / source.name
+        with self.lock:
+            self.active[str(source)] = 0
+        start = time.perf_counter()
+        method = None
+        status, error = 'error', None
+        try:
+            for attempt in range(1, INGEST_RETRIES + 1):
+                try:
+                    if self.store is not None:
+                        method = self.store_file(source, destination)
+                    else:
+                        method = self.copy_file(source, destination)
+                    status, error = 'success', None
+                    logging.info(f"Video copiado: {source.name} ({method})")
+                    break
+                except InterruptedError as e:
+                    status, error = 'cancelled', str(e)
+                    break
+                except OSError as e:
+                    status, error = 'error', str(e)
+                    if attempt == INGEST_RETRIES or self.cancel_event.is_set():
+                        break
+                    logging.warning(f"Reintento {attempt}/{INGEST_RETRIES} de {source.name}: {e}")
+                    self.reset_bytes(source)
+                    # Esperar (p. ej. a que el disco se reconecte) sin bloquear una cancelación
+                    self.cancel_event.wait(INGEST_RETRY_DELAY * attempt)
+        except Exception as e:
+            status, error = 'error', str(e)
+        finally:
+            if status == 'error':
+                logging.error(f"Error copiando {source.name}: {error}")
+            with self.lock:
+                done = self.active.pop(str(source))
+                # Lo copiado de un archivo fallido no cuenta como avance
+                if status != 'success':
+                    self.copied_bytes -= done
+
+        result = {'source': str(source), 'destination': str(destination), 'status': status, 'method': method,
+                  'error': error, 'bytes': self.sizes[str(source)], 'seconds': time.perf_counter() - start}
+        with self.lock:
+            self.results.append(result)
+        return result
+
+    def run(self):
+        """Copiar todos los archivos; devuelve la lista de resultados"""
+        self.destination_folder.mkdir(parents=True, exist_ok=True)
+        self.start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for future in as_completed([executor.submit(self.ingest_file, f) for f in self.files]):
+                future.result()
+        return self.results
+
+    def snapshot(self):
+        """Bytes copiados, velocidad (MB/s), ETA y archivos en curso"""
+        with self.lock:
+            copied = self.copied_bytes
+            active = {Path(path).name: (done, self.sizes[path]) for path, done in self.active.items()}
+            completed = sum(1 for r in self.results if r['status'] == 'success')
+            failed = sum(1 for r in self.results if r['status'] == 'error')
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        rate = copied / elapsed if elapsed > 0 else 0.0
+        return {
+            'copied_bytes': copied,
+            'total_bytes': self.total_bytes,
+            'rate_mb_s': rate / 1024**2,
+            'eta': (self.total_bytes - copied) / rate if rate else 0.0,
+            'active': active,
+            'completed': completed,
+            'failed': failed
+        }
 
 class SLEAPPredictor:
     """Clase para manejar predicciones SLEAP"""
@@ -376,8 +4420,7 @@ class SLEAPPredictor:
         # Crear carpetas necesarias
         folders = {
             'videos': project_folder / "Videos",
-            'data_sleap': project_folder / "Data_Sleap", 
-            'models': project_folder / "models"
+            'data_sleap': project_folder / "Data_Sleap"
         }
         
         for folder_name, folder_path in folders.items():
@@ -386,11 +4429,60 @@ class SLEAPPredictor:
         
         return folders
     
-    def download_models(self, models_folder):
-        """Descargar modelos desde GitHub"""
+    def resolve_models(self, project_name):
+        """Modelos del proyecto desde el almacén compartido
+
+        El proyecto guarda en models.json la huella de cada modelo. Si falta,
+        se usa el modelo registrado con ese nombre (los incluidos están
+        siempre); una copia antigua en models/ del proyecto se migra al
+        almacén, y solo como último recurso se descarga.
+        """
+        store = ModelStore()
+        project_folder = self.parent.projects_root_dir / project_name
+        pointer_path = project_folder / "models.json"
+        try:
+            with open(pointer_path, 'r') as f:
+                pointer = json.load(f)
+        except (OSError, ValueError):
+            pointer = {}
+
+        index = store.load_index()
+        resolved = {}
+        for model_name, url in self.models_urls.items():
+            filename = url.split('/')[-1]
+            model_hash = pointer.get(model_name, {}).get('model')
+            if model_hash not in index['models']:
+                legacy_path = project_folder / "models" / filename
+                if legacy_path.exists():
+                    model_hash = store.add(legacy_path)
+                    shutil.rmtree(legacy_path) if legacy_path.is_dir() else legacy_path.unlink()
+                    logging.info(f"Modelo {filename} de {project_name} migrado al almacén compartido")
+                else:
+                    model_hash = store.find(filename)
+                if model_hash is None:
+                    download_folder = store.root / "downloads"
+                    download_folder.mkdir(parents=True, exist_ok=True)
+                    downloaded = self.download_models(download_folder, only=[model_name])
+                    model_hash = store.add(downloaded[model_name], name=filename)
+                    shutil.rmtree(downloaded[model_name])
+                index = store.load_index()
+
+            store.add_ref(model_hash, str(project_folder.resolve()))
+            pointer[model_name] = {'model': model_hash, 'name': filename}
+            resolved[model_name] = store.model_path(model_hash, index)
+
+        with open(pointer_path, 'w') as f:
+            json.dump(pointer, f, indent=2)
+        return resolved
+
+    def download_models(self, models_folder, only=None):
+        """Descargar modelos desde GitHub (ver ModelTransferEngine)"""
+        engine = ModelTransferEngine()
         downloaded_models = {}
         
         for model_name, url in self.models_urls.items():
+            if only is not None and model_name not in only:
+                continue
             try:
                 # Extraer nombre de archivo de la URL
                 filename = url.split('/')[-1]
@@ -401,16 +4493,7 @@ class SLEAPPredictor:
                     downloaded_models[model_name] = model_path
                     continue
                 
-                logging.info(f"Descargando modelo: {filename}")
-                
-                response = requests.get(url, stream=True, timeout=300)
-                response.raise_for_status()
-                
-                with open(model_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
-                downloaded_models[model_name] = model_path
+                downloaded_models[model_name] = engine.download_model(url, model_path)
                 logging.info(f"Modelo descargado: {filename}")
                 
             except Exception as e:
@@ -420,19 +4503,52 @@ class SLEAPPredictor:
         return downloaded_models
     
     def get_video_files(self, videos_folder):
-        """Obtener lista de archivos de video"""
-        video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm', '.m4v')
+        """Obtener lista de archivos de video (copiados y registrados en su ubicación)"""
         video_files = []
         
         if videos_folder.exists():
             for file_path in videos_folder.iterdir():
-                if file_path.is_file() and file_path.suffix.lower() in video_extensions:
+                if file_path.is_file() and file_path.suffix.lower() in VIDEO_EXTENSIONS:
                     video_files.append(file_path)
         
+        # Los videos movidos o modificados se omiten (quedan en el log)
+        copied = {file_path.name for file_path in video_files}
+        resolved, _ = resolve_video_references(videos_folder)
+        video_files.extend(path for name, path in resolved.items() if name not in copied)
+
         return video_files
     
-    def run_prediction(self, project_name):
-        """Ejecutar predicción completa"""
+    def get_inference_params(self):
+        """Parámetros que determinan el resultado de la inferencia (sleap_params del proyecto)"""
+        sleap_params = self.parent.sleap_params
+        return {
+            'sleap_version': SLEAP_VERSION,
+            'peak_threshold': float(sleap_params.get('confidence_threshold', 0.2)),
+            'max_instances': int(sleap_params.get('max_instances') or 0) or None,
+            'tracker': 'simple' if sleap_params.get('tracking') else None,
+            'proxy_centroid': bool(sleap_params.get('proxy_centroid', False)),
+            'compiled_graphs': bool(sleap_params.get('compiled_graphs', False))
+        }
+
+    def get_project_rois(self, project_name, videos):
+        """ROI de arena por video: la del video o, si no tiene, la del proyecto"""
+        project_data = self.parent.projects_data.get(project_name, {})
+        video_rois = project_data.get('video_rois', {})
+        project_roi = project_data.get('roi')
+
+        rois = {}
+        for video in videos:
+            roi = video_rois.get(Path(video).name, project_roi)
+            if roi:
+                rois[Path(video).name] = [int(v) for v in roi]
+        return rois
+
+    def run_prediction(self, project_name, preview=False, centroid_only=False):
+        """Ejecutar predicción completa (o vista previa rápida con preview=True)
+
+        Con centroid_only=True solo se ejecuta el modelo de centroides y se
+        escriben *_centroids.slp con una instancia de un nodo por animal.
+        """
         try:
             # 1. Verificar SLEAP
             sleap_ok, sleap_msg = self.check_sleap_installation()
@@ -446,24 +4562,67 @@ class SLEAPPredictor:
             # 3. Configurar estructura de carpetas
             folders = self.setup_project_structure(project_name)
             
-            # 4. Descargar modelos
-            self.parent.update_status("📥 Descargando modelos SLEAP...")
-            models = self.download_models(folders['models'])
+            # 4. Modelos desde el almacén compartido (descarga solo si faltan)
+            self.parent.update_status("📥 Preparando modelos SLEAP...")
+            models = self.resolve_models(project_name)
             
             # 5. Obtener videos
             videos = self.get_video_files(folders['videos'])
             if not videos:
                 return False, "No se encontraron videos en la carpeta del proyecto"
             
-            # 6. Ejecutar predicciones con ventana de progreso
+            # 6. Reanudar un lote interrumpido o en curso de este proyecto
+            job_queue = PredictionJobQueue()
+            unfinished = [b for b in job_queue.unfinished_batches(project_name, preview=preview)
+                          if bool(b['context']['inference_params'].get('centroid_only')) == centroid_only]
+            if unfinished:
+                logging.info(f"Reanudando lote de predicción {unfinished[0]['id']} de {project_name}")
+                progress_window = SLEAPProgressWindow(self.parent, job_queue, unfinished[0]['id'])
+                self.parent.root.wait_window(progress_window.window)
+                return progress_window.success, "Predicciones completadas" if progress_window.success else "Error en predicciones"
+
+            # 7. Saltar videos cuyas predicciones siguen vigentes
+            preview_stride = int(self.parent.sleap_params.get('preview_stride', 10)) if preview else None
+            manifest = PredictionManifest(folders['data_sleap'], preview=preview, centroid_only=centroid_only)
+            model_fingerprint = compute_model_fingerprint(models)
+            inference_params = self.get_inference_params()
+            if preview_stride:
+                inference_params['preview_stride'] = preview_stride
+            if centroid_only:
+                inference_params['centroid_only'] = True
+            rois = self.get_project_rois(project_name, videos)
+            pending = manifest.pending_videos(videos, model_fingerprint, inference_params, rois)
+
+            skipped = len(videos) - len(pending)
+            if skipped:
+                logging.info(f"{skipped} video(s) con predicciones vigentes, se omiten")
+
+            if not pending:
+                return True, "Todas las predicciones están actualizadas"
+
+            # 8. Encolar el lote de forma persistente y ejecutarlo con ventana de progreso
             self.parent.update_status("🧠 Iniciando predicciones SLEAP...")
             
-            progress_window = SLEAPProgressWindow(
-                self.parent, 
-                videos, 
-                models, 
-                folders['data_sleap']
-            )
+            # En GPU un solo worker aprovecha el dispositivo; en CPU se reparten núcleos
+            context = {
+                'videos': [str(v) for v in pending],
+                'models_info': {name: str(path) for name, path in models.items()},
+                'output_folder': str(folders['data_sleap']),
+                'max_workers': 1 if gpu_available else None,
+                'model_fingerprint': model_fingerprint,
+                'inference_params': inference_params,
+                'batch_size': int(self.parent.sleap_params.get('batch_size', 4)),
+                'auto_tune_batch_size': self.parent.sleap_params.get('auto_tune_batch_size', False),
+                'preview_stride': preview_stride,
+                'rois': rois,
+                # Los resultados de otros proyectos se buscan al preparar el lote, fuera del hilo de Tk
+                'prediction_cache': True
+            }
+            # Las vistas previas pasan delante de las predicciones completas
+            batch_id = job_queue.create_batch(project_name, context, preview=preview,
+                                              priority=PREVIEW_JOB_PRIORITY if preview else 0)
+
+            progress_window = SLEAPProgressWindow(self.parent, job_queue, batch_id)
             
             # Esperar a que termine el procesamiento
             self.parent.root.wait_window(progress_window.window)
@@ -736,14 +4895,16 @@ class ModernColors:
 
 class VideoProgressWindow:
     """Ventana de progreso para copia de videos"""
-    def __init__(self, parent, videos_to_copy, destination_folder):
+    def __init__(self, parent, videos_to_copy, destination_folder, store=None, project_ref=None):
         self.parent = parent
         self.videos_to_copy = videos_to_copy
         self.destination_folder = destination_folder
+        self.store = store
+        self.project_ref = project_ref
         self.total_videos = len(videos_to_copy)
-        self.current_video = 0
         self.copying = True
         self.success = False
+        self.engine = None
         
         # Crear ventana
         self.window = tk.Toplevel(parent.root)
@@ -816,7 +4977,7 @@ class VideoProgressWindow:
                 fg=ModernColors.TEXT_PRIMARY, 
                 bg=ModernColors.CARD_BG).pack(pady=(15, 10))
         
-        self.progress_label = tk.Label(progress_frame, text="Video 0 de " + str(self.total_videos), 
+        self.progress_label = tk.Label(progress_frame, text="Preparando copia...",
                                       font=("Segoe UI", 12), 
                                       fg=ModernColors.TEXT_PRIMARY, 
                                       bg=ModernColors.CARD_BG)
@@ -865,63 +5026,67 @@ class VideoProgressWindow:
                                       activebackground="#f25255",
                                       relief="flat", padx=20, pady=8)
         self.cancel_button.pack()
-    
+
     def copy_videos_thread(self):
-        """Hilo para copiar videos"""
+        """Hilo para copiar videos con el motor de ingesta concurrente"""
         try:
-            for i, video_path in enumerate(self.videos_to_copy):
-                if not self.copying:
-                    break
-                
-                self.current_video = i + 1
-                video_name = Path(video_path).name
-                destination_path = self.destination_folder / video_name
-                
-                # Actualizar UI
-                self.window.after(0, self.update_progress, video_name, video_path)
-                
-                # Copiar archivo
-                try:
-                    shutil.copy2(video_path, destination_path)
-                    logging.info(f"Video copiado: {video_name}")
-                except Exception as e:
-                    logging.error(f"Error copiando {video_name}: {e}")
-                    self.window.after(0, self.show_error, f"Error copiando {video_name}:\n{e}")
-                    return
-                
-                # Pequeña pausa para no saturar la UI
-                time.sleep(0.1)
+            self.engine = VideoIngestEngine(self.videos_to_copy, self.destination_folder,
+                                            store=self.store, project_ref=self.project_ref)
+            self.window.after(0, self.start_progress_polling)
+            results = self.engine.run()
             
-            if self.copying:
-                self.success = True
-                self.window.after(0, self.copy_completed)
+            if not self.copying:
+                return
+            failed = [r for r in results if r['status'] == 'error']
+            if failed:
+                errors = "\n".join(f"• {Path(r['source']).name}: {r['error']}" for r in failed)
+                copied = len(results) - len(failed)
+                self.window.after(0, self.show_error,
+                                  f"{len(failed)} video(s) no se pudieron copiar "
+                                  f"({copied} copiados correctamente):\n{errors}\n\n"
+                                  f"Al volver a agregarlos, la copia se reanuda desde lo ya verificado.")
+                return
+
+            self.success = True
+            self.window.after(0, self.copy_completed)
                 
         except Exception as e:
             logging.error(f"Error en copia de videos: {e}")
             self.window.after(0, self.show_error, f"Error general en la copia:\n{e}")
     
-    def update_progress(self, video_name, video_path):
-        """Actualizar interfaz de progreso"""
-        # Actualizar contador
-        self.progress_label.config(text=f"Video {self.current_video} de {self.total_videos}")
-        
-        # Actualizar barra de progreso
-        self.progress_bar['value'] = self.current_video
-        
-        # Actualizar porcentaje
-        percentage = int((self.current_video / self.total_videos) * 100)
+    def start_progress_polling(self):
+        """Configurar la barra en bytes y empezar a refrescar el avance"""
+        self.progress_bar['maximum'] = max(1, self.engine.total_bytes)
+        self.update_progress()
+
+    def update_progress(self):
+        """Actualizar interfaz de progreso (bytes, MB/s y archivos en curso)"""
+        if not self.copying or self.success or not self.window.winfo_exists():
+            return
+        snapshot = self.engine.snapshot()
+
+        self.progress_label.config(
+            text=f"{snapshot['copied_bytes'] / 1024**3:.2f} de {snapshot['total_bytes'] / 1024**3:.2f} GB  •  "
+                 f"{snapshot['rate_mb_s']:.1f} MB/s  •  ETA {format_duration(snapshot['eta'])}\n"
+                 f"Videos completados: {snapshot['completed']} de {self.total_videos}")
+        self.progress_bar['value'] = snapshot['copied_bytes']
+        percentage = int(snapshot['copied_bytes'] / max(1, snapshot['total_bytes']) * 100)
         self.percentage_label.config(text=f"{percentage}%")
         
-        # Actualizar video actual
-        self.current_video_label.config(text=f"Copiando: {video_name}\nDesde: {video_path}")
+        active = [f"{name} ({int(done / max(1, size) * 100)}%)" for name, (done, size) in snapshot['active'].items()]
+        self.current_video_label.config(text="Copiando: " + ", ".join(active) if active else "Finalizando...")
         
-        self.window.update_idletasks()
+        self.window.after(int(INGEST_PROGRESS_INTERVAL * 1000), self.update_progress)
     
     def copy_completed(self):
         """Copia completada exitosamente"""
         self.progress_label.config(text="¡Copia completada exitosamente!")
         self.percentage_label.config(text="100%", fg=ModernColors.ACCENT_GREEN)
-        self.current_video_label.config(text=f"✅ Todos los videos han sido copiados correctamente\n\nTotal: {self.total_videos} videos")
+        reused = sum(1 for r in self.engine.results if r['method'] == 'dedup')
+        summary = f"✅ Todos los videos han sido copiados correctamente\n\nTotal: {self.total_videos} videos"
+        if reused:
+            summary += f"\n♻️ Ya almacenados por otro proyecto (sin copiar): {reused}"
+        self.current_video_label.config(text=summary)
         
         self.cancel_button.config(text="✅ Cerrar", bg=ModernColors.ACCENT_GREEN,
                                  activebackground="#67f297", command=self.close_success)
@@ -936,6 +5101,8 @@ class VideoProgressWindow:
         """Cancelar copia de videos"""
         if messagebox.askyesno("⚠️ Cancelar Copia", "¿Estás seguro de que deseas cancelar la copia de videos?"):
             self.copying = False
+            if self.engine is not None:
+                self.engine.cancel()
             self.window.destroy()
     
     def close_success(self):
@@ -954,6 +5121,671 @@ class VideoProgressWindow:
         else:
             self.cancel_copy()
 
+class ROISelectorWindow:
+    """Ventana para definir la región de la arena (ROI) de un proyecto"""
+    CANVAS_WIDTH = 800
+    CANVAS_HEIGHT = 500
+
+    def __init__(self, parent, project_name):
+        self.parent = parent
+        self.project_name = project_name
+        self.project_data = parent.projects_data[project_name]
+        self.videos_folder = parent.get_project_videos_folder(project_name)
+        self.videos = list(self.project_data.get("videos", []))
+        # Los videos registrados en su ubicación no están en la carpeta del proyecto
+        self.linked_videos, _ = resolve_video_references(self.videos_folder)
+
+        self.background = None
+        self.photo = None
+        self.scale = 1.0
+        self.roi = None
+        self.drag_start = None
+
+        self.window = tk.Toplevel(parent.root)
+        self.window.title(f"🎯 ROI de Arena - {project_name}")
+        self.window.configure(bg=ModernColors.PRIMARY_DARK)
+        self.window.transient(parent.root)
+
+        self.center_window()
+        self.setup_ui()
+
+        if self.videos:
+            self.video_var.set(self.videos[0])
+            self.load_video()
+
+    def center_window(self):
+        """Centrar ventana en pantalla"""
+        self.window.update_idletasks()
+        width = 860
+        height = 720
+        x = (self.window.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.window.winfo_screenheight() // 2) - (height // 2)
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+
+    def setup_ui(self):
+        """Configurar interfaz del selector"""
+        header_frame = tk.Frame(self.window, bg=ModernColors.ACCENT_ORANGE, height=60)
+        header_frame.pack(fill="x")
+        header_frame.pack_propagate(False)
+
+        tk.Label(header_frame, text="🎯 Región de la Arena",
+                font=("Segoe UI", 16, "bold"),
+                fg=ModernColors.TEXT_PRIMARY,
+                bg=ModernColors.ACCENT_ORANGE).pack(expand=True)
+
+        main_container = tk.Frame(self.window, bg=ModernColors.PRIMARY_DARK)
+        main_container.pack(fill="both", expand=True, padx=20, pady=15)
+
+        selector_frame = tk.Frame(main_container, bg=ModernColors.PRIMARY_DARK)
+        selector_frame.pack(fill="x", pady=(0, 10))
+
+        tk.Label(selector_frame, text="Video:",
+                font=("Segoe UI", 11),
+                fg=ModernColors.TEXT_PRIMARY,
+                bg=ModernColors.PRIMARY_DARK).pack(side="left")
+
+        self.video_var = tk.StringVar()
+        video_combo = ttk.Combobox(selector_frame, textvariable=self.video_var,
+                                   values=self.videos, state="readonly", width=60)
+        video_combo.pack(side="left", padx=10)
+        video_combo.bind("<<ComboboxSelected>>", lambda event: self.load_video())
+
+        self.canvas = tk.Canvas(main_container, width=self.CANVAS_WIDTH, height=self.CANVAS_HEIGHT,
+                                bg=ModernColors.CARD_BG, highlightthickness=0, cursor="crosshair")
+        self.canvas.pack()
+        self.canvas.bind("<ButtonPress-1>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.on_release)
+
+        self.roi_label = tk.Label(main_container, text="Arrastre sobre la imagen para marcar la arena",
+                                 font=("Segoe UI", 10),
+                                 fg=ModernColors.TEXT_SECONDARY,
+                                 bg=ModernColors.PRIMARY_DARK)
+        self.roi_label.pack(pady=8)
+
+        buttons_frame = tk.Frame(main_container, bg=ModernColors.PRIMARY_DARK)
+        buttons_frame.pack(fill="x")
+
+        for text, color, command in [
+            ("🔍 Auto-detectar", ModernColors.ACCENT_BLUE, self.auto_detect),
+            ("🎬 Guardar para este video", ModernColors.ACCENT_GREEN, self.save_for_video),
+            ("📁 Guardar para todo el proyecto", ModernColors.ACCENT_PURPLE, self.save_for_project),
+            ("🗑️ Quitar ROI", ModernColors.ACCENT_RED, self.clear_roi),
+        ]:
+            tk.Button(buttons_frame, text=text, command=command,
+                     bg=color, fg="white", font=("Segoe UI", 10, "bold"),
+                     relief="flat", padx=12, pady=6).pack(side="left", padx=5)
+
+    def video_path(self, video_name):
+        """Ruta del video: la copia del proyecto o la ubicación registrada"""
+        video_path = self.videos_folder / video_name
+        if not video_path.exists() and video_name in self.linked_videos:
+            return self.linked_videos[video_name]
+        return video_path
+
+    def current_roi(self, video_name):
+        """ROI vigente de un video: la propia o la del proyecto"""
+        return self.project_data.get("video_rois", {}).get(video_name, self.project_data.get("roi"))
+
+    def load_video(self):
+        """Calcular el fondo del video seleccionado y mostrarlo"""
+        video_name = self.video_var.get()
+        try:
+            self.window.config(cursor="watch")
+            self.window.update_idletasks()
+            self.background = compute_median_background(self.video_path(video_name))
+        except Exception as e:
+            logging.error(f"Error calculando fondo de {video_name}: {e}")
+            messagebox.showerror("❌ Error", f"No se pudo leer el video:\n{e}", parent=self.window)
+            return
+        finally:
+            self.window.config(cursor="")
+
+        height, width = self.background.shape[:2]
+        self.scale = min(self.CANVAS_WIDTH / width, self.CANVAS_HEIGHT / height, 1.0)
+        image = Image.fromarray(self.background).resize((int(width * self.scale), int(height * self.scale)))
+        self.photo = ImageTk.PhotoImage(image)
+        self.canvas.delete("all")
+        self.canvas.create_image(0, 0, anchor="nw", image=self.photo)
+
+        roi = self.current_roi(video_name)
+        self.set_roi(tuple(roi) if roi else None)
+
+    def set_roi(self, roi):
+        """Actualizar la ROI mostrada (coordenadas del frame completo)"""
+        self.roi = roi
+        self.canvas.delete("roi")
+        if roi is None:
+            self.roi_label.config(text="Sin ROI: se usará el frame completo")
+            return
+        x, y, w, h = roi
+        s = self.scale
+        self.canvas.create_rectangle(x * s, y * s, (x + w) * s, (y + h) * s,
+                                     outline=ModernColors.ACCENT_GREEN, width=2, tags="roi")
+        self.roi_label.config(text=f"ROI: x={x}, y={y}, ancho={w}, alto={h}")
+
+    def on_press(self, event):
+        self.drag_start = (event.x, event.y)
+
+    def on_drag(self, event):
+        if self.drag_start is None:
+            return
+        self.canvas.delete("roi")
+        self.canvas.create_rectangle(*self.drag_start, event.x, event.y,
+                                     outline=ModernColors.ACCENT_YELLOW, width=2, tags="roi")
+
+    def on_release(self, event):
+        if self.drag_start is None or self.background is None:
+            return
+        height, width = self.background.shape[:2]
+        (x0, y0), (x1, y1) = self.drag_start, (event.x, event.y)
+        self.drag_start = None
+        x0, x1 = sorted((int(x0 / self.scale), int(x1 / self.scale)))
+        y0, y1 = sorted((int(y0 / self.scale), int(y1 / self.scale)))
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(width, x1), min(height, y1)
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            self.set_roi(self.roi)
+            return
+        self.set_roi((x0, y0, x1 - x0, y1 - y0))
+
+    def auto_detect(self):
+        """Detectar la arena automáticamente sobre el fondo mediano"""
+        if self.background is None:
+            return
+        self.set_roi(detect_arena_roi(self.background))
+
+    def save_for_video(self):
+        if self.roi is None:
+            return
+        self.project_data.setdefault("video_rois", {})[self.video_var.get()] = list(self.roi)
+        self.persist(f"ROI guardada para {self.video_var.get()}")
+
+    def save_for_project(self):
+        if self.roi is None:
+            return
+        self.project_data["roi"] = list(self.roi)
+        self.project_data.pop("video_rois", None)
+        self.persist("ROI guardada para todo el proyecto")
+
+    def clear_roi(self):
+        """Quitar la ROI del video seleccionado o de todo el proyecto"""
+        video_name = self.video_var.get()
+        video_rois = self.project_data.get("video_rois", {})
+        if video_name in video_rois:
+            del video_rois[video_name]
+        else:
+            self.project_data.pop("roi", None)
+        self.persist("ROI eliminada")
+        roi = self.current_roi(video_name)
+        self.set_roi(tuple(roi) if roi else None)
+
+    def persist(self, message):
+        """Guardar los datos del proyecto"""
+        self.project_data["last_modified"] = datetime.now().isoformat()
+        self.parent.save_user_projects()
+        self.parent.update_status(f"🎯 {message}")
+        logging.info(f"{message} ({self.project_name})")
+
+class RetrackWindow:
+    """Ventana de re-tracking: reasigna identidades sobre los .slp existentes
+
+    Cada archivo se procesa en un proceso de un pool, sin volver a ejecutar
+    los modelos; el resultado se guarda como *_tracked.slp.
+    """
+    TRACKERS = ("simple", "flow")
+    SIMILARITIES = ("instance", "centroid", "iou")
+    MATCHES = ("greedy", "hungarian")
+
+    def __init__(self, parent, project_name):
+        self.parent = parent
+        self.project_name = project_name
+        self.data_sleap_folder = parent.projects_root_dir / project_name / "Data_Sleap"
+        self.files = find_prediction_files(self.data_sleap_folder)
+        self.executor = None
+        self.running = False
+
+        defaults = {
+            'tracker': "simple",
+            'similarity': "instance",
+            'match': "greedy",
+            'track_window': 5,
+            'max_tracks': int(parent.sleap_params.get('max_instances') or 0)
+        }
+        defaults.update(parent.sleap_params.get('tracking_params', {}))
+        self.defaults = defaults
+
+        self.window = tk.Toplevel(parent.root)
+        self.window.title(f"🔗 Re-tracking - {project_name}")
+        self.window.configure(bg=ModernColors.PRIMARY_DARK)
+        self.window.transient(parent.root)
+
+        self.center_window()
+        self.setup_ui()
+
+        self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+    def center_window(self):
+        """Centrar ventana en pantalla"""
+        self.window.update_idletasks()
+        width = 620
+        height = 560
+        x = (self.window.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.window.winfo_screenheight() // 2) - (height // 2)
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+
+    def setup_ui(self):
+        """Configurar interfaz de re-tracking"""
+        header_frame = tk.Frame(self.window, bg=ModernColors.ACCENT_BLUE, height=60)
+        header_frame.pack(fill="x")
+        header_frame.pack_propagate(False)
+
+        tk.Label(header_frame, text="🔗 Re-tracking de Predicciones",
+                font=("Segoe UI", 16, "bold"),
+                fg=ModernColors.TEXT_PRIMARY,
+                bg=ModernColors.ACCENT_BLUE).pack(expand=True)
+
+        main_container = tk.Frame(self.window, bg=ModernColors.PRIMARY_DARK)
+        main_container.pack(fill="both", expand=True, padx=20, pady=15)
+
+        form_frame = tk.Frame(main_container, bg=ModernColors.CARD_BG, relief="solid", bd=1)
+        form_frame.pack(fill="x", pady=(0, 15))
+
+        self.tracker_var = tk.StringVar(value=self.defaults['tracker'])
+        self.similarity_var = tk.StringVar(value=self.defaults['similarity'])
+        self.match_var = tk.StringVar(value=self.defaults['match'])
+        self.window_var = tk.IntVar(value=self.defaults['track_window'])
+        self.max_tracks_var = tk.IntVar(value=self.defaults['max_tracks'])
+
+        fields = [
+            ("Tracker:", ttk.Combobox(form_frame, textvariable=self.tracker_var, values=self.TRACKERS,
+                                      state="readonly", width=18)),
+            ("Similitud:", ttk.Combobox(form_frame, textvariable=self.similarity_var,
+                                        values=self.SIMILARITIES, state="readonly", width=18)),
+            ("Asignación:", ttk.Combobox(form_frame, textvariable=self.match_var, values=self.MATCHES,
+                                         state="readonly", width=18)),
+            ("Ventana (frames):", tk.Spinbox(form_frame, from_=1, to=100, textvariable=self.window_var,
+                                             width=8)),
+            ("Tracks máximos (0 = sin límite):", tk.Spinbox(form_frame, from_=0, to=50,
+                                                            textvariable=self.max_tracks_var, width=8)),
+        ]
+        for row, (label, widget) in enumerate(fields):
+            tk.Label(form_frame, text=label,
+                    font=("Segoe UI", 10),
+                    fg=ModernColors.TEXT_PRIMARY,
+                    bg=ModernColors.CARD_BG).grid(row=row, column=0, sticky="w", padx=15, pady=5)
+            widget.grid(row=row, column=1, sticky="w", padx=10, pady=5)
+
+        self.files_label = tk.Label(main_container,
+                                   text=f"📄 {len(self.files)} archivo(s) .slp en {self.data_sleap_folder}",
+                                   font=("Segoe UI", 10),
+                                   fg=ModernColors.TEXT_SECONDARY,
+                                   bg=ModernColors.PRIMARY_DARK,
+                                   wraplength=560, justify="left")
+        self.files_label.pack(anchor="w")
+
+        self.progress_bar = ttk.Progressbar(main_container, mode='determinate', length=560)
+        self.progress_bar.pack(fill="x", pady=10)
+        self.progress_bar['maximum'] = max(1, len(self.files))
+
+        self.status_label = tk.Label(main_container, text="Listo para iniciar",
+                                    font=("Segoe UI", 10),
+                                    fg=ModernColors.TEXT_SECONDARY,
+                                    bg=ModernColors.PRIMARY_DARK,
+                                    wraplength=560, justify="left")
+        self.status_label.pack(anchor="w", pady=(0, 10))
+
+        self.start_button = tk.Button(main_container, text="▶️ Iniciar Re-tracking",
+                                     command=self.start,
+                                     font=("Segoe UI", 11, "bold"),
+                                     fg=ModernColors.TEXT_PRIMARY,
+                                     bg=ModernColors.ACCENT_GREEN,
+                                     relief="flat", padx=20, pady=8)
+        self.start_button.pack()
+        if not self.files:
+            self.start_button.config(state="disabled")
+
+    def tracking_params(self):
+        """Parámetros de tracking elegidos en el formulario"""
+        return {
+            'tracker': self.tracker_var.get(),
+            'similarity': self.similarity_var.get(),
+            'match': self.match_var.get(),
+            'track_window': int(self.window_var.get()),
+            'max_tracks': int(self.max_tracks_var.get()) or None
+        }
+
+    def start(self):
+        """Guardar parámetros y lanzar el pool de procesos"""
+        params = self.tracking_params()
+        self.parent.sleap_params['tracking_params'] = dict(params, max_tracks=params['max_tracks'] or 0)
+        if self.project_name in self.parent.projects_data:
+            self.parent.projects_data[self.project_name]['sleap_params'] = self.parent.sleap_params
+            self.parent.save_user_projects()
+
+        self.running = True
+        self.start_button.config(state="disabled")
+        threading.Thread(target=self.retrack_thread, args=(params,), daemon=True).start()
+
+    def retrack_thread(self, params):
+        """Repartir los archivos entre procesos y recoger resultados a medida que terminan"""
+        by_memory = max(1, int(psutil.virtual_memory().available // RETRACK_PROCESS_MEMORY))
+        num_processes = max(1, min(len(self.files), psutil.cpu_count() or 1, by_memory))
+        logging.info(f"Re-tracking de {len(self.files)} archivo(s) con {num_processes} proceso(s)")
+
+        results = []
+        start = time.perf_counter()
+        try:
+            self.executor = ProcessPoolExecutor(max_workers=num_processes)
+            futures = [self.executor.submit(retrack_prediction_file, str(path), params) for path in self.files]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result['status'] == 'error':
+                    logging.error(f"Error en re-tracking de {Path(result['input']).name}: {result['error']}")
+                self.window.after(0, self.update_progress, result, len(results))
+        except Exception as e:
+            if self.running:
+                logging.error(f"Error en re-tracking: {e}")
+                self.window.after(0, self.status_label.config, {'text': f"❌ Error: {e}"})
+            return
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+
+        self.running = False
+        self.window.after(0, self.finished, results, time.perf_counter() - start)
+
+    def update_progress(self, result, completed):
+        """Mostrar el avance por archivo"""
+        self.progress_bar['value'] = completed
+        icon = {'success': "✅", 'skipped': "⏭️", 'error': "❌"}[result['status']]
+        self.status_label.config(text=f"{icon} {Path(result['input']).name} — "
+                                      f"{result['frames']} frames, {result['tracks']} tracks\n"
+                                      f"Completados {completed} de {len(self.files)}")
+
+    def finished(self, results, elapsed):
+        """Resumen final del re-tracking"""
+        counts = {status: sum(1 for r in results if r['status'] == status)
+                  for status in ('success', 'skipped', 'error')}
+        summary = f"✅ Re-tracking completado en {format_duration(elapsed)}\n"
+        summary += f"Procesados: {counts['success']}  •  Sin cambios: {counts['skipped']}"
+        if counts['error']:
+            summary += f"  •  Con errores: {counts['error']} (ver log)"
+        summary += "\nResultados en archivos *_tracked.slp"
+        self.status_label.config(text=summary)
+        self.start_button.config(text="✅ Cerrar", state="normal", command=self.window.destroy)
+        self.parent.update_status(f"🔗 Re-tracking completado: {counts['success'] + counts['skipped']} archivo(s)")
+
+    def on_closing(self):
+        """Cerrar ventana; cancelar archivos pendientes si está en curso"""
+        if self.running:
+            if not messagebox.askyesno("⚠️ Cancelar", "¿Cancelar el re-tracking en curso?", parent=self.window):
+                return
+            self.running = False
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+        self.window.destroy()
+
+class ModelBrowserWindow:
+    """Explorador de modelos: consulta el índice de metadatos (ModelRegistry)"""
+    COLUMNS = (
+        ('model_type', "Tipo", 130),
+        ('nodes', "Nodos", 60),
+        ('input_scaling', "Escala", 60),
+        ('crop_size', "Recorte", 70),
+        ('output_stride', "Stride", 60),
+        ('sigma', "Sigma", 60),
+        ('training_frames', "Frames entren.", 100),
+    )
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.registry = ModelRegistry()
+        self.models = {}
+
+        self.window = tk.Toplevel(parent.root)
+        self.window.title("🧠 Modelos SLEAP")
+        self.window.configure(bg=ModernColors.PRIMARY_DARK)
+        self.window.transient(parent.root)
+
+        self.center_window()
+        self.setup_ui()
+        self.refresh()
+
+    def center_window(self):
+        """Centrar ventana en pantalla"""
+        self.window.update_idletasks()
+        width = 860
+        height = 520
+        x = (self.window.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.window.winfo_screenheight() // 2) - (height // 2)
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+
+    def setup_ui(self):
+        """Configurar interfaz del explorador"""
+        header_frame = tk.Frame(self.window, bg=ModernColors.ACCENT_BLUE, height=60)
+        header_frame.pack(fill="x")
+        header_frame.pack_propagate(False)
+
+        tk.Label(header_frame, text="🧠 Modelos SLEAP",
+                font=("Segoe UI", 16, "bold"),
+                fg=ModernColors.TEXT_PRIMARY,
+                bg=ModernColors.ACCENT_BLUE).pack(expand=True)
+
+        main_container = tk.Frame(self.window, bg=ModernColors.PRIMARY_DARK)
+        main_container.pack(fill="both", expand=True, padx=20, pady=15)
+
+        self.tree = ttk.Treeview(main_container, columns=[c[0] for c in self.COLUMNS], height=10,
+                                 selectmode="extended")
+        self.tree.heading('#0', text="Modelo")
+        self.tree.column('#0', width=260)
+        for key, title, width in self.COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width, anchor="center")
+        self.tree.pack(fill="both", expand=True)
+        self.tree.bind('<<TreeviewSelect>>', self.show_details)
+
+        self.details_label = tk.Label(main_container, text="Seleccione un modelo para ver su esqueleto",
+                                     font=("Segoe UI", 10),
+                                     fg=ModernColors.TEXT_SECONDARY,
+                                     bg=ModernColors.PRIMARY_DARK,
+                                     wraplength=800, justify="left")
+        self.details_label.pack(anchor="w", pady=10)
+
+        buttons_frame = tk.Frame(main_container, bg=ModernColors.PRIMARY_DARK)
+        buttons_frame.pack()
+
+        tk.Button(buttons_frame, text="🔄 Actualizar",
+                 command=self.refresh,
+                 font=("Segoe UI", 10, "bold"),
+                 fg=ModernColors.TEXT_PRIMARY,
+                 bg=ModernColors.ACCENT_GREEN,
+                 relief="flat", padx=15, pady=5).pack(side="left", padx=5)
+
+        tk.Button(buttons_frame, text="📈 Evaluar / Comparar",
+                 command=self.open_evaluation,
+                 font=("Segoe UI", 10, "bold"),
+                 fg=ModernColors.TEXT_PRIMARY,
+                 bg=ModernColors.ACCENT_BLUE,
+                 relief="flat", padx=15, pady=5).pack(side="left", padx=5)
+
+    def refresh(self):
+        """Recargar la lista; solo se re-leen las configuraciones modificadas"""
+        self.registry.prune()
+        self.tree.delete(*self.tree.get_children())
+        self.models = {}
+        for model_path in discover_model_dirs():
+            metadata = self.registry.get(model_path)
+            if not metadata:
+                continue
+            item = self.tree.insert('', 'end', text=metadata.get('name') or model_path.name, values=[
+                metadata.get('model_type') or "-",
+                len(metadata.get('skeleton') or []),
+                metadata.get('input_scaling'),
+                metadata.get('crop_size') or "-",
+                metadata.get('output_stride') or "-",
+                metadata.get('sigma') or "-",
+                metadata.get('training_frames'),
+            ])
+            self.models[item] = (model_path, metadata)
+
+    def show_details(self, event=None):
+        """Esqueleto y procedencia del modelo seleccionado"""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.models:
+            return
+        model_path, metadata = self.models[selection[0]]
+        details = f"📁 {model_path}\n"
+        details += f"🦴 Nodos: {', '.join(metadata.get('skeleton') or []) or '-'}\n"
+        if metadata.get('anchor_part'):
+            details += f"⚓ Nodo de anclaje: {metadata['anchor_part']}\n"
+        details += (f"📊 Frames: {metadata.get('training_frames')} entrenamiento, "
+                    f"{metadata.get('validation_frames')} validación  •  SLEAP {metadata.get('sleap_version') or '-'}")
+        self.details_label.config(text=details)
+
+    def open_evaluation(self):
+        """Abrir la evaluación del modelo seleccionado o comparar dos"""
+        selection = [item for item in self.tree.selection() if item in self.models]
+        if not selection or len(selection) > 2:
+            messagebox.showinfo("📈 Evaluación", "Seleccione uno o dos modelos (Ctrl+clic para comparar)",
+                                parent=self.window)
+            return
+        ModelEvaluationWindow(self.parent, [self.models[item] for item in selection])
+
+class ModelEvaluationWindow:
+    """Panel de evaluación: métricas resumidas, distancias por nodo y curvas de pérdida
+
+    Los resúmenes salen de ModelEvaluationIndex; solo un modelo sin resumen
+    vigente carga sus .npz, y eso ocurre en un hilo aparte.
+    """
+    def __init__(self, parent, models):
+        self.parent = parent
+        self.models = models
+        self.evaluation_index = ModelEvaluationIndex()
+
+        names = " vs ".join(metadata.get('name') or path.name for path, metadata in models)
+        self.window = tk.Toplevel(parent.root)
+        self.window.title(f"📈 Evaluación - {names}")
+        self.window.configure(bg=ModernColors.PRIMARY_DARK)
+        self.window.transient(parent.root)
+
+        self.center_window()
+        self.setup_ui()
+        threading.Thread(target=self.load_summaries, daemon=True).start()
+
+    def center_window(self):
+        """Centrar ventana en pantalla"""
+        self.window.update_idletasks()
+        width = 960
+        height = 720
+        x = (self.window.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.window.winfo_screenheight() // 2) - (height // 2)
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+
+    def setup_ui(self):
+        """Configurar interfaz de evaluación"""
+        header_frame = tk.Frame(self.window, bg=ModernColors.ACCENT_BLUE, height=60)
+        header_frame.pack(fill="x")
+        header_frame.pack_propagate(False)
+
+        tk.Label(header_frame, text="📈 Evaluación de Modelos",
+                font=("Segoe UI", 16, "bold"),
+                fg=ModernColors.TEXT_PRIMARY,
+                bg=ModernColors.ACCENT_BLUE).pack(expand=True)
+
+        self.main_container = tk.Frame(self.window, bg=ModernColors.PRIMARY_DARK)
+        self.main_container.pack(fill="both", expand=True, padx=20, pady=15)
+
+        self.status_label = tk.Label(self.main_container, text="⏳ Cargando métricas...",
+                                    font=("Segoe UI", 10),
+                                    fg=ModernColors.TEXT_SECONDARY,
+                                    bg=ModernColors.PRIMARY_DARK)
+        self.status_label.pack(anchor="w")
+
+    def load_summaries(self):
+        """Obtener los resúmenes (desde el índice o calculándolos) fuera del hilo de la interfaz"""
+        start = time.perf_counter()
+        try:
+            summaries = [self.evaluation_index.get(path) for path, _ in self.models]
+        except Exception as e:
+            logging.error(f"Error cargando métricas de evaluación: {e}")
+            self.window.after(0, self.status_label.config, {'text': f"❌ Error: {e}"})
+            return
+        elapsed = time.perf_counter() - start
+        self.window.after(0, self.show_summaries, summaries, elapsed)
+
+    @staticmethod
+    def format_value(value):
+        return "-" if value is None or value != value else f"{value:.3f}"
+
+    def show_summaries(self, summaries, elapsed):
+        """Tablas de métricas y distancias por nodo, y gráfico de curvas de pérdida"""
+        self.status_label.config(text=f"✅ Métricas listas en {elapsed:.2f}s (split de validación)")
+        names = [metadata.get('name') or path.name for path, metadata in self.models]
+
+        metrics_frame = tk.Frame(self.main_container, bg=ModernColors.CARD_BG, relief="solid", bd=1)
+        metrics_frame.pack(fill="x", pady=10)
+        columns = [f"model{i}" for i in range(len(names))]
+        tree = ttk.Treeview(metrics_frame, columns=columns, height=len(EVALUATION_METRICS))
+        tree.heading('#0', text="Métrica")
+        tree.column('#0', width=220)
+        for column, name in zip(columns, names):
+            tree.heading(column, text=name)
+            tree.column(column, width=300, anchor="center")
+        for key, label in EVALUATION_METRICS:
+            tree.insert('', 'end', text=label, values=[
+                self.format_value(summary.get('val', {}).get(key)) for summary in summaries])
+        tree.pack(fill="x")
+
+        # Percentiles de distancia por nodo (validación)
+        nodes = []
+        for summary in summaries:
+            for node in summary.get('val', {}).get('node_distances', {}):
+                if node not in nodes:
+                    nodes.append(node)
+        if nodes:
+            node_tree = ttk.Treeview(self.main_container, columns=columns, height=min(len(nodes), 8))
+            node_tree.heading('#0', text="Nodo (p50 / p90 / p95 px)")
+            node_tree.column('#0', width=220)
+            for column, name in zip(columns, names):
+                node_tree.heading(column, text=name)
+                node_tree.column(column, width=300, anchor="center")
+            for node in nodes:
+                values = []
+                for summary in summaries:
+                    distances = summary.get('val', {}).get('node_distances', {}).get(node)
+                    values.append(" / ".join(self.format_value(distances[f"p{p}"])
+                                             for p in NODE_DISTANCE_PERCENTILES) if distances else "-")
+                node_tree.insert('', 'end', text=node, values=values)
+            node_tree.pack(fill="x", pady=(0, 10))
+
+        if MATPLOTLIB_AVAILABLE and any(summary.get('curves') for summary in summaries):
+            self.plot_curves(names, summaries)
+
+    def plot_curves(self, names, summaries):
+        """Curvas de pérdida de entrenamiento y validación por modelo"""
+        fig = Figure(figsize=(9, 3), facecolor='#2f3136')
+        ax = fig.add_subplot(111)
+        ax.set_facecolor('#40444b')
+        ax.tick_params(colors='white', labelsize=9)
+        ax.set_title("Pérdida por época", color='white', fontsize=12, fontweight='bold')
+        ax.grid(True, alpha=0.3, color='white')
+        colors = ('#5865f2', '#57f287')
+        for name, summary, color in zip(names, summaries, colors):
+            curves = summary.get('curves')
+            if not curves:
+                continue
+            ax.plot(curves['epoch'], curves['loss'], color=color, label=f"{name} (entrenamiento)")
+            ax.plot(curves['epoch'], curves['val_loss'], color=color, linestyle='--', label=f"{name} (validación)")
+        ax.set_yscale('log')
+        ax.legend(fontsize=8)
+        fig.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, self.main_container)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill="both", expand=True)
+
 class SystemMonitorWindow:
     """Ventana del monitor de recursos del sistema - COMPLETAMENTE FUNCIONAL"""
     def __init__(self, parent):
@@ -1620,7 +6452,11 @@ class CinBehaveGUI:
             "max_instances": 1,
             "tracking": True,
             "model_path": "",
-            "gpu_acceleration": True
+            "gpu_acceleration": True,
+            "auto_tune_batch_size": False,
+            "preview_stride": 10,
+            "proxy_centroid": False,
+            "compiled_graphs": False
         }
         
         # Variables de monitoreo
@@ -1957,7 +6793,8 @@ class CinBehaveGUI:
             directories = [
                 "users", "temp", "logs", "config", 
                 "assets", "docs", "models", "exports",
-                "Proyectos"  # NUEVA: Carpeta estándar para proyectos
+                "Proyectos",  # NUEVA: Carpeta estándar para proyectos
+                "cache"
             ]
             
             for directory in directories:
@@ -1979,11 +6816,18 @@ class CinBehaveGUI:
                     "high_dpi": True,
                     "projects_directory": str(self.projects_root_dir),
                     "sleap_available": SLEAP_AVAILABLE,
-                    "sleap_version": SLEAP_VERSION
+                    "sleap_version": SLEAP_VERSION,
+                    "ingest_workers": INGEST_MAX_WORKERS
                 }
                 with open(config_file, 'w') as f:
                     json.dump(windows_config, f, indent=2)
             
+            # Registrar los modelos incluidos para trabajar sin conexión
+            try:
+                ModelStore().register_bundled()
+            except Exception as e:
+                logging.warning(f"No se pudieron registrar los modelos incluidos: {e}")
+
             logging.info("Sistema avanzado inicializado correctamente")
             logging.info(f"Directorio de proyectos: {self.projects_root_dir}")
             logging.info(f"SLEAP disponible: {SLEAP_AVAILABLE} ({SLEAP_VERSION})")
@@ -2490,6 +7334,32 @@ class CinBehaveGUI:
         self.create_modern_status_bar()
         
         self.update_status("🚀 Sistema listo para análisis")
+
+        # Ofrecer reanudar predicciones que quedaron en la cola
+        self.root.after(1500, self.check_interrupted_predictions)
+
+    def check_interrupted_predictions(self):
+        """Reanudar lotes de predicción interrumpidos de los proyectos del usuario"""
+        try:
+            job_queue = PredictionJobQueue()
+            batches = [b for b in job_queue.unfinished_batches() if b['project'] in self.projects_data]
+        except Exception as e:
+            logging.warning(f"No se pudo leer la cola de predicciones: {e}")
+            return
+        if not batches:
+            return
+
+        batch = batches[0]
+        mode = "vista previa" if batch['preview'] else "predicción completa"
+        if batch['context']['inference_params'].get('centroid_only'):
+            mode += ", solo centroides"
+        message = f"Hay {len(batches)} procesamiento(s) SLEAP sin terminar.\n\n"
+        message += f"📁 Proyecto: {batch['project']}\n"
+        message += f"🎬 Videos: {len(batch['context']['videos'])} ({mode})\n\n"
+        message += "¿Reanudar ahora? Los videos ya terminados no se repiten."
+        if messagebox.askyesno("🔄 Reanudar Predicciones", message):
+            SLEAPProgressWindow(self, job_queue, batch['id'])
+            self.update_status(f"🔄 Reanudando predicciones de '{batch['project']}'")
     
     def create_modern_menu_bar(self):
         """Crear barra de menú moderna"""
@@ -2512,6 +7382,9 @@ class CinBehaveGUI:
         menubar.add_cascade(label="🛠️ Herramientas", menu=tools_menu)
         tools_menu.add_command(label="⚙️ Configuración SLEAP", command=self.show_sleap_config)
         tools_menu.add_command(label="📊 Monitor de Sistema", command=self.show_system_monitor)
+        tools_menu.add_command(label="🧠 Modelos SLEAP", command=self.show_model_browser)
+        tools_menu.add_command(label="🎯 ROI de Arena", command=self.define_arena_roi)
+        tools_menu.add_command(label="🔗 Re-tracking de Predicciones", command=self.retrack_predictions)
         tools_menu.add_command(label="🎨 Preferencias", command=self.show_preferences)
         
         # Menú Ayuda
@@ -2844,7 +7717,7 @@ Los proyectos son el corazón de CinBehave. Aquí organizas todos tus análisis.
 🆕 CREAR PROYECTO:
 • Haga clic en "🆕 Nuevo" para crear un proyecto
 • Se creará automáticamente una carpeta en "Proyectos/[NombreProyecto]/"
-• Incluye subcarpetas: Videos/, Data_Sleap/, models/
+• Incluye subcarpetas: Videos/, Data_Sleap/
 • Podrá agregar videos inmediatamente
 
 📂 CARGAR PROYECTO:
@@ -2921,11 +7794,11 @@ SLEAP (Social LEAP Estimates Animal Poses) es un framework de IA avanzado para:
 🔄 PROCESO AUTOMÁTICO DE PREDICCIÓN:
 1. Verificación de instalación de SLEAP
 2. Detección automática de GPU/CPU
-3. Descarga automática de modelos desde GitHub
+3. Modelos desde el almacén compartido (descarga solo si faltan)
 4. Configuración de carpetas del proyecto:
    • Videos/ → Input de videos
    • Data_Sleap/ → Output de predicciones (.slp)
-   • models/ → Modelos de IA descargados
+   • models.json → Referencias al almacén compartido de modelos
 5. Procesamiento con ventana de progreso en tiempo real
 6. Generación de archivos .slp con datos de pose
 
@@ -3026,6 +7899,33 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
         videos_folder = project_folder / "Videos"
         return videos_folder
     
+    def ingest_videos(self, project_name, videos_list):
+        """Agregar videos al proyecto: copiarlos o registrarlos donde están"""
+        if not videos_list:
+            return True
+
+        link = messagebox.askyesno(
+            "🔗 Modo de Ingesta",
+            f"¿Cómo agregar {len(videos_list)} video(s) al proyecto?\n\n"
+            "• Sí: registrarlos en su ubicación actual, sin copiarlos (instantáneo,\n"
+            "  sin espacio extra; los videos deben seguir accesibles en esa ruta)\n"
+            "• No: copiarlos a la carpeta Videos/ del proyecto")
+        if not link:
+            return self.copy_videos_to_project(project_name, videos_list)
+
+        try:
+            registered = register_video_references(self.get_project_videos_folder(project_name), videos_list)
+            self.update_status(f"🔗 {len(registered)} video(s) registrados en su ubicación")
+            return True
+        except Exception as e:
+            logging.error(f"Error registrando videos: {e}")
+            messagebox.showerror("❌ Error", f"Error registrando videos:\n{e}")
+            return False
+
+    def get_video_store(self):
+        """Almacén de videos compartido entre proyectos (en el mismo disco que Proyectos/)"""
+        return VideoObjectStore(self.projects_root_dir / ".video_store")
+
     def copy_videos_to_project(self, project_name, videos_list):
         """Copiar videos al proyecto con ventana de progreso"""
         if not videos_list:
@@ -3036,8 +7936,22 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
             videos_folder = self.get_project_videos_folder(project_name)
             videos_folder.mkdir(parents=True, exist_ok=True)
             
-            # Mostrar ventana de progreso
-            progress_window = VideoProgressWindow(self, videos_list, videos_folder)
+            # Videos en el mismo disco: se pueden enlazar en lugar de copiar (se pregunta una vez)
+            if load_ingest_settings()['hardlinks'] is None and same_filesystem(videos_list, videos_folder):
+                allow = messagebox.askyesno(
+                    "🔗 Enlazar Videos",
+                    "Algunos videos están en el mismo disco que el proyecto.\n\n"
+                    "¿Permitir enlazarlos en lugar de copiarlos? Es instantáneo y no ocupa\n"
+                    "espacio extra, pero el proyecto y el original comparten el mismo archivo\n"
+                    "(editar uno modifica el otro; borrar el original no afecta al proyecto).\n\n"
+                    "La respuesta se recordará para próximas copias.")
+                save_ingest_setting('ingest_hardlinks', allow)
+
+            # Mostrar ventana de progreso (lo que no se pueda clonar ni enlazar pasa por el almacén compartido)
+            project_folder = self.projects_root_dir / project_name
+            progress_window = VideoProgressWindow(self, videos_list, videos_folder,
+                                                  store=self.get_video_store(),
+                                                  project_ref=str(project_folder.resolve()))
             
             # Esperar a que termine la copia
             self.root.wait_window(progress_window.window)
@@ -3081,7 +7995,6 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
             project_folder = self.projects_root_dir / project_name
             videos_folder = project_folder / "Videos"
             data_sleap_folder = project_folder / "Data_Sleap"  # NUEVA: Para archivos .slp
-            models_folder = project_folder / "models"  # NUEVA: Para modelos SLEAP
             
             # Verificar que no exista la carpeta
             if project_folder.exists():
@@ -3093,7 +8006,6 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
             project_folder.mkdir(parents=True, exist_ok=True)
             videos_folder.mkdir(parents=True, exist_ok=True)
             data_sleap_folder.mkdir(parents=True, exist_ok=True)
-            models_folder.mkdir(parents=True, exist_ok=True)
             
             self.update_status(f"📁 Estructura del proyecto creada: {project_folder}")
             logging.info(f"Estructura de carpetas creada para proyecto: {project_name}")
@@ -3102,7 +8014,7 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
             add_videos = messagebox.askyesno("🎬 Agregar Videos", 
                                            f"Proyecto '{project_name}' creado exitosamente.\n\n"
                                            f"📁 Ubicación: {project_folder}\n"
-                                           f"📂 Carpetas: Videos/, Data_Sleap/, models/\n\n"
+                                           f"📂 Carpetas: Videos/, Data_Sleap/\n\n"
                                            "¿Deseas seleccionar videos para agregar al proyecto ahora?")
             
             videos_list = []
@@ -3116,7 +8028,7 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
                 
                 if videos_list:
                     # Mostrar resumen antes de copiar
-                    summary_msg = f"Se van a copiar {len(videos_list)} videos:\n\n"
+                    summary_msg = f"Se van a agregar {len(videos_list)} videos:\n\n"
                     for i, video in enumerate(videos_list[:5], 1):  # Mostrar solo los primeros 5
                         video_name = Path(video).name
                         summary_msg += f"{i}. {video_name}\n"
@@ -3124,12 +8036,12 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
                     if len(videos_list) > 5:
                         summary_msg += f"... y {len(videos_list) - 5} videos más\n"
                     
-                    summary_msg += f"\nDestino: {videos_folder}\n\n¿Continuar con la copia?"
+                    summary_msg += f"\nProyecto: {videos_folder}\n\n¿Continuar?"
                     
-                    if messagebox.askyesno("📥 Confirmar Copia", summary_msg):
-                        # Paso 5: Copiar videos
-                        self.update_status("📥 Copiando videos al proyecto...")
-                        success = self.copy_videos_to_project(project_name, videos_list)
+                    if messagebox.askyesno("📥 Confirmar Videos", summary_msg):
+                        # Paso 5: Copiar o registrar videos
+                        self.update_status("📥 Agregando videos al proyecto...")
+                        success = self.ingest_videos(project_name, videos_list)
                         
                         if not success:
                             # Si falló la copia, preguntar si mantener el proyecto
@@ -3157,7 +8069,6 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
                 "project_folder": str(project_folder),
                 "videos_folder": str(videos_folder),
                 "data_sleap_folder": str(data_sleap_folder),  # NUEVA
-                "models_folder": str(models_folder),  # NUEVA
                 "sleap_params": self.sleap_params.copy(),
                 "results": {},
                 "annotations": [],
@@ -3180,7 +8091,7 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
             final_msg = f"✅ Proyecto '{project_name}' creado exitosamente!\n\n"
             final_msg += f"📁 Ubicación: {project_folder}\n"
             final_msg += f"🎬 Videos agregados: {len(videos_list)}\n"
-            final_msg += f"📂 Carpetas: Videos/, Data_Sleap/, models/\n\n"
+            final_msg += f"📂 Carpetas: Videos/, Data_Sleap/\n\n"
             final_msg += "El proyecto está listo para usar con SLEAP."
             
             self.update_status(f"🆕 Proyecto '{project_name}' creado con {len(videos_list)} videos")
@@ -3209,15 +8120,18 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
         self.current_project = project_name
         project_data = self.projects_data[project_name]
         
-        # Cargar videos (construir rutas completas)
+        # Cargar videos (construir rutas completas; los registrados se resuelven por referencia)
         videos_folder = self.get_project_videos_folder(project_name)
+        linked_videos, linked_problems = resolve_video_references(videos_folder)
         self.loaded_videos = []
         
         for video_name in project_data.get("videos", []):
             video_path = videos_folder / video_name
             if video_path.exists():
                 self.loaded_videos.append(str(video_path))
-            else:
+            elif video_name in linked_videos:
+                self.loaded_videos.append(str(linked_videos[video_name]))
+            elif video_name not in linked_problems:
                 logging.warning(f"Video no encontrado: {video_path}")
         
         self.sleap_params = project_data.get("sleap_params", self.sleap_params)
@@ -3227,6 +8141,15 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
         # Mostrar información del proyecto cargado
         project_info = f"📁 Proyecto: {project_name}\n"
         project_info += f"🎬 Videos disponibles: {len(self.loaded_videos)}\n"
+        if linked_videos:
+            project_info += f"🔗 Registrados en su ubicación: {len(linked_videos)}\n"
+        if linked_problems:
+            missing = [name for name, problem in linked_problems.items() if problem == 'missing']
+            changed = [name for name, problem in linked_problems.items() if problem == 'changed']
+            if missing:
+                project_info += f"⚠️ No encontrados (movidos o eliminados): {', '.join(missing)}\n"
+            if changed:
+                project_info += f"⚠️ Modificados desde que se registraron: {', '.join(changed)}\n"
         project_info += f"📅 Creado: {project_data.get('created', 'Desconocido')}\n"
         project_info += f"📂 Ubicación: {project_data.get('project_folder', 'No especificada')}\n"
         project_info += f"🧠 SLEAP: Listo para predicciones"
@@ -3268,14 +8191,33 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
         confirm_msg += f"🎬 Videos: {videos_count}\n\n"
         confirm_msg += "ADVERTENCIA: Esto eliminará:\n"
         confirm_msg += "• El registro del proyecto en CinBehave\n"
-        confirm_msg += "• La carpeta del proyecto y todos sus videos\n"
+        confirm_msg += "• La carpeta del proyecto y todos sus videos copiados\n"
+        confirm_msg += "  (los videos registrados en su ubicación no se borran)\n"
         confirm_msg += "• Todos los resultados SLEAP (.slp)\n"
-        confirm_msg += "• Los modelos descargados\n"
+        confirm_msg += "• Sus referencias a modelos compartidos\n"
         confirm_msg += "• Todos los datos asociados\n\n"
         confirm_msg += "Esta acción NO se puede deshacer."
         
         if messagebox.askyesno("🗑️ Confirmar Eliminación", confirm_msg):
             try:
+                # Liberar sus modelos del almacén compartido
+                try:
+                    store = ModelStore()
+                    store.release(str(project_folder.resolve()))
+                    store.garbage_collect()
+                except Exception as e:
+                    logging.warning(f"No se pudieron liberar los modelos del proyecto: {e}")
+
+                # Liberar sus videos del almacén compartido (se conservan si otro proyecto los usa)
+                try:
+                    video_store = self.get_video_store()
+                    video_store.release(str(project_folder.resolve()))
+                    freed = video_store.garbage_collect()
+                    if freed:
+                        logging.info(f"Almacén de videos: {freed / 1024**3:.2f} GB liberados")
+                except Exception as e:
+                    logging.warning(f"No se pudieron liberar los videos del proyecto: {e}")
+
                 # Eliminar carpeta física si existe
                 if project_folder.exists():
                     shutil.rmtree(project_folder)
@@ -3320,7 +8262,7 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
                                   f"El proyecto '{self.current_project}' no tiene videos.\n\n¿Agregar videos ahora?"):
                 videos_list = self.select_videos_for_project()
                 if videos_list:
-                    success = self.copy_videos_to_project(self.current_project, videos_list)
+                    success = self.ingest_videos(self.current_project, videos_list)
                     if success:
                         self.loaded_videos = videos_list
                         # Actualizar proyecto
@@ -3354,11 +8296,25 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
         confirm_msg += f"¿Continuar con las predicciones?"
         
         if messagebox.askyesno("🧠 Confirmar Predicciones", confirm_msg):
+            # Modo vista previa: inferencia en 1 de cada N frames para revisar rápido una cohorte
+            preview_stride = self.sleap_params.get('preview_stride', 10)
+            preview = messagebox.askyesno("⚡ Modo de Predicción",
+                                          f"¿Ejecutar una vista previa rápida?\n\n"
+                                          f"• Sí: inferencia en 1 de cada {preview_stride} frames, el resto "
+                                          f"interpolado (archivos *_preview.slp)\n"
+                                          f"• No: predicción completa en todos los frames")
+            # Modo solo centroides: para locomoción/ocupación de zonas basta el centro del animal
+            centroid_only = messagebox.askyesno("🎯 Tipo de Detección",
+                                                "¿Detectar solo el centro de cada animal?\n\n"
+                                                "• Sí: solo el modelo de centroides, mucho más rápido "
+                                                "(archivos *_centroids.slp)\n"
+                                                "• No: esqueleto completo con ambos modelos")
             try:
                 self.update_status("🧠 Iniciando predicciones SLEAP...")
                 
                 # Ejecutar predicción
-                success, message = self.sleap_predictor.run_prediction(self.current_project)
+                success, message = self.sleap_predictor.run_prediction(self.current_project, preview=preview,
+                                                                       centroid_only=centroid_only)
                 
                 if success:
                     # Actualizar proyecto con resultados
@@ -3367,6 +8323,8 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
                         "timestamp": timestamp,
                         "videos_processed": len(self.loaded_videos),
                         "sleap_version": SLEAP_VERSION,
+                        "mode": "preview" if preview else "full",
+                        "detection": "centroid" if centroid_only else "skeleton",
                         "status": "completed"
                     }
                     
@@ -3374,7 +8332,10 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
                     self.projects_data[self.current_project]["last_modified"] = timestamp
                     self.save_user_projects()
                     
-                    success_msg = f"🎉 ¡Predicciones SLEAP Completadas!\n\n"
+                    if preview:
+                        success_msg = f"⚡ ¡Vista previa SLEAP completada! (1 de cada {preview_stride} frames)\n\n"
+                    else:
+                        success_msg = f"🎉 ¡Predicciones SLEAP Completadas!\n\n"
                     success_msg += f"✅ Videos procesados: {len(self.loaded_videos)}\n"
                     success_msg += f"📂 Resultados en: {self.projects_root_dir / self.current_project / 'Data_Sleap'}\n"
                     success_msg += f"🕐 Completado: {datetime.now().strftime('%H:%M:%S')}\n\n"
@@ -3408,8 +8369,83 @@ Esta herramienta le permite supervisar el rendimiento de su computadora durante
         config_msg += f"• SLEAP: {'✅ ' + SLEAP_VERSION if SLEAP_AVAILABLE else '❌ No instalado'}\n"
         config_msg += f"• GPU: {self.check_gpu_support()}\n"
         config_msg += f"• Modelos: Descarga automática desde GitHub\n\n"
-        config_msg += f"Configuración avanzada: En desarrollo"
-        messagebox.showinfo("⚙️ Configuración", config_msg)
+        config_msg += f"Parámetros de inferencia:\n"
+        config_msg += f"• Umbral de confianza: {self.sleap_params.get('confidence_threshold')}\n"
+        config_msg += f"• Tamaño de lote: {self.sleap_params.get('batch_size')}\n"
+        config_msg += f"• Instancias máximas: {self.sleap_params.get('max_instances')}\n"
+        config_msg += f"• Tracking: {'Sí' if self.sleap_params.get('tracking') else 'No'}\n"
+        config_msg += f"• Ajuste automático del lote: {'Sí' if self.sleap_params.get('auto_tune_batch_size') else 'No'}\n"
+        config_msg += f"• Centroides sobre proxy reducido: {'Sí' if self.sleap_params.get('proxy_centroid') else 'No'}\n"
+        config_msg += f"• Grafos compilados en caché: {'Sí' if self.sleap_params.get('compiled_graphs', False) else 'No'}\n\n"
+        config_msg += f"¿Cambiar el ajuste automático del tamaño de lote?"
+        changed = False
+        if messagebox.askyesno("⚙️ Configuración", config_msg):
+            self.sleap_params['auto_tune_batch_size'] = not self.sleap_params.get('auto_tune_batch_size', False)
+            estado = "activado" if self.sleap_params['auto_tune_batch_size'] else "desactivado"
+            self.update_status(f"⚙️ Ajuste automático del tamaño de lote {estado}")
+            changed = True
+
+        proxy_msg = ("La pasada de centroides puede ejecutarse sobre un proxy a la escala de entrada\n"
+                     "del modelo (0.5), generado al decodificar; los recortes de instancia siguen\n"
+                     "tomándose del video original.\n\n"
+                     f"Actualmente: {'activado' if self.sleap_params.get('proxy_centroid') else 'desactivado'}\n\n"
+                     "¿Cambiar este modo?")
+        if messagebox.askyesno("⚙️ Configuración", proxy_msg):
+            self.sleap_params['proxy_centroid'] = not self.sleap_params.get('proxy_centroid', False)
+            estado = "activada" if self.sleap_params['proxy_centroid'] else "desactivada"
+            self.update_status(f"⚙️ Pasada de centroides sobre proxy {estado}")
+            changed = True
+
+        compiled_msg = ("Las redes de los modelos pueden compilarse una vez por equipo (XLA)\n"
+                        "y guardarse en cache/compiled; los recortes y la búsqueda de picos\n"
+                        "siguen siendo los de SLEAP.\n\n"
+                        f"Actualmente: {'activado' if self.sleap_params.get('compiled_graphs', False) else 'desactivado'}\n\n"
+                        "¿Cambiar este modo?")
+        if messagebox.askyesno("⚙️ Configuración", compiled_msg):
+            self.sleap_params['compiled_graphs'] = not self.sleap_params.get('compiled_graphs', False)
+            estado = "activados" if self.sleap_params['compiled_graphs'] else "desactivados"
+            self.update_status(f"⚙️ Grafos compilados {estado}")
+            changed = True
+
+        if changed and self.current_project:
+            self.projects_data[self.current_project]['sleap_params'] = self.sleap_params
+            self.save_user_projects()
+
+    def define_arena_roi(self):
+        """Definir la región de la arena para recortar la inferencia"""
+        if not self.current_project:
+            messagebox.showwarning("⚠️ Advertencia", "Primero seleccione o cree un proyecto")
+            return
+        if not self.projects_data[self.current_project].get("videos"):
+            messagebox.showwarning("⚠️ Advertencia", "El proyecto no tiene videos")
+            return
+        try:
+            ROISelectorWindow(self, self.current_project)
+        except Exception as e:
+            logging.error(f"Error abriendo selector de ROI: {e}")
+            messagebox.showerror("❌ Error", f"Error abriendo selector de ROI:\n{e}")
+
+    def show_model_browser(self):
+        """Mostrar explorador de modelos"""
+        try:
+            ModelBrowserWindow(self)
+        except Exception as e:
+            logging.error(f"Error abriendo explorador de modelos: {e}")
+            messagebox.showerror("❌ Error", f"Error abriendo explorador de modelos:\n{e}")
+
+    def retrack_predictions(self):
+        """Rehacer el tracking de las predicciones del proyecto sin volver a inferir"""
+        if not self.current_project:
+            messagebox.showwarning("⚠️ Advertencia", "Primero seleccione o cree un proyecto")
+            return
+        if not SLEAP_AVAILABLE:
+            messagebox.showerror("❌ SLEAP No Disponible", "El re-tracking requiere SLEAP instalado")
+            return
+        try:
+            RetrackWindow(self, self.current_project)
+        except Exception as e:
+            logging.error(f"Error abriendo re-tracking: {e}")
+            messagebox.showerror("❌ Error", f"Error abriendo re-tracking:\n{e}")
     
     def show_tools_menu(self):
         """Mostrar menú de herramientas"""
@@ -3495,6 +8531,25 @@ Desarrollado con ❤️ para la comunidad científica
             logging.error(f"Error en aplicación: {e}")
             messagebox.showerror("❌ Error Fatal", f"Error en aplicación: {e}")
 
+def run_prediction_queue():
+    """Ejecutar sin interfaz todos los lotes pendientes de la cola (--run-queue)"""
+    job_queue = PredictionJobQueue()
+    failures = 0
+    for batch in job_queue.unfinished_batches():
+        if not job_queue.claim_batch(batch['id']):
+            logging.info(f"Lote {batch['id']} en ejecución por otro proceso, se omite")
+            continue
+        logging.info(f"Ejecutando lote {batch['id']} ({batch['project']}, "
+                     f"{len(batch['context']['videos'])} videos)")
+        try:
+            PredictionBatchRunner(job_queue, batch['id'], on_status=logging.info).run()
+        except Exception as e:
+            logging.error(f"Error ejecutando lote {batch['id']}: {e}")
+            failures += 1
+            continue
+        failures += sum(1 for r in job_queue.video_results(batch['id']) if r['status'] == 'error')
+    return 1 if failures else 0
+
 def main():
     """Función principal"""
     try:
@@ -3512,4 +8567,25 @@ def main():
             print("No se pudo mostrar ventana de error")
 
 if __name__ == "__main__":
+    if '--sleap-worker' in sys.argv:
+        import argparse
+        worker_parser = argparse.ArgumentParser(description="Worker de inferencia SLEAP de CinBehave")
+        worker_parser.add_argument('--sleap-worker', action='store_true')
+        worker_parser.add_argument('--centroid', required=True)
+        worker_parser.add_argument('--centered-instance', default=None)
+        worker_parser.add_argument('--cores', default="")
+        worker_parser.add_argument('--threads', type=int, default=None)
+        worker_parser.add_argument('--params', default="{}")
+        worker_args = worker_parser.parse_args()
+        worker_cores = [int(core) for core in worker_args.cores.split(',') if core]
+        sys.exit(run_sleap_worker(worker_args.centroid, worker_args.centered_instance,
+                                  cores=worker_cores, threads=worker_args.threads,
+                                  params=json.loads(worker_args.params)))
+    if '--run-queue' in sys.argv:
+        sys.exit(run_prediction_queue())
+    if '--build-model-manifest' in sys.argv:
+        for model_dir in sys.argv[sys.argv.index('--build-model-manifest') + 1:]:
+            manifest = build_model_manifest(model_dir)
+            print(f"{model_dir}: {len(manifest['files'])} archivos")
+        sys.exit(0)
     main()
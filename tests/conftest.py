@@ -0,0 +1,14 @@
+"""Configuración común de las pruebas de CinBehave
+
+cinbehave_gui escribe logs/, config/ y cache/ relativos al directorio de
+trabajo, así que las pruebas se ejecutan en un directorio temporal.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.chdir(tempfile.mkdtemp(prefix="cinbehave_tests_"))
+Path("logs").mkdir(exist_ok=True)
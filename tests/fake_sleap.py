@@ -0,0 +1,88 @@
+"""Módulo sleap simulado para las pruebas: solo lo que usa cinbehave_gui
+
+Los .slp se guardan con pickle, así que se pueden copiar, mover y leer
+desde otro proceso como los reales.
+"""
+import pickle
+import types
+
+import numpy as np
+
+
+class Track:
+    def __init__(self, spawned_on=0, name=""):
+        self.spawned_on = spawned_on
+        self.name = name
+
+    def __repr__(self):
+        return f"Track({self.name!r})"
+
+
+class PredictedInstance:
+    def __init__(self, points, scores, score, skeleton=None, track=None):
+        self.points = np.asarray(points, dtype=float)
+        self.scores = np.asarray(scores, dtype=float)
+        self.score = score
+        self.skeleton = skeleton
+        self.track = track
+
+    @classmethod
+    def from_numpy(cls, points, point_confidences, instance_score, skeleton=None, track=None):
+        return cls(points, point_confidences, instance_score, skeleton, track)
+
+    def numpy(self):
+        return self.points.copy()
+
+
+class LabeledFrame:
+    def __init__(self, video=None, frame_idx=0, instances=()):
+        self.video = video
+        self.frame_idx = frame_idx
+        self.instances = list(instances)
+
+
+class Video:
+    def __init__(self, filename, num_frames=100, height=480, width=640):
+        self.filename = filename
+        self.num_frames = num_frames
+        self.shape = (num_frames, height, width, 1)
+        self.backend = types.SimpleNamespace(filename=filename)
+
+
+class Labels:
+    def __init__(self, labeled_frames=(), videos=None, skeletons=None, tracks=None):
+        self.labeled_frames = list(labeled_frames)
+        self.videos = list(videos or [])
+        self.skeletons = list(skeletons or [])
+        self.tracks = list(tracks or [])
+        self.provenance = {}
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+
+class FakeSleap:
+    """Espacio de nombres que reemplaza a `sleap` en cinbehave_gui"""
+    Track = Track
+    PredictedInstance = PredictedInstance
+    LabeledFrame = LabeledFrame
+    Labels = Labels
+    Video = Video
+
+    def __init__(self, height=480, width=640):
+        self.height = height
+        self.width = width
+
+    def load_video(self, path):
+        return Video(str(path), height=self.height, width=self.width)
+
+    def load_file(self, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def instance(x, y, track=None, size=20.0, skeleton="esqueleto"):
+    """Instancia de dos nodos (cabeza y cola) centrada en (x, y)"""
+    points = np.array([[x - size / 2, y], [x + size / 2, y]])
+    return PredictedInstance(points, np.ones(2), 1.0, skeleton, track)
@@ -0,0 +1,65 @@
+"""Pruebas de la unión de partes de un video largo (frontera entre rangos)"""
+import math
+
+import pytest
+
+import cinbehave_gui
+from fake_sleap import FakeSleap, LabeledFrame, Labels, Track, instance
+
+
+@pytest.fixture
+def fake_sleap(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    module = FakeSleap()
+    monkeypatch.setattr(cinbehave_gui, 'sleap', module, raising=False)
+    return module
+
+
+def save_chunk(path, frames, tracks):
+    Labels(labeled_frames=frames, skeletons=["esqueleto"], tracks=tracks).save(path)
+
+
+def moving_pair(start, end, tracks):
+    """Dos animales que avanzan en x; el primero arriba, el segundo abajo"""
+    first, second = tracks
+    return [LabeledFrame(frame_idx=t, instances=[instance(100 + 2 * t, 100, first),
+                                                 instance(300 - 2 * t, 300, second)])
+            for t in range(start, end)]
+
+
+def test_identities_continue_across_the_seam(fake_sleap):
+    save_chunk("c0.slp", moving_pair(0, 10, [Track(name="a"), Track(name="b")]), [])
+    # La segunda parte creó sus pistas en el orden inverso
+    lower, upper = Track(name="x"), Track(name="y")
+    save_chunk("c1.slp", moving_pair(10, 20, [upper, lower]), [upper, lower])
+
+    merged = cinbehave_gui.merge_prediction_chunks(["c0.slp", "c1.slp"], "out.slp", "video.mp4")
+
+    frame_indices = [lf.frame_idx for lf in merged.labeled_frames]
+    assert frame_indices == list(range(20))
+    assert len(merged.tracks) == 2
+    for labeled_frame in merged.labeled_frames:
+        by_height = sorted(labeled_frame.instances, key=lambda inst: inst.numpy()[0, 1])
+        assert [inst.track for inst in by_height] == merged.tracks
+
+
+def test_seam_distance_scales_with_instance_size():
+    small = [instance(0, 0, size=10.0).numpy()]
+    large = [instance(0, 0, size=200.0).numpy()]
+
+    assert cinbehave_gui.seam_match_distance(small, (480, 640)) == pytest.approx(10.0)
+    assert cinbehave_gui.seam_match_distance(large, (480, 640)) == pytest.approx(200.0)
+    # Un solo punto (solo centroides): fracción de la diagonal del frame
+    centroid = [small[0][:1]]
+    assert cinbehave_gui.seam_match_distance(centroid, (1080, 1920)) == pytest.approx(
+        cinbehave_gui.SEAM_FRAME_FRACTION * math.hypot(1920, 1080))
+
+
+def test_far_jump_at_seam_starts_a_new_track(fake_sleap):
+    save_chunk("c0.slp", [LabeledFrame(frame_idx=0, instances=[instance(100, 100, Track(name="a"))])], [])
+    # Más lejos que el tamaño del animal: no es el mismo individuo
+    save_chunk("c1.slp", [LabeledFrame(frame_idx=1, instances=[instance(400, 400, Track(name="b"))])], [])
+
+    merged = cinbehave_gui.merge_prediction_chunks(["c0.slp", "c1.slp"], "out.slp", "video.mp4")
+
+    assert len(merged.tracks) == 2
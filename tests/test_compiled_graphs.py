@@ -0,0 +1,76 @@
+"""Pruebas de los grafos compilados: mismas salidas y picos que Keras, caché acotada"""
+import numpy as np
+import pytest
+
+import cinbehave_gui
+
+tf = pytest.importorskip("tensorflow")
+
+
+def make_model(height=None, width=None):
+    """Red con dos cabezas (offsets primero) como los modelos de SLEAP con refinamiento"""
+    tf.keras.utils.set_random_seed(0)
+    inputs = tf.keras.Input((height, width, 1))
+    features = tf.keras.layers.Conv2D(8, 3, padding="same", activation="relu")(inputs)
+    features = tf.keras.layers.Conv2D(8, 3, padding="same", activation="relu")(features)
+    offsets = tf.keras.layers.Conv2D(4, 1, name="OffsetRefinementHead")(features)
+    confmaps = tf.keras.layers.Conv2D(2, 1, name="CentroidConfmapsHead")(features)
+    return tf.keras.Model(inputs, [offsets, confmaps])
+
+
+@pytest.fixture
+def frames():
+    """Dos frames con una mancha gaussiana en posiciones distintas"""
+    yy, xx = np.mgrid[0:64, 0:96]
+    blobs = [np.exp(-((xx - x) ** 2 + (yy - y) ** 2) / 20.0) for x, y in ((20, 15), (70, 40))]
+    return np.stack(blobs)[..., np.newaxis].astype(np.float32)
+
+
+def peaks(confmaps):
+    """Pico global (fila, columna) y valor de cada canal de cada frame"""
+    n, height, width, channels = confmaps.shape
+    flat = confmaps.reshape(n, height * width, channels)
+    index = flat.argmax(axis=1)
+    return np.stack(np.unravel_index(index, (height, width)), axis=-1), flat.max(axis=1)
+
+
+@pytest.mark.parametrize("use_xla", [False, True])
+def test_compiled_and_stock_paths_give_same_peaks(tmp_path, frames, use_xla):
+    keras_model = make_model()
+    cache = cinbehave_gui.CompiledGraphCache(root=tmp_path, use_xla=use_xla)
+    compiled = cinbehave_gui.CompiledKerasModel(keras_model, cache.get(keras_model, "a" * 64))
+
+    stock = keras_model.predict_on_batch(frames)
+    result = compiled.predict_on_batch(frames)
+
+    # Todas las cabezas, en el mismo orden que Keras
+    assert len(result) == len(stock)
+    index = cinbehave_gui.confmap_output_index(compiled, "CentroidConfmapsHead")
+    assert index == 1
+    stock_points, stock_values = peaks(np.asarray(stock[index]))
+    points, values = peaks(result[index])
+    np.testing.assert_array_equal(points, stock_points)
+    np.testing.assert_allclose(values, stock_values, rtol=1e-4, atol=1e-5)
+
+
+def test_one_artifact_per_model_for_any_input_size(tmp_path, frames):
+    keras_model = make_model()
+    cache = cinbehave_gui.CompiledGraphCache(root=tmp_path, use_xla=False)
+    function = cache.get(keras_model, "b" * 64)
+
+    # Otra resolución (p.ej. otra ROI) reutiliza el mismo grafo
+    function(tf.constant(frames[:, :32, :48]))
+    assert len(list(tmp_path.glob("*/*"))) == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = cinbehave_gui.CompiledGraphCache(root=tmp_path, use_xla=False)
+    cache.get(make_model(), "c" * 64)
+    size = cache.artifact_size(cache.artifact_path("c" * 64))
+
+    # Espacio para un solo grafo: el más antiguo se elimina
+    cache = cinbehave_gui.CompiledGraphCache(root=tmp_path, use_xla=False, max_bytes=int(size * 1.5))
+    cache.get(make_model(), "d" * 64)
+
+    assert not cache.artifact_path("c" * 64).exists()
+    assert cache.artifact_path("d" * 64).exists()
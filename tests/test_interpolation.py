@@ -0,0 +1,58 @@
+"""Pruebas del relleno de frames omitidos en la vista previa"""
+import pytest
+
+import cinbehave_gui
+from fake_sleap import FakeSleap, LabeledFrame, Labels, Track, instance
+
+
+@pytest.fixture
+def fake_sleap(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    module = FakeSleap()
+    monkeypatch.setattr(cinbehave_gui, 'sleap', module, raising=False)
+    return module
+
+
+def sampled(frame_indices, track):
+    return [LabeledFrame(frame_idx=t, instances=[instance(10.0 * t, 50, track)]) for t in frame_indices]
+
+
+def test_interpolated_frames_are_flagged(fake_sleap):
+    track = Track(name="a")
+    frames, interpolated = cinbehave_gui.interpolate_prediction_gaps(sampled([0, 4, 8], track), 4)
+
+    assert [lf.frame_idx for lf in frames] == list(range(9))
+    assert interpolated == [1, 2, 3, 5, 6, 7]
+    middle = next(lf for lf in frames if lf.frame_idx == 2)
+    assert middle.instances[0].track is track
+    assert middle.instances[0].numpy()[:, 0].mean() == pytest.approx(20.0)
+
+
+def test_gaps_longer_than_the_limit_stay_empty(fake_sleap):
+    frames, interpolated = cinbehave_gui.interpolate_prediction_gaps(sampled([0, 2, 10], Track()), 2)
+
+    assert [lf.frame_idx for lf in frames] == [0, 1, 2, 10]
+    assert interpolated == [1]
+
+
+def test_frame_ranges_round_trip():
+    indices = [1, 2, 3, 7, 9, 10]
+    ranges = cinbehave_gui.compact_frame_ranges(indices)
+
+    assert ranges == [[1, 4], [7, 8], [9, 11]]
+    assert cinbehave_gui.expand_frame_ranges(ranges) == indices
+
+
+def test_merge_records_interpolated_frames_from_chunks_and_seams(fake_sleap):
+    track = Track(name="a")
+    first = Labels(labeled_frames=sampled(range(5), track), skeletons=["esqueleto"])
+    first.provenance['cinbehave_interpolated_frames'] = [[1, 2], [3, 4]]
+    first.save("c0.slp")
+    Labels(labeled_frames=sampled([6, 8], Track(name="b")), skeletons=["esqueleto"]).save("c1.slp")
+
+    merged = cinbehave_gui.merge_prediction_chunks(["c0.slp", "c1.slp"], "out.slp", "video.mp4",
+                                                   interpolate_stride=2)
+
+    assert merged.provenance['cinbehave_interpolated_frames'] == [[1, 2], [3, 4], [5, 6], [7, 8]]
+    saved = fake_sleap.load_file("out.slp")
+    assert saved.provenance == merged.provenance
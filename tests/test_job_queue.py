@@ -0,0 +1,88 @@
+"""Pruebas de la cola persistente de trabajos de predicción (SQLite)"""
+import itertools
+import multiprocessing
+
+import pytest
+
+import cinbehave_gui
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return cinbehave_gui.PredictionJobQueue(tmp_path / "prediction_jobs.db")
+
+
+def add_batch(queue, tmp_path, chunks=2, frames_per_chunk=100):
+    video = str(tmp_path / "video.mp4")
+    batch_id = queue.create_batch("proyecto", {'videos': [video]})
+    outputs = [str(tmp_path / f"video.part{chunk}.slp") for chunk in range(chunks)]
+    jobs = [{'video': video, 'chunk': chunk, 'chunks': chunks,
+             'frames': [chunk * frames_per_chunk, (chunk + 1) * frames_per_chunk],
+             'output': outputs[chunk], 'log': str(tmp_path / f"part{chunk}.log"),
+             'frame_total': frames_per_chunk}
+            for chunk in range(chunks)]
+    queue.add_jobs(batch_id, [{'video': video, 'index': 0, 'output': str(tmp_path / "video.slp"),
+                               'chunk_outputs': outputs}], jobs)
+    return batch_id
+
+
+def claim_and_crash(db_path, batch_id):
+    """Proceso que toma un trabajo, informa progreso y muere sin cerrarlo"""
+    queue = cinbehave_gui.PredictionJobQueue(db_path)
+    job = queue.claim_job(batch_id, worker_id=0)
+    queue.heartbeat(job['id'], {'n_processed': 40, 'n_total': 100})
+
+
+def test_jobs_are_claimed_once_in_order_and_heartbeated(queue, tmp_path):
+    batch_id = add_batch(queue, tmp_path)
+
+    first = queue.claim_job(batch_id, worker_id=0)
+    second = queue.claim_job(batch_id, worker_id=1)
+    assert (first['chunk'], second['chunk']) == (0, 1)
+    assert queue.claim_job(batch_id, worker_id=2) is None
+
+    queue.heartbeat(first['id'], {'n_processed': 30, 'n_total': 100, 'rate': 10.0})
+    snapshot = queue.snapshot(batch_id)
+    assert snapshot['frames_done'] == 30
+    assert [(worker, progress.get('n_processed')) for worker, _, progress in snapshot['running']] == [(0, 30), (1, None)]
+
+    # Dueño vivo y reciente: no se recupera nada
+    assert queue.recover_stale(batch_id) == 0
+
+    assert queue.complete_job(first['id'], True) == (None, False)
+    video, failed = queue.complete_job(second['id'], True)
+    assert video['video'] == str(tmp_path / "video.mp4") and not failed
+    assert queue.snapshot(batch_id)['frames_done'] == 200
+
+
+def test_jobs_of_a_crashed_process_are_reclaimed(queue, tmp_path):
+    batch_id = add_batch(queue, tmp_path, chunks=1)
+
+    process = multiprocessing.get_context("spawn").Process(target=claim_and_crash,
+                                                           args=(queue.db_path, batch_id))
+    process.start()
+    process.join(timeout=120)
+    assert process.exitcode == 0
+    assert queue.snapshot(batch_id)['running'][0][2]['n_processed'] == 40
+    assert queue.claim_job(batch_id, worker_id=0) is None
+
+    assert queue.recover_stale(batch_id) == 1
+    snapshot = queue.snapshot(batch_id)
+    assert snapshot['queued'] == 1 and snapshot['running'] == []
+
+    assert queue.claim_job(batch_id, worker_id=0)['chunk'] == 0
+
+
+def test_silent_owner_is_reclaimed_after_stale_timeout(queue, tmp_path, monkeypatch):
+    batch_id = add_batch(queue, tmp_path, chunks=1)
+    job = queue.claim_job(batch_id, worker_id=0)
+    queue.heartbeat(job['id'], {'n_processed': 10})
+
+    # Mismo proceso (vivo) pero sin latidos durante más de JOB_STALE_SECONDS
+    start = cinbehave_gui.time.time()
+    later = itertools.count(start + cinbehave_gui.JOB_STALE_SECONDS + 1)
+    monkeypatch.setattr(cinbehave_gui.time, 'time', lambda: float(next(later)))
+    assert not queue.owner_alive(cinbehave_gui.os.getpid(), start)
+
+    assert queue.recover_stale(batch_id) == 1
+    assert queue.claim_job(batch_id, worker_id=1)['id'] == job['id']
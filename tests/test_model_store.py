@@ -0,0 +1,77 @@
+"""Pruebas del almacén de modelos direccionado por contenido"""
+import hashlib
+import json
+import os
+import stat
+
+import pytest
+
+import cinbehave_gui
+
+
+def sha256(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def make_model(path, weights, config):
+    path.mkdir(parents=True)
+    (path / "best_model.h5").write_bytes(weights)
+    (path / "training_config.json").write_text(json.dumps(config))
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    return cinbehave_gui.ModelStore(tmp_path / "store")
+
+
+def test_checkout_writes_cannot_change_shared_blobs(store, tmp_path):
+    weights = b"pesos" * 1000
+    first = store.add(make_model(tmp_path / "a" / "modelo", weights, {'run': 1}))
+    second = store.add(make_model(tmp_path / "b" / "modelo", weights, {'run': 2}))
+    index = store.load_index()
+    shared = store.blob_path(index['models'][first]['files']['best_model.h5']['sha256'])
+    checkout = store.model_path(first)
+
+    # Los pesos son enlaces de solo lectura al blob compartido
+    checkout_weights = checkout / "best_model.h5"
+    assert not os.stat(checkout_weights).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+    if hasattr(os, 'geteuid') and os.geteuid() != 0:
+        with pytest.raises(PermissionError):
+            open(checkout_weights, 'r+b')
+
+    # La configuración es una copia: editarla no toca el blob ni el otro modelo
+    config_blob = store.blob_path(index['models'][first]['files']['training_config.json']['sha256'])
+    config_digest = sha256(config_blob)
+    (checkout / "training_config.json").write_text(json.dumps({'run': 'editado'}))
+    assert sha256(config_blob) == config_digest
+    assert not os.path.samefile(checkout / "training_config.json", config_blob)
+
+    assert sha256(shared) == hashlib.sha256(weights).hexdigest()
+    assert sha256(store.model_path(second) / "best_model.h5") == hashlib.sha256(weights).hexdigest()
+
+
+def test_garbage_collect_keeps_referenced_blobs(store, tmp_path):
+    shared_weights = b"compartido" * 1000
+    kept = store.add(make_model(tmp_path / "a" / "modelo", shared_weights, {'run': 1}))
+    dropped = store.add(make_model(tmp_path / "b" / "modelo", shared_weights, {'run': 2}))
+    orphan = store.add(make_model(tmp_path / "c" / "otro", b"huerfano" * 1000, {'run': 3}))
+    pinned = store.add(make_model(tmp_path / "d" / "incluido", b"incluido" * 1000, {'run': 4}), pinned=True)
+    store.add_ref(kept, "proyecto_1")
+    store.add_ref(dropped, "proyecto_2")
+    store.release("proyecto_2")
+
+    index = store.load_index()
+    blobs = {model: {info['sha256'] for info in index['models'][model]['files'].values()}
+             for model in (kept, dropped, orphan, pinned)}
+
+    store.garbage_collect()
+
+    index = store.load_index()
+    assert set(index['models']) == {kept, pinned}
+    for sha in blobs[kept] | blobs[pinned]:
+        assert store.blob_path(sha).exists()
+    for sha in (blobs[dropped] | blobs[orphan]) - blobs[kept]:
+        assert not store.blob_path(sha).exists()
+    assert sha256(store.model_path(kept) / "best_model.h5") == hashlib.sha256(shared_weights).hexdigest()
+    assert not (store.models_dir / dropped).exists()
@@ -0,0 +1,121 @@
+"""Pruebas de la descarga reanudable y verificada de modelos"""
+import functools
+import hashlib
+import http.server
+import io
+import json
+import re
+import threading
+
+import pytest
+
+import cinbehave_gui
+
+pytest.importorskip("requests")
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Servidor de archivos con soporte de Range; registra las cabeceras Range recibidas"""
+    ranges = []
+    honor_range = True
+
+    def send_head(self):
+        header = self.headers.get('Range')
+        self.ranges.append(header)
+        match = re.match(r"bytes=(\d+)-$", header or "")
+        path = self.translate_path(self.path)
+        if not match or not self.honor_range:
+            return super().send_head()
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404)
+            return None
+        data = f.read()
+        f.close()
+        start = int(match.group(1))
+        self.send_response(206)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        return io.BytesIO(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Servidor HTTP local sobre un directorio con un modelo publicado"""
+    root = tmp_path / "servidor"
+    model = root / "modelo"
+    (model / "sub").mkdir(parents=True)
+    (model / "best_model.h5").write_bytes(bytes(range(256)) * 4096)
+    (model / "sub" / "training_config.json").write_text('{"run": 1}')
+    cinbehave_gui.build_model_manifest(model)
+
+    RangeRequestHandler.ranges = []
+    RangeRequestHandler.honor_range = True
+    handler = functools.partial(RangeRequestHandler, directory=str(root))
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield model, f"http://127.0.0.1:{httpd.server_address[1]}/modelo"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def engine():
+    return cinbehave_gui.ModelTransferEngine(max_workers=2, chunk_size=4096, retries=2, retry_delay=0)
+
+
+def digests(folder):
+    """SHA-256 de cada archivo del modelo (sin el manifiesto, que no se publica con él)"""
+    return {p.relative_to(folder).as_posix(): hashlib.sha256(p.read_bytes()).hexdigest()
+            for p in folder.rglob("*") if p.is_file() and p.name != cinbehave_gui.MODEL_MANIFEST_FILENAME}
+
+
+def test_full_download_matches_manifest(server, tmp_path):
+    model, url = server
+    destination = engine().download_model(url, tmp_path / "descargas" / "modelo")
+
+    manifest = json.loads((model / cinbehave_gui.MODEL_MANIFEST_FILENAME).read_text())
+    assert digests(destination) == {entry['path']: entry['sha256'] for entry in manifest['files']}
+    assert not (tmp_path / "descargas" / "modelo.partial").exists()
+
+
+@pytest.mark.parametrize("honor_range", [True, False])
+def test_download_resumes_from_part_file(server, tmp_path, honor_range):
+    model, url = server
+    RangeRequestHandler.honor_range = honor_range
+    destination = tmp_path / "descargas" / "modelo"
+    weights = (model / "best_model.h5").read_bytes()
+    part = destination.with_name("modelo.partial") / "best_model.h5.part"
+    part.parent.mkdir(parents=True)
+    part.write_bytes(weights[:300000])
+
+    engine().download_model(url, destination)
+
+    assert (destination / "best_model.h5").read_bytes() == weights
+    assert "bytes=300000-" in RangeRequestHandler.ranges
+    assert digests(destination) == digests(model)
+
+
+@pytest.mark.parametrize("damage", ["corrupt", "short"])
+def test_bad_file_is_not_published(server, tmp_path, damage):
+    model, url = server
+    weights = model / "best_model.h5"
+    data = bytearray(weights.read_bytes())
+    if damage == "corrupt":
+        data[1000] ^= 0xFF
+    else:
+        del data[-5000:]
+    weights.write_bytes(bytes(data))  # el manifiesto publicado conserva el tamaño y el hash originales
+
+    destination = tmp_path / "descargas" / "modelo"
+    with pytest.raises(RuntimeError, match="best_model.h5"):
+        engine().download_model(url, destination)
+
+    assert not destination.exists()
+    assert not (destination.with_name("modelo.partial") / "best_model.h5").exists()
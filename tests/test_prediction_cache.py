@@ -0,0 +1,126 @@
+"""Pruebas de la caché de predicciones compartida entre proyectos"""
+import itertools
+import json
+import multiprocessing
+
+import pytest
+
+import cinbehave_gui
+from fake_sleap import FakeSleap, LabeledFrame, Labels, Video, instance
+
+
+@pytest.fixture
+def fake_sleap(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    module = FakeSleap()
+    monkeypatch.setattr(cinbehave_gui, 'sleap', module, raising=False)
+    return module
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj que avanza un segundo en cada consulta, para ordenar los usos"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(cinbehave_gui.time, 'time', lambda: float(next(ticks)))
+
+
+def write_slp(path, video_path="original.mp4"):
+    Labels(labeled_frames=[LabeledFrame(frame_idx=0, instances=[instance(10, 10)])],
+           videos=[Video(video_path)]).save(path)
+    return path
+
+
+def write_video(path, size=3 * 1024 * 1024):
+    path.write_bytes(bytes(range(256)) * (size // 256))
+    return path
+
+
+def test_sampled_fingerprint_change_is_a_miss(fake_sleap, tmp_path):
+    cache = cinbehave_gui.PredictionCache(tmp_path / "cache")
+    video = write_video(tmp_path / "video.mp4")
+    config_key = cache.config_key("modelos", {'peak_threshold': 0.2})
+    key = cache.make_key(cinbehave_gui.compute_video_content_hash(video), "modelos", {'peak_threshold': 0.2})
+    cache.put(key, write_slp(tmp_path / "result.slp"), "video.mp4",
+              cinbehave_gui.compute_video_fingerprint(video), config_key)
+
+    assert cache.has_candidate(cinbehave_gui.compute_video_fingerprint(video), config_key)
+    assert cache.get(key, tmp_path / "copy.slp", tmp_path / "other_project.mp4")
+    assert fake_sleap.load_file(tmp_path / "copy.slp").videos[0].backend.filename == str(
+        tmp_path / "other_project.mp4")
+
+    # Otros modelos: misma huella de video, configuración distinta
+    assert not cache.has_candidate(cinbehave_gui.compute_video_fingerprint(video),
+                                   cache.config_key("otros modelos", {'peak_threshold': 0.2}))
+
+    # Mismo tamaño, bytes distintos en la mitad muestreada
+    data = bytearray(video.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    video.write_bytes(bytes(data))
+    assert not cache.has_candidate(cinbehave_gui.compute_video_fingerprint(video), config_key)
+    changed_key = cache.make_key(cinbehave_gui.compute_video_content_hash(video), "modelos",
+                                 {'peak_threshold': 0.2})
+    assert changed_key != key
+    assert not cache.get(changed_key, tmp_path / "miss.slp", video)
+    assert not (tmp_path / "miss.slp").exists()
+
+
+def test_eviction_removes_least_recently_used_first(fake_sleap, tmp_path, clock):
+    source = write_slp(tmp_path / "result.slp")
+    entry_size = source.stat().st_size
+    cache = cinbehave_gui.PredictionCache(tmp_path / "cache", max_bytes=3 * entry_size)
+
+    for key in ("a", "b", "c"):
+        cache.put(key, source)
+    assert cache.get("a", tmp_path / "out.slp", "video.mp4")
+    cache.put("d", source)
+
+    assert set(cache.load_index()) == {"a", "c", "d"}
+    assert not cache.entry_path("b").exists()
+
+    cache.put("e", source)
+    assert set(cache.load_index()) == {"a", "d", "e"}
+
+
+def put_entries(cache_dir, source, prefix, count):
+    cache = cinbehave_gui.PredictionCache(cache_dir)
+    for i in range(count):
+        cache.put(f"{prefix}{i}", source)
+
+
+def increment_under_lock(lock_path, counter_path, count):
+    for _ in range(count):
+        with cinbehave_gui.interprocess_lock(lock_path):
+            value = int(counter_path.read_text())
+            counter_path.write_text(str(value + 1))
+
+
+def run_processes(target, argument_sets):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=target, args=args) for args in argument_sets]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+    assert all(process.exitcode == 0 for process in processes)
+
+
+def test_interprocess_lock_serializes_processes(tmp_path):
+    counter = tmp_path / "counter.txt"
+    counter.write_text("0")
+
+    run_processes(increment_under_lock, [(tmp_path / "counter.lock", counter, 200)] * 2)
+
+    assert counter.read_text() == "400"
+
+
+def test_two_processes_writing_keep_every_entry(tmp_path):
+    source = tmp_path / "result.slp"
+    source.write_bytes(b"slp" * 100)
+    cache_dir = tmp_path / "cache"
+
+    run_processes(put_entries, [(cache_dir, source, "gui_", 25), (cache_dir, source, "queue_", 25)])
+
+    with open(cache_dir / cinbehave_gui.PredictionCache.INDEX_FILENAME) as f:
+        index = json.load(f)
+    assert set(index) == {f"{prefix}{i}" for prefix in ("gui_", "queue_") for i in range(25)}
+    assert all((cache_dir / f"{key}.slp").exists() for key in index)
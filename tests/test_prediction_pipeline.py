@@ -0,0 +1,107 @@
+"""Pruebas del pipeline de predicción por etapas (sin SLEAP: módulo simulado)"""
+import threading
+import types
+
+import numpy as np
+import pytest
+
+import cinbehave_gui
+
+
+class FakeVideo:
+    def __init__(self, num_frames=10):
+        self.num_frames = num_frames
+
+    def get_frames(self, indices):
+        return np.stack([np.full((4, 4, 1), i, dtype=np.uint8) for i in indices])
+
+
+class FakeLabeledFrame:
+    def __init__(self, video=None, frame_idx=0, instances=()):
+        self.video = video
+        self.frame_idx = frame_idx
+        self.instances = list(instances)
+
+
+class FakeLabels:
+    save_error = None
+    saved = []
+
+    def __init__(self, labeled_frames=()):
+        self.labeled_frames = list(labeled_frames)
+        self.provenance = {}
+
+    def save(self, path):
+        if FakeLabels.save_error is not None:
+            raise FakeLabels.save_error
+        FakeLabels.saved.append((path, self))
+
+
+class FakePredictor:
+    """Una instancia (vacía) por frame; los frame_idx son posiciones en el lote"""
+    def predict(self, frames):
+        return FakeLabels([FakeLabeledFrame(frame_idx=i, instances=[object()]) for i in range(len(frames))])
+
+
+class RecordingTracker:
+    def __init__(self):
+        self.calls = []
+        self.final_frames = None
+
+    def track(self, untracked_instances, img=None, t=None):
+        self.calls.append((t, img))
+        return untracked_instances
+
+    def final_pass(self, frames):
+        self.final_frames = list(frames)
+
+
+@pytest.fixture
+def fake_sleap(monkeypatch):
+    module = types.SimpleNamespace(load_video=lambda path: FakeVideo(),
+                                   LabeledFrame=FakeLabeledFrame, Labels=FakeLabels)
+    monkeypatch.setattr(cinbehave_gui, 'sleap', module, raising=False)
+    FakeLabels.save_error = None
+    FakeLabels.saved = []
+    return module
+
+
+def run_with_timeout(pipeline, output_path, timeout=10):
+    """Ejecutar el pipeline en un hilo; falla si no termina a tiempo"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = pipeline.run(output_path)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "El pipeline quedó bloqueado"
+    return outcome
+
+
+def test_save_error_is_raised_instead_of_hanging(fake_sleap, tmp_path):
+    FakeLabels.save_error = OSError(28, "No queda espacio en el dispositivo")
+    pipeline = cinbehave_gui.StagedPredictionPipeline(FakePredictor(), "video.mp4", range(10), batch_frames=3)
+
+    outcome = run_with_timeout(pipeline, tmp_path / "out.slp")
+
+    assert isinstance(outcome.get('error'), OSError)
+
+
+def test_tracker_receives_frames_and_final_pass(fake_sleap, tmp_path):
+    tracker = RecordingTracker()
+    pipeline = cinbehave_gui.StagedPredictionPipeline(FakePredictor(), "video.mp4", range(2, 9), tracker=tracker,
+                                                      batch_frames=3)
+
+    outcome = run_with_timeout(pipeline, tmp_path / "out.slp")
+
+    assert outcome == {'result': 7}
+    assert [t for t, _ in tracker.calls] == list(range(2, 9))
+    # Cada llamada recibe el frame decodificado que corresponde a su índice
+    assert all(img is not None and int(img[0, 0, 0]) == t for t, img in tracker.calls)
+    assert [lf.frame_idx for lf in tracker.final_frames] == list(range(2, 9))
+    assert len(FakeLabels.saved) == 1
@@ -0,0 +1,100 @@
+"""Pruebas de la ventana de progreso SLEAP cuando el lote sigue en segundo plano"""
+import threading
+import tkinter as tk
+
+import pytest
+
+import cinbehave_gui
+
+
+class FakeWindow:
+    """Toplevel mínimo: after falla con TclError una vez destruida, como Tk"""
+    def __init__(self):
+        self.destroyed = False
+        self.pending = []
+
+    def after(self, delay, callback, *args):
+        if self.destroyed:
+            raise tk.TclError('can\'t invoke "after" command: application has been destroyed')
+        self.pending.append((callback, args))
+
+    def destroy(self):
+        self.destroyed = True
+
+
+class FakeLabel:
+    def __init__(self):
+        self.text = None
+
+    def config(self, options=None, **kwargs):
+        self.text = dict(options or {}, **kwargs).get('text', self.text)
+
+
+class FakeRunner:
+    """Runner que sigue informando estado después de cerrar la ventana"""
+    def __init__(self):
+        self.on_status = None
+        self.window_closed = threading.Event()
+        self.finished = False
+
+    def status(self, text):
+        cinbehave_gui.PredictionBatchRunner.status(self, text)
+
+    def run(self):
+        self.status("Preparando...")
+        self.window_closed.wait(10)
+        self.status("⏳ Esperando memoria libre (2.0 GB estimados)...")
+        self.finished = True
+        return True
+
+    def cancel(self):
+        raise AssertionError("Con 'No' el lote no se cancela")
+
+
+@pytest.fixture
+def thread_errors(monkeypatch):
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', lambda args: errors.append(args.exc_value))
+    return errors
+
+
+def make_window(runner):
+    window = cinbehave_gui.SLEAPProgressWindow.__new__(cinbehave_gui.SLEAPProgressWindow)
+    window.window = FakeWindow()
+    window.current_video_label = FakeLabel()
+    window.runner = runner
+    window.processing = True
+    window.success = False
+    window.closed = False
+    runner.on_status = window.set_status
+    return window
+
+
+def test_closing_in_background_keeps_the_runner_alive(monkeypatch, thread_errors):
+    monkeypatch.setattr(cinbehave_gui.messagebox, 'askyesnocancel', lambda *args, **kwargs: False)
+    runner = FakeRunner()
+    window = make_window(runner)
+
+    thread = threading.Thread(target=window.process_videos_thread)
+    thread.start()
+    window.on_closing()
+    runner.window_closed.set()
+    thread.join(10)
+
+    assert window.window.destroyed
+    assert runner.finished and runner.on_status is None
+    assert thread_errors == []
+    # Lo programado antes del cierre no toca widgets destruidos
+    assert window.window.pending
+    for callback, args in window.window.pending:
+        callback(*args)
+    assert window.current_video_label.text is None
+
+
+def test_after_failing_between_check_and_call_is_ignored():
+    window = make_window(FakeRunner())
+    window.window.destroy()
+
+    window.set_status("tarde")
+    window.schedule(window.processing_completed)
+    assert window.window.pending == []
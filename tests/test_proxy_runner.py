@@ -0,0 +1,113 @@
+"""Paridad de la pasada de centroides sobre proxy con predictor.predict de SLEAP"""
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import cinbehave_gui
+
+sleap = pytest.importorskip("sleap")
+tf = pytest.importorskip("tensorflow")
+
+REPO = Path(__file__).resolve().parent.parent
+MODEL_PATHS = [REPO / "240604_140339.centroid.n=3561", REPO / "240604_151646.centered_instance.n=3561"]
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    if not all((path / "best_model.h5").exists() for path in MODEL_PATHS):
+        pytest.skip("Pesos de los modelos incluidos no disponibles")
+    # Umbral bajo para que haya instancias que comparar aun en frames sintéticos
+    return sleap.load_model([str(path) for path in MODEL_PATHS], peak_threshold=0.05, max_instances=3,
+                            batch_size=2)
+
+
+@pytest.fixture
+def frames():
+    """Frames del tamaño de entrenamiento de los modelos incluidos"""
+    return blob_frames(960, 1280, 8.0)
+
+
+def small_model(head_name, channels):
+    """Red mínima con stride de salida 2 y la cabeza con el nombre que busca SLEAP"""
+    inputs = tf.keras.Input((None, None, 1))
+    features = tf.keras.layers.AveragePooling2D(2)(inputs)
+    outputs = tf.keras.layers.Conv2D(channels, 3, padding="same", name=head_name,
+                                     kernel_initializer=tf.keras.initializers.RandomUniform(0, 1, seed=1))(features)
+    return tf.keras.Model(inputs, outputs)
+
+
+@pytest.fixture
+def small_predictor():
+    """Predictor top-down con las capas de inferencia de SLEAP sobre redes mínimas"""
+    from sleap.nn.inference import CentroidCrop, FindInstancePeaks, TopDownInferenceModel
+
+    centroid_crop = CentroidCrop(keras_model=small_model("CentroidConfmapsHead", 1), crop_size=32,
+                                 input_scale=0.5, pad_to_stride=16, output_stride=2, peak_threshold=0.05,
+                                 refinement="integral", max_instances=3)
+    instance_peaks = FindInstancePeaks(keras_model=small_model("CenteredInstanceConfmapsHead", 2),
+                                       output_stride=2, peak_threshold=0.05, refinement="integral")
+    skeleton = sleap.Skeleton.from_names_and_edge_inds(["cabeza", "cola"])
+    labels_config = types.SimpleNamespace(skeletons=[skeleton])
+    return types.SimpleNamespace(
+        inference_model=TopDownInferenceModel(centroid_crop, instance_peaks),
+        confmap_model=object(),
+        confmap_config=types.SimpleNamespace(data=types.SimpleNamespace(labels=labels_config))
+    )
+
+
+def blob_frames(height, width, scale):
+    """Frames con dos manchas claras que se desplazan sobre fondo oscuro"""
+    yy, xx = np.mgrid[0:height, 0:width]
+    frames = []
+    for shift in range(5):
+        frame = np.full((height, width), 10.0)
+        for x, y in ((0.2 * width + 5 * shift, 0.33 * height), (0.75 * width, 0.25 * height + 6 * shift)):
+            frame += 200.0 * np.exp(-(((xx - x) / (8.0 * scale)) ** 2 + ((yy - y) / (5.0 * scale)) ** 2))
+        frames.append(frame)
+    return np.clip(np.stack(frames), 0, 255).astype(np.uint8)[..., np.newaxis]
+
+
+def test_proxy_runner_matches_sleap_inference_layers(small_predictor):
+    frames = blob_frames(120, 150, 1.0)
+    expected = small_predictor.inference_model.predict(frames)
+    runner = cinbehave_gui.ProxyTopDownRunner(small_predictor, batch_size=2)
+    labels = runner.predict(frames, proxy_frames=runner.make_proxy(frames))
+    result = {lf.frame_idx: lf.instances for lf in labels.labeled_frames}
+
+    assert sum(len(instances) for instances in result.values()) > 0
+    for frame_idx in range(len(frames)):
+        instances = result.get(frame_idx, [])
+        assert len(instances) == len(expected["instance_peaks"][frame_idx])
+        for instance, points in zip(instances, expected["instance_peaks"][frame_idx]):
+            np.testing.assert_allclose(instance.numpy(), points, atol=1e-4)
+        np.testing.assert_allclose([instance.score for instance in instances],
+                                   expected["centroid_vals"][frame_idx], atol=1e-6)
+
+
+def by_score(labeled_frame):
+    return sorted(labeled_frame.instances, key=lambda inst: inst.score, reverse=True)
+
+
+def test_proxy_runner_matches_sleap_predictor(predictor, frames):
+    expected = {lf.frame_idx: by_score(lf) for lf in predictor.predict(frames)}
+    runner = cinbehave_gui.ProxyTopDownRunner(predictor, batch_size=2)
+    proxy = runner.make_proxy(frames)
+    result = {lf.frame_idx: by_score(lf) for lf in runner.predict(frames, proxy_frames=proxy)}
+
+    assert {i for i, instances in expected.items() if instances} == set(result)
+    for frame_idx, instances in result.items():
+        assert len(instances) == len(expected[frame_idx])
+        for ours, theirs in zip(instances, expected[frame_idx]):
+            np.testing.assert_allclose(ours.numpy(), theirs.numpy(), atol=1e-3, equal_nan=True)
+            assert ours.score == pytest.approx(theirs.score, abs=1e-4)
+
+
+def test_proxy_is_the_centroid_network_input(small_predictor):
+    frames = blob_frames(120, 150, 1.0)
+    proxy = cinbehave_gui.ProxyTopDownRunner(small_predictor).make_proxy(frames)
+
+    # Escala 0.5 y relleno hasta múltiplo de 16, en float como lo recibe la red
+    assert proxy.dtype == np.float32
+    assert proxy.shape == (5, 64, 80, 1)
@@ -0,0 +1,157 @@
+"""Pruebas de la ingesta de videos: orden de métodos de copia y aislamiento de errores"""
+import errno
+import os
+from pathlib import Path
+
+import pytest
+
+import cinbehave_gui
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "origen" / "raton.mp4"
+    path.parent.mkdir()
+    path.write_bytes(os.urandom(256 * 1024))
+    return path
+
+
+def make_engine(files, destination, allow_hardlinks, reflink_supported, calls):
+    destination.mkdir(exist_ok=True)
+    engine = cinbehave_gui.VideoIngestEngine(files, destination, max_workers=1, allow_hardlinks=allow_hardlinks)
+    try_hardlink, try_copy_file_range = engine.try_hardlink, engine.try_copy_file_range
+
+    def reflink(source, src, dst):
+        calls.append('reflink')
+        if not reflink_supported:
+            return False
+        dst.write(src.read())
+        engine.add_bytes(source, engine.sizes[str(source)])
+        return True
+
+    def hardlink(source, destination):
+        calls.append('hardlink')
+        return try_hardlink(source, destination)
+
+    def copy_file_range(source, src, dst):
+        calls.append('copy_file_range')
+        return try_copy_file_range(source, src, dst)
+
+    engine.try_reflink, engine.try_hardlink, engine.try_copy_file_range = reflink, hardlink, copy_file_range
+    return engine
+
+
+@pytest.mark.parametrize("allow_hardlinks, reflink_supported, expected_method, expected_calls", [
+    (True, True, 'reflink', ['reflink']),
+    (True, False, 'hardlink', ['reflink', 'hardlink']),
+    (False, False, None, ['reflink', 'hardlink', 'copy_file_range']),
+])
+def test_zero_copy_fallback_order(source, tmp_path, allow_hardlinks, reflink_supported,
+                                  expected_method, expected_calls):
+    calls = []
+    engine = make_engine([source], tmp_path / "Videos", allow_hardlinks, reflink_supported, calls)
+
+    result = engine.ingest_file(source)
+
+    destination = tmp_path / "Videos" / source.name
+    assert result['status'] == 'success'
+    assert calls[:len(expected_calls)] == expected_calls
+    if expected_method is not None:
+        assert result['method'] == expected_method
+    else:
+        assert result['method'] in ('copy_file_range', 'sendfile', 'verified')
+    assert destination.read_bytes() == source.read_bytes()
+    assert os.path.samefile(source, destination) == (expected_method == 'hardlink')
+    assert not engine.part_path(destination).exists()
+
+
+def test_failed_hardlink_keeps_previous_destination(source, tmp_path, monkeypatch):
+    engine = make_engine([source], tmp_path / "Videos", True, False, [])
+    destination = tmp_path / "Videos" / source.name
+    destination.write_bytes(b"version anterior")
+
+    def link_unsupported(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(cinbehave_gui.os, 'link', link_unsupported)
+    assert not engine.try_hardlink(source, destination)
+    assert destination.read_bytes() == b"version anterior"
+
+
+def test_roi_selector_resolves_linked_videos(tmp_path, source, monkeypatch):
+    videos_folder = tmp_path / "Proyecto" / "Videos"
+    videos_folder.mkdir(parents=True)
+    (videos_folder / "copiado.mp4").write_bytes(b"copia")
+    assert cinbehave_gui.register_video_references(videos_folder, [source]) == [source.name]
+
+    class FakeParent:
+        root = None
+        projects_data = {"Proyecto": {"videos": []}}
+
+        def get_project_videos_folder(self, project_name):
+            return videos_folder
+
+    class FakeToplevel:
+        def __init__(self, master):
+            pass
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: None
+
+    monkeypatch.setattr(cinbehave_gui.tk, "Toplevel", FakeToplevel)
+    monkeypatch.setattr(cinbehave_gui.ROISelectorWindow, "center_window", lambda self: None)
+    monkeypatch.setattr(cinbehave_gui.ROISelectorWindow, "setup_ui", lambda self: None)
+    selector = cinbehave_gui.ROISelectorWindow(FakeParent(), "Proyecto")
+
+    assert selector.video_path(source.name) == source.resolve()
+    assert selector.video_path("copiado.mp4") == videos_folder / "copiado.mp4"
+
+
+def test_corrupt_reflink_is_not_published(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(cinbehave_gui, 'INGEST_RETRY_DELAY', 0)
+    engine = make_engine([source], tmp_path / "Videos", False, True, [])
+
+    def corrupt_reflink(source, src, dst):
+        data = bytearray(src.read())
+        data[len(data) // 2] ^= 0xFF
+        dst.write(data)
+        return True
+
+    engine.try_reflink = corrupt_reflink
+    result = engine.ingest_file(source)
+
+    destination = tmp_path / "Videos" / source.name
+    assert result['status'] == 'error'
+    assert 'Verificación fallida' in result['error']
+    assert not destination.exists()
+    assert not engine.part_path(destination).exists()
+
+
+def test_failed_file_does_not_stop_the_others(tmp_path, monkeypatch):
+    monkeypatch.setattr(cinbehave_gui, 'INGEST_RETRY_DELAY', 0)
+    origin = tmp_path / "origen"
+    origin.mkdir()
+    files = []
+    for name in ("a.mp4", "roto.mp4", "c.mp4"):
+        path = origin / name
+        path.write_bytes(os.urandom(64 * 1024))
+        files.append(path)
+    engine = cinbehave_gui.VideoIngestEngine(files, tmp_path / "Videos", max_workers=2, allow_hardlinks=False)
+    copy_file = engine.copy_file
+
+    def failing_copy(source, destination):
+        if source.name == "roto.mp4":
+            raise OSError(errno.EIO, "Error de entrada/salida")
+        return copy_file(source, destination)
+
+    engine.copy_file = failing_copy
+    results = {Path(r['source']).name: r for r in engine.run()}
+
+    assert results["roto.mp4"]['status'] == 'error'
+    assert not (tmp_path / "Videos" / "roto.mp4").exists()
+    for name in ("a.mp4", "c.mp4"):
+        assert results[name]['status'] == 'success'
+        assert (tmp_path / "Videos" / name).read_bytes() == (origin / name).read_bytes()
+    snapshot = engine.snapshot()
+    assert (snapshot['completed'], snapshot['failed']) == (2, 1)
+    assert snapshot['copied_bytes'] == 2 * 64 * 1024
@@ -0,0 +1,75 @@
+"""Pruebas del almacén compartido de videos: deduplicación, referencias y recolección"""
+import hashlib
+import os
+
+import pytest
+
+import cinbehave_gui
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "origen" / "raton.mp4"
+    path.parent.mkdir()
+    path.write_bytes(os.urandom(300 * 1024))
+    return path
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Forzar el paso por el almacén (sin reflink ni enlace duro desde el origen)
+    monkeypatch.setattr(cinbehave_gui, 'same_filesystem', lambda paths, folder: False)
+    return cinbehave_gui.VideoObjectStore(tmp_path / "Proyectos" / ".video_store")
+
+
+def ingest(store, source, project_folder):
+    engine = cinbehave_gui.VideoIngestEngine([source], project_folder / "Videos", max_workers=1,
+                                             allow_hardlinks=False, store=store,
+                                             project_ref=str(project_folder))
+    [result] = engine.run()
+    assert result['status'] == 'success', result['error']
+    return result
+
+
+def test_same_video_is_stored_once_for_two_projects(store, source, tmp_path):
+    first, second = tmp_path / "Proyectos" / "A", tmp_path / "Proyectos" / "B"
+
+    assert ingest(store, source, first)['method'] == 'store'
+    assert ingest(store, source, second)['method'] == 'dedup'
+
+    objects = store.load_index()['objects']
+    assert len(objects) == 1
+    [(sha256, entry)] = objects.items()
+    assert sorted(entry['refs']) == [str(first), str(second)]
+    object_path = store.object_path(sha256)
+    assert os.path.samefile(object_path, first / "Videos" / source.name)
+    assert os.path.samefile(object_path, second / "Videos" / source.name)
+
+
+def test_recorded_digest_matches_object_contents(store, source, tmp_path):
+    ingest(store, source, tmp_path / "Proyectos" / "A")
+
+    [sha256] = store.load_index()['objects']
+    assert sha256 == hashlib.sha256(source.read_bytes()).hexdigest()
+    assert hashlib.sha256(store.object_path(sha256).read_bytes()).hexdigest() == sha256
+
+
+def test_release_and_garbage_collect(store, source, tmp_path):
+    first, second = tmp_path / "Proyectos" / "A", tmp_path / "Proyectos" / "B"
+    ingest(store, source, first)
+    ingest(store, source, second)
+    [sha256] = store.load_index()['objects']
+    object_path = store.object_path(sha256)
+
+    # Con otra referencia viva el objeto se conserva
+    store.release(str(first))
+    assert store.load_index()['objects'][sha256]['refs'] == [str(second)]
+    assert store.garbage_collect() == 0
+    assert object_path.exists()
+
+    store.release(str(second))
+    assert store.garbage_collect() == source.stat().st_size
+    assert not object_path.exists()
+    assert store.load_index()['objects'] == {}
+    # El enlace del proyecto sigue siendo un archivo válido
+    assert (second / "Videos" / source.name).read_bytes() == source.read_bytes()